@@ -0,0 +1,11 @@
+"""Headless benchmarks for the lattice, transform and render hot paths.
+
+Run with ``python -m benchmarks``. See ``python -m benchmarks --help``.
+"""
+import os
+
+# SDL must be told before pygame is first imported that there is no display or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Keep stdout clean for the JSON output
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
@@ -0,0 +1,40 @@
+import argparse
+import json
+import sys
+
+from benchmarks.bench import run_benchmarks, compare, save, load
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Headless benchmarks for the lattice, transform and render hot paths")
+    parser.add_argument("-k", dest="names", action="append", help="only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repeats per benchmark")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a stored JSON result file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown flagged as a regression (default 0.1)")
+    args = parser.parse_args()
+    
+    results = run_benchmarks(args.names, args.repeat)
+    if args.output:
+        save(results, args.output)
+    
+    if not args.compare:
+        if not args.output:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        else:
+            for name, result in results["results"].items():
+                print("%-45s %12.3f us" % (name, result["median"] * 1e6))
+        return 0
+    
+    regressed = False
+    for name, base, median, ratio, regression in compare(results, load(args.compare), args.threshold):
+        flag = "REGRESSION" if regression else ""
+        print("%-45s %12.3f us -> %12.3f us  x%.2f %s" % (name, base * 1e6, median * 1e6, ratio, flag))
+        regressed = regressed or regression
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import json
+import platform
+import statistics
+import time
+
+import numpy as np
+
+from hyper.geometry import SCALE, BRANCH_LENGTH, DIRECTIONS, DIRECTION_ANGLE
+from hyper.transforms import PolarTransform, PolarTransformArray, LorentzTransform, LatticeTransform
+from hyper.system import LatticeSystem
+from hyper.lattice import LatticeCoord, LatticeCircularIterator, LatticeCoordArray
+from hyper.paths import PathCache
+
+WIDTH, HEIGHT = 800, 800
+
+BENCHMARKS = {}
+
+def benchmark(name: str, number: int):
+    """Registers a benchmark. The decorated function does any setup and returns
+    the callable to time, which is run number times per repeat
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+    return register
+
+@benchmark("transform.apply_polar_transform", number=2000)
+def bench_transform_apply():
+    pt = PolarTransform(0.3, 0.2, 0.1)
+    step = PolarTransform(DIRECTION_ANGLE, BRANCH_LENGTH, np.pi)
+    def run():
+        pt.apply_polar_transform(step)
+    return run
+
+@benchmark("transform.preapply_polar_transform", number=2000)
+def bench_transform_preapply():
+    pt = PolarTransform(0.3, 0.2, 0.1)
+    step = PolarTransform(0.1, -0.05, -0.1)
+    def run():
+        pt.preapply_polar_transform(step)
+    return run
+
+@benchmark("transform.lorentz.apply_polar_transform", number=2000)
+def bench_lorentz_apply():
+    lt = LorentzTransform(0.3, 0.2, 0.1)
+    step = PolarTransform(DIRECTION_ANGLE, BRANCH_LENGTH, np.pi)
+    def run():
+        lt.apply_polar_transform(step)
+    return run
+
+@benchmark("transform.lorentz.preapply_translation_z", number=2000)
+def bench_lorentz_preapply_translation():
+    lt = LorentzTransform(0.3, 0.2, 0.1)
+    # Forth and back, so every repeat times the same transform instead of one
+    # drifting ever further from the origin
+    amounts = [0.04, -0.04]
+    state = {"i": 0}
+    def run():
+        state["i"] ^= 1
+        lt.preapply_translation_z(amounts[state["i"]])
+    return run
+
+@benchmark("coord.coord_in_direction", number=20)
+def bench_coord_in_direction():
+    coords = []
+    iter = LatticeCircularIterator(5)
+    while iter.has_next():
+        coords.append(iter.this_coord)
+        iter.next()
+    def run():
+        for coord in coords:
+            for direction in range(DIRECTIONS):
+                coord.coord_in_direction(direction)
+    return run
+
+@benchmark("coord.circular_iterator[r=8]", number=3)
+def bench_circular_iterator():
+    def run():
+        iter = LatticeCircularIterator(8)
+        while iter.has_next():
+            iter.next()
+    return run
+
+@benchmark("coord.enumerate_bulk[r=8]", number=20)
+def bench_enumerate_bulk():
+    def run():
+        LatticeCoordArray.up_to_radius(8)
+    return run
+
+@benchmark("transform.pairwise_distances[1000x1000]", number=5)
+def bench_pairwise_distances():
+    rng = np.random.RandomState(0)
+    a = PolarTransformArray(*rng.uniform(-3, 3, (3, 1000)))
+    b = PolarTransformArray(*rng.uniform(-3, 3, (3, 1000)))
+    def run():
+        a.pairwise_distances(b)
+    return run
+
+def _random_coord_pairs(radius: int, count: int) -> list:
+    coords = LatticeCoordArray.up_to_radius(radius).coords()
+    rng = np.random.RandomState(0)
+    return [(coords[i], coords[j]) for i, j in rng.randint(len(coords), size=(count, 2))]
+
+@benchmark("coord.distance_to[r=6, 1000 pairs]", number=5)
+def bench_distance_to():
+    pairs = _random_coord_pairs(6, 1000)
+    def run():
+        for a, b in pairs:
+            a.distance_to(b)
+    return run
+
+@benchmark("coord.path_cache.distance[r=6, 1000 pairs]", number=20)
+def bench_path_cache_distance():
+    pairs = _random_coord_pairs(6, 1000)
+    cache = PathCache()
+    def run():
+        for a, b in pairs:
+            cache.distance(a, b)
+    return run
+
+@benchmark("coord.path_cache.distances[r=6, 300x300]", number=5)
+def bench_path_cache_distances():
+    pairs = _random_coord_pairs(6, 300)
+    sources, targets = [a for a, _ in pairs], [b for _, b in pairs]
+    cache = PathCache()
+    def run():
+        cache.distances(sources, targets)
+    return run
+
+def bench_generate_walkers(radius: int):
+    l_system = LatticeSystem()
+    def run():
+        l_system.lattice_walkers.clear()
+        l_system.lattice_walkers.add(l_system.walker_origin.coord_origin_rel.key(), l_system.walker_origin)
+        l_system.generate_lattice_walkers(radius)
+    return run
+
+for radius in (2, 3, 4, 5):
+    benchmark("system.generate_lattice_walkers[r=%d]" % radius, number=3)(
+        lambda radius=radius: bench_generate_walkers(radius))
+
+@benchmark("system.set_view_origin[same base point]", number=200)
+def bench_set_view_origin_same():
+    l_system = LatticeSystem()
+    transform = LatticeTransform(PolarTransform(0, 0, 0), LatticeCoord([]), l_system)
+    def run():
+        transform.rel_transform.preapply_rotation(0.01)
+        l_system.set_view_origin_lattrans(transform)
+    return run
+
+@benchmark("system.set_view_origin[scripted walk]", number=48)
+def bench_set_view_origin_walk():
+    l_system = LatticeSystem()
+    # Around the four edges of one tile and back to the start, so every repeat
+    # walks the same base points instead of ever further from the origin
+    point = l_system.get_lattice_point(LatticeCoord([2, 1]))
+    direction = 1
+    loop = []
+    for _ in range(4):
+        turn = point.turn_in_direction(direction)
+        point = point.point_in_direction(direction)
+        loop.append(point.coords)
+        direction = (turn - 1) % DIRECTIONS
+    assert loop[-1] == LatticeCoord([2, 1])
+    for coord in loop:
+        l_system.set_view_origin(coord, PolarTransform(0.1, 0.2, 0.3))
+    state = {"step": 0}
+    def run():
+        l_system.set_view_origin(loop[state["step"] % len(loop)], PolarTransform(0.1, 0.2, 0.3))
+        state["step"] += 1
+    return run
+
+@benchmark("system.pick[1000 pixels]", number=20)
+def bench_pick():
+    l_system = LatticeSystem()
+    l_system.set_view_origin(LatticeCoord([2, 1]), PolarTransform(0.4, 0.3, 1.1))
+    pixels = np.random.RandomState(0).uniform(0, WIDTH, (1000, 2))
+    def run():
+        l_system.pick(pixels)
+    return run
+
+@benchmark("render.frame[offscreen]", number=20)
+def bench_render_frame():
+    import pygame
+    pygame.init()
+    screen = pygame.Surface((WIDTH, HEIGHT))
+    font = pygame.font.Font(None, 36)
+    l_system = LatticeSystem()
+    transform = LatticeTransform(PolarTransform(0, 0, 0), LatticeCoord([]), l_system)
+    def run():
+        transform.rel_transform.preapply_translation_z(0.04)
+        l_system.set_view_origin_lattrans(transform)
+        transform.shift_to_nearer_basepoint(False)
+        screen.fill('black')
+        pygame.draw.circle(screen, (34, 139, 34), pygame.Vector2(SCALE, SCALE), SCALE)
+        pygame.draw.circle(screen, 'red', pygame.Vector2(SCALE, SCALE), SCALE, 4)
+        l_system.render_walkers(screen, font, False)
+    return run
+
+@benchmark("render.frame[null]", number=20)
+def bench_render_frame_null():
+    l_system = LatticeSystem(renderer="null")
+    transform = LatticeTransform(PolarTransform(0, 0, 0), LatticeCoord([]), l_system)
+    def run():
+        transform.rel_transform.preapply_translation_z(0.04)
+        l_system.set_view_origin_lattrans(transform)
+        transform.shift_to_nearer_basepoint(False)
+        l_system.render_walkers(None, None, False)
+    return run
+
+def run_benchmarks(names: list = None, repeat: int = 5) -> dict:
+    """Runs the selected benchmarks (all by default)
+
+    Returns:
+        dict: JSON-ready results, times are seconds per call
+    """
+    results = {}
+    for name, (setup, number) in BENCHMARKS.items():
+        if names and not any(n in name for n in names):
+            continue
+        run = setup()
+        run()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            times.append((time.perf_counter() - start) / number)
+        results[name] = {
+            "median": statistics.median(times),
+            "min": min(times),
+            "max": max(times),
+            "number": number,
+            "repeat": repeat,
+        }
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": _module_version("pygame"),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+def _module_version(name: str) -> str:
+    """Version of an optional dependency, None if it isn't installed"""
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Compares median times against a baseline
+
+    Args:
+        results (dict): output of run_benchmarks
+        baseline (dict): stored output of run_benchmarks
+        threshold (float): allowed relative slowdown, 0.1 is 10%
+
+    Returns:
+        list: (name, baseline median, median, ratio, regressed) rows
+    """
+    rows = []
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        base = baseline["results"][name]["median"]
+        ratio = result["median"] / base
+        rows.append((name, base, result["median"], ratio, ratio > 1 + threshold))
+    return rows
+
+def save(results: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
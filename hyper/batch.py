@@ -0,0 +1,158 @@
+"""Renders many independent views across a process pool. Every worker keeps a warm
+LatticeSystem and renders straight into a frame array in shared memory, so only
+coords and transforms cross process boundaries, never pixels.
+"""
+import os
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from hyper.transforms import PolarTransform, LorentzTransform
+from hyper.system import LatticeSystem
+from hyper.lattice import LatticeCoord
+from hyper.raster import NumpyRenderer, disc_backdrop
+from hyper.store import BoundedLatticeStore
+
+WIDTH, HEIGHT = 800, 800
+POINT_CAPACITY = 20000
+
+
+class SharedFrames(object):
+    """(count, height, width, 3) uint8 frames in a SharedMemory block. The process
+    that creates it owns it and must unlink it when done, e.g. by using it as a
+    context manager
+    """
+
+    def __init__(self, count: int, width: int = WIDTH, height: int = HEIGHT, name: str = None) -> None:
+        self.shape = (count, height, width, 3)
+        size = max(int(np.prod(self.shape)), 1)
+        self.owner = name is None
+        self.shm = SharedMemory(create=True, size=size) if self.owner else SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        self.array = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> "SharedFrames":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.unlink()
+
+
+class ViewRenderer(object):
+    """A LatticeSystem and NumPy renderer that render views into a frame array.
+    LOD hysteresis is off, so a frame only depends on its own view and not on
+    what was rendered before it
+    """
+
+    def __init__(self, frames: np.ndarray, lod: bool = True) -> None:
+        self.frames = frames
+        self.system = LatticeSystem(point_store=BoundedLatticeStore(POINT_CAPACITY), lod=lod, renderer=NumpyRenderer())
+        self.system.lod_hysteresis = 1.0
+        self.backdrop = disc_backdrop(frames.shape[2], frames.shape[1])
+
+    def render(self, index: int, coord: LatticeCoord, transform: PolarTransform) -> None:
+        frame = self.frames[index]
+        self.system.set_view_origin(coord, transform)
+        np.copyto(frame, self.backdrop)
+        self.system.render_walkers(frame, None, False)
+
+    def render_chunk(self, start: int, coords: list, polar: np.ndarray) -> int:
+        """Renders views start, start + 1, ... given as coords and (k, 3) (n, s, m) rows"""
+        for i, (coord, (n, s, m)) in enumerate(zip(coords, polar.tolist())):
+            self.render(start + i, coord, PolarTransform(n, s, m))
+        return len(coords)
+
+
+# Set in each pool worker by _init_worker
+_worker = None
+
+def _init_worker(name: str, count: int, width: int, height: int, lod: bool) -> None:
+    global _worker
+    frames = SharedFrames(count, width, height, name=name)
+    _worker = (frames, ViewRenderer(frames.array, lod))
+
+def _render_chunk(task: tuple) -> int:
+    return _worker[1].render_chunk(*task)
+
+def _polar_views(views: list) -> tuple:
+    """Splits (coord, transform) views into a coord list and an (N, 3) (n, s, m) array"""
+    coords = []
+    polar = np.empty((len(views), 3))
+    for i, (coord, transform) in enumerate(views):
+        if isinstance(transform, LorentzTransform):
+            transform = transform.to_polar()
+        coords.append(coord)
+        polar[i] = transform.n, transform.s, transform.m
+    return coords, polar
+
+def render_views(views: list, frames: SharedFrames = None, processes: int = None, chunk_size: int = 16,
+                 progress=None, width: int = WIDTH, height: int = HEIGHT, lod: bool = True) -> SharedFrames:
+    """Renders a list of views into shared frames, frame i showing views[i] no
+    matter which worker rendered it or when
+
+    Args:
+        views (list): (LatticeCoord, PolarTransform or LorentzTransform) pairs
+        frames (SharedFrames, optional): where to render, created if not given
+        processes (int, optional): pool size, os.cpu_count() by default. With 0
+            everything is rendered in this process
+        chunk_size (int, optional): views handed to a worker at a time. Consecutive
+            views share a worker, so nearby views reuse its walker tree
+        progress (callable, optional): progress(done, total) after every chunk
+        width (int, optional): frame width, of frames created here
+        height (int, optional): frame height, of frames created here. The view is
+            scaled to fit whatever size the frames are, see
+            hyper.geometry.frame_viewport
+        lod (bool, optional): render with level of detail walkers
+
+    Returns:
+        SharedFrames: the frames, to be unlinked by the caller
+    """
+    owns_frames = frames is None
+    if owns_frames:
+        frames = SharedFrames(len(views), width, height)
+    try:
+        _render_into(frames, views, processes, chunk_size, progress, lod)
+    except BaseException:
+        # The caller never sees frames it didn't pass in, so they'd leak in /dev/shm
+        if owns_frames:
+            frames.unlink()
+        raise
+    return frames
+
+def _render_into(frames: SharedFrames, views: list, processes: int, chunk_size: int, progress, lod: bool) -> None:
+    count, height, width = frames.shape[:3]
+    if count < len(views):
+        raise ValueError("%d frames can't hold %d views" % (count, len(views)))
+    coords, polar = _polar_views(views)
+    tasks = [(start, coords[start:start + chunk_size], polar[start:start + chunk_size])
+             for start in range(0, len(views), chunk_size)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    done = 0
+    if processes == 0:
+        renderer = ViewRenderer(frames.array, lod)
+        for task in tasks:
+            done += renderer.render_chunk(*task)
+            if progress is not None:
+                progress(done, len(views))
+        return
+
+    with get_context().Pool(processes, _init_worker, (frames.name, count, width, height, lod)) as pool:
+        for rendered in pool.imap_unordered(_render_chunk, tasks):
+            done += rendered
+            if progress is not None:
+                progress(done, len(views))
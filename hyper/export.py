@@ -0,0 +1,150 @@
+"""Offline rendering of scripted camera paths to frame sequences, without pygame or
+a display. Frames come out of the NumPy raster renderer as fast as they can be
+computed and are streamed to a .npy memmap or a raw RGB24 pipe, e.g.
+
+    python -m hyper.export --frames 600 --raw - | ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x800 -r 60 -i - out.mp4
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from hyper.transforms import PolarTransform, LorentzTransform, LatticeTransform
+from hyper.system import LatticeSystem
+from hyper.lattice import LatticeCoord
+from hyper.raster import NumpyRenderer, disc_backdrop
+from hyper.store import BoundedLatticeStore
+
+WIDTH, HEIGHT = 800, 800
+
+
+def camera_path(system: LatticeSystem, motion, frames: int, transform: PolarTransform = None, coord: LatticeCoord = None):
+    """Views along a scripted camera path. Like the keyboard mode of main.py, the
+    base point is moved to the nearest lattice point after every step
+
+    Args:
+        system (LatticeSystem): system the path walks through
+        motion (callable): motion(transform, frame) moves the view's rel_transform
+            in place from one frame to the next
+        frames (int): number of views
+        transform (PolarTransform, optional): starting view, the origin by default
+        coord (LatticeCoord, optional): starting base point, the origin by default
+
+    Yields:
+        tuple: (LatticeCoord, rel_transform) of each frame, the transform is a copy
+    """
+    view = LatticeTransform(transform if transform is not None else LorentzTransform(0, 0, 0),
+                            coord if coord is not None else LatticeCoord([]), system)
+    for frame in range(frames):
+        yield view.base_point.coords, view.rel_transform.copy()
+        motion(view.rel_transform, frame)
+        view.shift_to_nearer_basepoint(False)
+
+def render_frames(system: LatticeSystem, views, width: int = WIDTH, height: int = HEIGHT, renderer: NumpyRenderer = None):
+    """Renders each (coord, transform) view over the disc backdrop
+
+    Yields:
+        np.ndarray: (height, width, 3) uint8 frame. The same buffer is reused for
+            every frame, copy it to keep it
+    """
+    if renderer is None:
+        renderer = NumpyRenderer()
+    system.renderer = renderer
+    backdrop = disc_backdrop(width, height)
+    frame = np.empty_like(backdrop)
+    for coord, transform in views:
+        system.set_view_origin(coord, transform)
+        np.copyto(frame, backdrop)
+        system.render_walkers(frame, None, False)
+        yield frame
+
+
+class MemmapFrameWriter(object):
+    """Writes frames into a (count, height, width, 3) uint8 .npy file through a
+    memory map, so the sequence never has to fit in memory and np.load(path,
+    mmap_mode='r') reads it back
+    """
+
+    def __init__(self, path: str, count: int, width: int = WIDTH, height: int = HEIGHT) -> None:
+        self.frames = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(count, height, width, 3))
+        self.written = 0
+
+    def write(self, frame: np.ndarray) -> None:
+        self.frames[self.written] = frame
+        self.written += 1
+
+    def close(self) -> None:
+        self.frames.flush()
+        del self.frames
+
+
+class PipeFrameWriter(object):
+    """Writes frames as raw RGB24 bytes to a binary stream, e.g. the stdin of an
+    ffmpeg rawvideo process
+    """
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.written = 0
+
+    def write(self, frame: np.ndarray) -> None:
+        self.stream.write(memoryview(np.ascontiguousarray(frame)).cast('B'))
+        self.written += 1
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+def export_frames(system: LatticeSystem, views, writer, width: int = WIDTH, height: int = HEIGHT) -> int:
+    """Renders every view and hands the frames to writer as they are produced
+
+    Returns:
+        int: number of frames written
+    """
+    try:
+        for frame in render_frames(system, views, width, height):
+            writer.write(frame)
+    finally:
+        writer.close()
+    return writer.written
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m hyper.export",
+                                     description="Render a scripted camera path through the tiling to a frame sequence")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--npy", metavar="PATH", help="write a (frames, height, width, 3) uint8 .npy memmap")
+    output.add_argument("--raw", metavar="PATH", help="write raw RGB24 frames to this file, - for stdout")
+    parser.add_argument("--frames", type=int, default=600, help="number of frames")
+    parser.add_argument("--speed", type=float, default=0.04, help="distance moved forward per frame")
+    parser.add_argument("--turn", type=float, default=0.0, help="rotation per frame, in radians")
+    args = parser.parse_args()
+
+    def motion(transform, frame):
+        transform.preapply_translation_z(args.speed)
+        transform.preapply_rotation(args.turn)
+
+    system = LatticeSystem(point_store=BoundedLatticeStore(20000), lod=True)
+    views = camera_path(system, motion, args.frames)
+    stream = None
+    if args.npy:
+        writer = MemmapFrameWriter(args.npy, args.frames)
+    elif args.raw == "-":
+        writer = PipeFrameWriter(sys.stdout.buffer)
+    else:
+        stream = open(args.raw, "wb")
+        writer = PipeFrameWriter(stream)
+
+    start = time.perf_counter()
+    try:
+        count = export_frames(system, views, writer)
+    finally:
+        if stream is not None:
+            stream.close()
+    elapsed = time.perf_counter() - start
+    print("%d frames in %.2f s (%.1f fps)" % (count, elapsed, count / elapsed), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
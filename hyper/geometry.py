@@ -0,0 +1,143 @@
+import numpy as np
+
+import hyper.hyper_utils as hyper_utils
+from hyper.tiling import edge_length
+
+SCALE = 400
+# The lattice is the {4,5} tiling, squares with 5 around every vertex, so every point
+# has DIRECTIONS neighbours DIRECTION_ANGLE apart, BRANCH_LENGTH away
+TILING = (4, 5)
+DIRECTIONS: int = TILING[1]
+DIRECTION_ANGLE: float = 2*np.pi/DIRECTIONS
+BRANCH_LENGTH: float = edge_length(*TILING)
+DEPTH: int = 3
+# (minimum tile footprint in pixels, sample increment) from finest to coarsest
+LOD_SAMPLE_INCREMENTS = ((60, 0.15), (15, 0.3), (0, 0.6))
+# Branches drawn from the vertex of a tile; BRANCH2 tiles draw a second one
+BRANCH_ANGLES = (0,)
+BRANCH2_ANGLES = (0, DIRECTION_ANGLE)
+# (branch angles, sample increment, branch length) -> tile_mesh
+TILE_MESHES = {}
+
+def frame_viewport(width: int, height: int) -> tuple:
+    """(scale, center) of the largest disc that fits a width x height frame, centered
+    in it. An 800 x 800 frame gives (SCALE, (SCALE, SCALE)), the window of main.py
+    """
+    return min(width, height) / 2, (width / 2, height / 2)
+
+def scale_to_screen(point: np.ndarray, scale: float = SCALE, center: tuple = None) -> np.ndarray:
+    """Poincare disc points to pixels, for a disc of radius scale around center,
+    (scale, scale) by default
+    """
+    if center is None:
+        return point * scale + scale
+    offset = np.full(point.shape[-1], float(scale))
+    offset[:2] = center
+    return point * scale + offset
+
+def project_onto_screen(point: np.ndarray, scale: float = SCALE, center: tuple = None) -> np.ndarray:
+    return scale_to_screen(hyper_utils.project_onto_poincare_disc(point), scale, center)
+
+def screen_to_disc(pixels: np.ndarray) -> np.ndarray:
+    """Inverse of scale_to_screen, (..., 2) pixels to Poincare disc points"""
+    return (np.asarray(pixels, dtype=float) - SCALE) / SCALE
+
+def tile_footprint(distance: np.ndarray) -> np.ndarray:
+    """Approximate on-screen length in pixels of a branch whose vertex is at a given
+    hyperbolic distance from the disc centre. The Poincare disc shrinks lengths by
+    (1 - r^2) / 2 at Euclidean radius r = tanh(distance / 2)
+    """
+    r = np.tanh(np.asarray(distance) / 2)
+    return SCALE * BRANCH_LENGTH * (1 - r * r) / 2
+
+def tile_mesh(branch_angles: tuple, inc: float = 0.3, line_length: float = BRANCH_LENGTH) -> np.ndarray:
+    """Local frame vertices of a tile's branches, sampled every inc like draw_line.
+    Tile geometry never changes, so each (branch angles, density) mesh is built once
+    and cached; a renderer only multiplies it by each tile's transform
+
+    Args:
+        branch_angles (tuple): angle of each branch drawn from the tile vertex
+        inc (float, optional): sampling distance along a branch
+        line_length (float, optional): length of a branch
+
+    Returns:
+        np.ndarray: read-only, contiguous (branches, K, 3) hyperboloid points
+    """
+    key = (branch_angles, inc, line_length)
+    mesh = TILE_MESHES.get(key)
+    if mesh is None:
+        radii = np.arange(0, line_length, inc)
+        mesh = np.empty((len(branch_angles), len(radii), 3))
+        for i, angle in enumerate(branch_angles):
+            for j, r in enumerate(radii):
+                mesh[i, j] = hyper_utils.polar_vector(r, angle)[:3]
+        mesh.setflags(write=False)
+        TILE_MESHES[key] = mesh
+    return mesh
+
+def mesh_polylines(transforms: np.ndarray, mesh: np.ndarray, scale: float = SCALE, center: tuple = None) -> np.ndarray:
+    """Screen polylines of the same tile mesh under a stack of transforms. All mesh
+    vertices are transformed and projected together
+
+    Args:
+        transforms (np.ndarray): (N, 4, 4) transform matrices, or their (N, 3, 3) reduced form
+        mesh (np.ndarray): (branches, K, 3) mesh from tile_mesh
+        scale (float, optional): disc radius in pixels, see scale_to_screen
+        center (tuple, optional): disc centre in pixels
+
+    Returns:
+        np.ndarray: (N * branches, K, 2) polylines
+    """
+    samples = mesh.shape[1]
+    points = transforms[:, :3, :3] @ mesh.reshape(-1, 3).T
+    points = project_onto_screen(np.swapaxes(points, 1, 2), scale, center)
+    return points.reshape(-1, samples, 2)
+
+def tile_geometry(transforms: np.ndarray, branch2: np.ndarray, footprints: np.ndarray = None, scale: float = SCALE, center: tuple = None) -> tuple:
+    """Everything LatticePoint.render_point draws for N tiles, without labels, in
+    screen space
+
+    Args:
+        transforms (np.ndarray): (N, 4, 4) or (N, 3, 3) transform matrices of the tiles
+        branch2 (np.ndarray): (N,) bool mask of BRANCH2 tiles, which draw a second branch
+        footprints (np.ndarray, optional): (N,) tile_footprint of each tile. If given,
+            branches are sampled more finely on large tiles and coarsely on small ones
+            (LOD_SAMPLE_INCREMENTS), otherwise every 0.3 like draw_line
+        scale (float, optional): disc radius in pixels, see frame_viewport. Vertex
+            circles are scaled with it, footprints are taken as they are
+        center (tuple, optional): disc centre in pixels
+
+    Returns:
+        tuple: (list of (M, K, 2) polyline blocks, (N, 3) screen positions of the tile
+                vertices with (x, y) first, (N,) vertex circle radii)
+    """
+    if footprints is None:
+        levels = [(np.ones(len(transforms), dtype=bool), 0.3)]
+    else:
+        levels = []
+        upper = np.inf
+        for min_pixels, inc in LOD_SAMPLE_INCREMENTS:
+            levels.append(((footprints >= min_pixels) & (footprints < upper), inc))
+            upper = min_pixels
+    polylines = []
+    for level, inc in levels:
+        for mask, angles in ((level & ~branch2, BRANCH_ANGLES), (level & branch2, BRANCH2_ANGLES)):
+            if mask.any():
+                polylines.append(mesh_polylines(transforms[mask], tile_mesh(angles, inc), scale, center))
+
+    screen_pos = project_onto_screen(transforms[:, :, 0], scale, center)
+    if center is None:
+        screen_pos_length = np.linalg.norm(screen_pos[:, :2]/scale - 1, axis=1)
+    else:
+        screen_pos_length = np.linalg.norm((screen_pos[:, :2] - center)/scale, axis=1)
+    radii = 10*(1.5 - screen_pos_length) * (scale / SCALE)
+    return polylines, screen_pos, radii
+
+def bounding_box(points: np.ndarray, pad: float = 0) -> tuple:
+    """Smallest integer (x, y, width, height) box holding (..., 2) screen points,
+    grown by pad on every side
+    """
+    points = points.reshape(-1, 2)
+    x0, y0 = np.floor(points.min(axis=0) - pad)
+    x1, y1 = np.ceil(points.max(axis=0) + pad)
+    return int(x0), int(y0), int(x1 - x0) + 1, int(y1 - y0) + 1
@@ -21,12 +21,95 @@ def translation_mat_z(y_trans: float) -> np.ndarray:
                   [0, 0, 0, 0]])
     return P
 
+def polar_matrix3(n: np.ndarray, s: np.ndarray, m: np.ndarray) -> np.ndarray:
+    """Closed form of rotation_mat(n) @ translation_mat_z(s) @ rotation_mat(m),
+    reduced to the 3x3 block that acts on (2+1)-dimensional points.
+    Broadcasts over arrays, giving a (..., 3, 3) stack
+    """
+    cn, sn = np.cos(n), np.sin(n)
+    cm, sm = np.cos(m), np.sin(m)
+    ch, sh = np.cosh(s), np.sinh(s)
+    P = np.empty(np.broadcast(cn, sh, cm).shape + (3, 3))
+    P[..., 0, 0] = ch
+    P[..., 0, 1] = sh * cm
+    P[..., 0, 2] = -sh * sm
+    P[..., 1, 0] = cn * sh
+    P[..., 1, 1] = cn * ch * cm - sn * sm
+    P[..., 1, 2] = -cn * ch * sm - sn * cm
+    P[..., 2, 0] = sn * sh
+    P[..., 2, 1] = sn * ch * cm + cn * sm
+    P[..., 2, 2] = cn * cm - sn * ch * sm
+    return P
+
+def polar_matrix(n: np.ndarray, s: np.ndarray, m: np.ndarray) -> np.ndarray:
+    """4x4 form of polar_matrix3, laid out like rotation_mat and translation_mat_z"""
+    P3 = polar_matrix3(n, s, m)
+    P = np.zeros(P3.shape[:-2] + (4, 4))
+    P[..., :3, :3] = P3
+    return P
+
+def polar_from_matrix3(P: np.ndarray) -> tuple:
+    """Inverse of polar_matrix3, reads (n, s, m) back off a (..., 3, 3) matrix.
+    s is always >= 0. At s = 0 only n + m is defined, so it is all put into m
+    """
+    s = np.arcsinh(np.hypot(P[..., 1, 0], P[..., 2, 0]))
+    at_origin = s < 1e-12
+    n = np.where(at_origin, 0.0, np.arctan2(P[..., 2, 0], P[..., 1, 0]))
+    m = np.where(at_origin, np.arctan2(P[..., 2, 1], P[..., 1, 1]), np.arctan2(-P[..., 0, 2], P[..., 0, 1]))
+    return n, s, m
+
+def lorentz_renormalize(P: np.ndarray) -> np.ndarray:
+    """Pulls drifted (..., 3, 3) products back onto SO(2,1) by reading their polar
+    form off and rebuilding the matrix from it. Unlike Gram-Schmidt with the metric
+    diag(1, -1, -1), nothing cancels, so it holds up for translations far from the
+    origin where cosh^2 - sinh^2 loses every digit
+    """
+    return polar_matrix3(*polar_from_matrix3(P))
+
+def polar_point(n: np.ndarray, s: np.ndarray) -> np.ndarray:
+    """Hyperboloid point of the origin moved by polar_matrix(n, s, m), (..., 3)"""
+    sh = np.sinh(s)
+    return np.stack(np.broadcast_arrays(np.cosh(s), sh * np.cos(n), sh * np.sin(n)), axis=-1)
+
+def polar_disc_point(n: np.ndarray, s: np.ndarray) -> np.ndarray:
+    """project_onto_poincare_disc of polar_vector(s, n) padded like a 4-vector
+    projection, computed directly as tanh(s/2) * (cos(n), sin(n), 0)
+    """
+    r = np.tanh(s / 2)
+    return np.stack(np.broadcast_arrays(r * np.cos(n), r * np.sin(n), np.zeros_like(r)), axis=-1)
+
 def polar_vector(r: float, theta: float) -> np.ndarray:
     return np.array([np.cosh(r),
                      np.sinh(r) * np.cos(theta),
                      np.sinh(r) * np.sin(theta),
                      0])
 
+def disc_to_hyperboloid(point: np.ndarray) -> np.ndarray:
+    """Inverse of project_onto_poincare_disc for (..., 2) points inside the unit disc"""
+    r2 = np.sum(point * point, axis=-1, keepdims=True)
+    scale = 1 / (1 - r2)
+    return np.concatenate(((1 + r2) * scale, 2 * point * scale), axis=-1)
+
+def minkowski_inverse(P: np.ndarray) -> np.ndarray:
+    """Inverse of (..., 3, 3) SO(2,1) matrices, J P^T J with J = diag(1, -1, -1)"""
+    inverse = np.swapaxes(P, -1, -2).copy()
+    inverse[..., 0, 1:] *= -1
+    inverse[..., 1:, 0] *= -1
+    return inverse
+
+def minkowski_products(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, M) Minkowski products of (N, 3) and (M, 3) points, one matrix product.
+    For hyperboloid points they are cosh of the distances, which is enough to
+    compare distances without any arccosh
+    """
+    return a @ (b * np.array([1, -1, -1])).T
+
+def hyperbolic_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Geodesic distances between every one of (N, 3) hyperboloid points a and
+    every one of (M, 3) points b, as (N, M)
+    """
+    return np.arccosh(np.maximum(minkowski_products(a, b), 1))
+
 def project_onto_poincare_disc(point: np.ndarray) -> np.ndarray:
-    scale = 1 / (point[0] + 1)
-    return point[1:] * scale
\ No newline at end of file
+    scale = 1 / (point[..., :1] + 1)
+    return point[..., 1:] * scale
\ No newline at end of file
@@ -1,11 +1,12 @@
-import pygame
 from enum import Enum
 import numpy as np
 import copy
 from typing import ForwardRef
 
 
-from hyper.render_utils import SCALE, BRANCH_LENGTH, draw_line
+from hyper.geometry import (SCALE, BRANCH_LENGTH, TILING, DIRECTIONS, DIRECTION_ANGLE, BRANCH_ANGLES, BRANCH2_ANGLES,
+                            tile_mesh, mesh_polylines)
+from hyper.tiling import get_automaton
 from hyper.transforms import PolarTransform
 
 class LatticeType(Enum):
@@ -14,147 +15,140 @@ class LatticeType(Enum):
     BRANCH3 = 2
     INVALID = 4
     
+def get_tile_mesh(lattice_type: "LatticeType", inc: float = 0.3) -> np.ndarray:
+    """Cached tile_mesh of a lattice point of a given type"""
+    if lattice_type == LatticeType.BRANCH2:
+        return tile_mesh(BRANCH2_ANGLES, inc)
+    return tile_mesh(BRANCH_ANGLES, inc)
+    
+# Coordinate tables of the tiling, every coord carries its automaton state at each digit
+AUTOMATON = get_automaton(*TILING)
+STATE_TYPES = tuple(LatticeType.ORIGIN if state == AUTOMATON.root else
+                    LatticeType.BRANCH2 if AUTOMATON.child_count[state] == 2 else LatticeType.BRANCH3
+                    for state in range(AUTOMATON.n_states))
+# The tables as arrays for the vectorized enumeration, padded with -1 past the children of a state
+CHILD_COUNTS = np.array(AUTOMATON.child_count)
+CHILD_STATES = np.full((AUTOMATON.n_states, CHILD_COUNTS.max()), -1, dtype=np.int16)
+CHILD_DIRECTIONS = np.full((AUTOMATON.n_states, CHILD_COUNTS.max()), -1, dtype=np.int8)
+for _state in range(AUTOMATON.n_states):
+    CHILD_STATES[_state, :CHILD_COUNTS[_state]] = AUTOMATON.child_state[_state]
+    CHILD_DIRECTIONS[_state, :CHILD_COUNTS[_state]] = AUTOMATON.child_direction[_state]
+BRANCH2_STATES = np.array([lattice_type == LatticeType.BRANCH2 for lattice_type in STATE_TYPES])
+ROOT_STATE = AUTOMATON.root
+CHILD_DIRECTION = AUTOMATON.child_direction
+    
 class LatticeCoord(object):
+    """Immutable lattice coordinate. The digits are packed one per byte in a bytes
+    object, so hashing, equality and ordering run at C speed, and states holds the
+    state of AUTOMATON after each digit. Neighbours are table lookups on the last
+    state, see hyper.tiling. Type and leaf direction are cached.
+    """
+    
+    __slots__ = ('digits', 'states', 'type', 'leaf_direction')
+    # Tables of the tiling, shared with hyper.tiling.TilingCoord's automaton slot
+    automaton = AUTOMATON
     
     def __init__(self, d_coord: list) -> None:
-        self.coord = d_coord
-        self.type = self.find_type()
+        digits = bytes(d_coord)
+        object.__setattr__(self, 'digits', digits)
+        object.__setattr__(self, 'states', AUTOMATON.run(digits))
+        object.__setattr__(self, 'type', self.find_type())
+        object.__setattr__(self, 'leaf_direction', self.find_direction_of_leaf())
+    
+    @classmethod
+    def from_valid_digits(cls, digits: bytes) -> "LatticeCoord":
+        """Builds a coord from digits that are known to be valid"""
+        return cls.from_tables(digits, AUTOMATON.run(digits))
+    
+    @classmethod
+    def from_tables(cls, digits: bytes, states: bytes) -> "LatticeCoord":
+        """Builds a coord from valid digits and their states, without running the automaton"""
+        coord = cls.__new__(cls)
+        _set_digits(coord, digits)
+        _set_states(coord, states)
+        if digits:
+            _set_type(coord, STATE_TYPES[states[-1]])
+            _set_leaf_direction(coord, CHILD_DIRECTION[states[-2] if len(states) > 1 else ROOT_STATE][digits[-1]])
+        else:
+            _set_type(coord, LatticeType.ORIGIN)
+            _set_leaf_direction(coord, 0)
+        return coord
+    
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("LatticeCoord is immutable")
+    
+    def __reduce__(self):
+        return (LatticeCoord, (self.digits,))
+    
+    def __copy__(self) -> "LatticeCoord":
+        return self
+    
+    def __deepcopy__(self, memo: dict) -> "LatticeCoord":
+        return self
+    
+    def __hash__(self) -> int:
+        return hash(self.digits)
+    
+    def __eq__(self, obj: object) -> bool:
+        if isinstance(obj, LatticeCoord):
+            return self.digits == obj.digits
+        return NotImplemented
+    
+    def __lt__(self, obj: "LatticeCoord") -> bool:
+        return self.compare_to(obj) < 0
+    
+    def __len__(self) -> int:
+        return len(self.digits)
+    
+    @property
+    def coord(self) -> list:
+        """The digits as a new list"""
+        return list(self.digits)
     
     def find_type(self) -> LatticeType:
-        coord_len = len(self.coord)
-        
-        # If the list is empty, it is ORIGIN
-        if coord_len == 0:
-            return LatticeType.ORIGIN
-        
-        # Checking for validity
-        if self.coord[0] > 4:
+        # The automaton rejects digits that aren't a path down the tree
+        if self.states is None:
             return LatticeType.INVALID
-        prev = 1
-        for i in range(1, coord_len):
-            if prev == 0 and self.coord[i] > 1:
-                return LatticeType.INVALID
-            if prev > 0 and self.coord[i] > 2:
-                return LatticeType.INVALID
-            prev=self.coord[i]
-        
-        # Checking whether BRANCH2 or BRANCH3
-        if coord_len == 1:
-            return LatticeType.BRANCH3
-        if self.coord[-1] == 0:
-            return LatticeType.BRANCH2
-        return LatticeType.BRANCH3
+        return STATE_TYPES[AUTOMATON.state(self.states)]
     
     def coord_in_direction(self, direction: int) -> "LatticeCoord":
-        direction = direction % 5
         if self.type == LatticeType.INVALID:
             return
-        if self.type == LatticeType.ORIGIN:
-            return LatticeCoord([direction])
-        
-        coord_copy = copy.deepcopy(self.coord)
-        if direction == 0:
-            coord_copy.pop()
-            return LatticeCoord(coord_copy)
-        if self.type == LatticeType.BRANCH2:
-            if direction == 1:
-                coord_copy.pop()
-                coord_copy_len = len(coord_copy)
-                index = coord_copy_len - 1
-                while (coord_copy[index] == 0 and index > 0):
-                    index -= 1
-                branch2_rooted = False
-                if (index >= 1 and coord_copy[index] > 1) or index == 0:
-                    branch2_rooted = True
-                coord_copy[index] = (coord_copy[index]-1+5) % 5
-                index += 1
-                if index < coord_copy_len:
-                    if branch2_rooted:
-                        coord_copy[index] = 2
-                    else:
-                        coord_copy[index] = 1
-                    
-                    index += 1
-                    while index < coord_copy_len:
-                        coord_copy[index] = 2
-                        index += 1
-                return LatticeCoord(coord_copy)
-                    
-            elif direction == 2:
-                coord_copy.append(0)
-                return LatticeCoord(coord_copy)
-            elif direction == 3:
-                coord_copy.append(1)
-                return LatticeCoord(coord_copy)
-            elif direction == 4:
-                coord_copy.append(0)
-                coord_copy[-2] = 1
-                return LatticeCoord(coord_copy)
-        if self.type == LatticeType.BRANCH3:
-            if direction == 1:
-                coord_copy.append(0)
-                return LatticeCoord(coord_copy)
-            elif direction == 2:
-                coord_copy.append(1)
-                return LatticeCoord(coord_copy)
-            elif direction == 3:
-                coord_copy.append(2)
-                return LatticeCoord(coord_copy)
-            elif direction == 4:
-                if len(self.coord) == 1:
-                    return LatticeCoord([(coord_copy[0]+1)%5, 0])
-                coord_copy.append(2)
-                index = len(coord_copy) - 1
-                while coord_copy[index] == 2 and index > 0:
-                    coord_copy[index] = 0
-                    index -= 1
-                if index == 0 or coord_copy[index - 1] != 0:
-                    coord_copy[index] = (coord_copy[index]+1)%5
-                    return LatticeCoord(coord_copy)
-                coord_copy[index - 1] = 1
-                coord_copy[index] = 0
-                return LatticeCoord(coord_copy)
-                
-        return
+        digits, states = AUTOMATON.neighbor(self.digits, self.states, direction)
+        return LatticeCoord.from_tables(digits, states)
+    
+    def find_direction_of_leaf(self) -> int:
+        if self.states is None:
+            return 0
+        return AUTOMATON.leaf_direction(self.digits, self.states)
         
     def direction_of_leaf(self) -> int:
-        coord_len = len(self.coord)
-        if coord_len == 0:
-            return 0
-        if coord_len == 1:
-            return self.coord[0]
-        branch3 = False
-        if coord_len == 2 or self.coord[-2] != 0:
-            branch3 = True
-        if branch3:
-            return self.coord[-1] + 1
-        else:
-            return self.coord[-1] + 2 
+        return self.leaf_direction
         
     def direction_after_travel(self, direction: int) -> int:
-        direction = direction % 5
         if self.type == LatticeType.INVALID:
             return -1
-        if self.type == LatticeType.ORIGIN:
-            return 0
-        if direction == 0:
-            return self.direction_of_leaf()
-        if self.type == LatticeType.BRANCH2:
-            if direction == 1:
-                return 4
-            elif direction == 4:
-                return 1
-            else:
-                return 0
-        if self.type == LatticeType.BRANCH3:
-            if direction == 4:
-                return 1
-            else:
-                return 0 
-        return -1 
+        return AUTOMATON.turn(self.digits, self.states, direction)
     
     def angle_of_leaf(self) -> float:
-        return self.direction_of_leaf() * 2*np.pi / 5
+        return self.leaf_direction * DIRECTION_ANGLE
+    
+    def distance_to(self, other: "LatticeCoord") -> int:
+        """Number of lattice edges on a shortest path to other, None if either is invalid.
+        See LatticeSystem.paths to cache repeated queries
+        """
+        if self.type == LatticeType.INVALID or other.type == LatticeType.INVALID:
+            return None
+        return AUTOMATON.distance((self.digits, self.states), (other.digits, other.states))
+    
+    def path_to(self, other: "LatticeCoord") -> list:
+        """A shortest path to other, as the coords from this one to other, None if
+        either is invalid
+        """
+        if self.type == LatticeType.INVALID or other.type == LatticeType.INVALID:
+            return None
+        path = AUTOMATON.path((self.digits, self.states), (other.digits, other.states))
+        return [LatticeCoord.from_tables(digits, states) for digits, states in path]
     
     def compare_to(self, obj: object) -> int:
         if isinstance(obj, LatticeCoord):
@@ -164,28 +158,31 @@ class LatticeCoord(object):
         else:
             return 2
         
-        coord_len = len(self.coord)
-        c_len = len(C.coord)
+        coord_len = len(self.digits)
+        c_len = len(C.digits)
         
         if coord_len > c_len:
             return 1
         if coord_len < c_len:
             return -1
-        for i in range(coord_len):
-            if self.coord[i] < C.coord[i]:
-                return -1
-            elif self.coord[i] > C.coord[i]:
-                return 1
-        return 0
+        if self.digits == C.digits:
+            return 0
+        if self.digits < C.digits:
+            return -1
+        return 1
+    
+    def key(self) -> bytes:
+        """Hashable, canonical key of this coordinate, used by LatticeStore"""
+        return self.digits
     
     def to_string(self) -> str:
-        s = '<'
-        for i in range(len(self.coord)):
-            s += str(int(self.coord[i]))
-            if i != len(self.coord) - 1:
-                s += ','
-        s += '>'
-        return s
+        return '<' + ','.join(map(str, self.digits)) + '>'
+    
+# The slot setters, which skip the immutability check of __setattr__ in from_tables
+_set_digits = LatticeCoord.digits.__set__
+_set_states = LatticeCoord.states.__set__
+_set_type = LatticeCoord.type.__set__
+_set_leaf_direction = LatticeCoord.leaf_direction.__set__
     
 class LatticePoint(object):
 
@@ -193,31 +190,88 @@ class LatticePoint(object):
         self.coords = d_coord
         self.system = d_system
         self.attached_walker = None
+        self.neighbors = [None] * DIRECTIONS
+        self.neighbor_turns = [0] * DIRECTIONS
     
     def compare_to(self, obj: object):
         return self.coords.compare_to(obj)
     
+    def link_neighbor(self, direction: int, neighbor: "LatticePoint") -> None:
+        """Caches neighbor as the point in a direction, and caches this point
+        as the neighbor's point in the direction back
+
+        Args:
+            direction (int): direction from this point to neighbor
+            neighbor (LatticePoint): the point in that direction
+        """
+        direction = direction % DIRECTIONS
+        turn = self.coords.direction_after_travel(direction)
+        self.neighbors[direction] = neighbor
+        self.neighbor_turns[direction] = turn
+        neighbor.neighbors[turn % DIRECTIONS] = self
+        neighbor.neighbor_turns[turn % DIRECTIONS] = direction
+    
+    def point_in_direction(self, direction: int) -> "LatticePoint":
+        """Gets the neighboring lattice point in a direction, generating it if needed"""
+        direction = direction % DIRECTIONS
+        neighbor = self.neighbors[direction]
+        if neighbor is None:
+            neighbor = self.system.get_lattice_point(self.coords.coord_in_direction(direction))
+            self.link_neighbor(direction, neighbor)
+        return neighbor
+    
+    def point_in_direction_if_exists(self, direction: int) -> "LatticePoint":
+        direction = direction % DIRECTIONS
+        neighbor = self.neighbors[direction]
+        if neighbor is None:
+            neighbor = self.system.get_lattice_point_if_exists(self.coords.coord_in_direction(direction))
+            if neighbor is not None:
+                self.link_neighbor(direction, neighbor)
+        return neighbor
+    
+    def turn_in_direction(self, direction: int) -> int:
+        """Cached equivalent of coords.direction_after_travel(direction)"""
+        direction = direction % DIRECTIONS
+        if self.neighbors[direction] is None:
+            self.point_in_direction(direction)
+        return self.neighbor_turns[direction]
+    
     def to_string(self) -> str:
         return self.coords.to_string()
     
-    def render_point(self, p_transform: PolarTransform, graphic: pygame.Surface, font: pygame.font, print_text: bool) -> None:
-        transform = p_transform.get_matrix()
+    def render_point(self, p_transform: PolarTransform, graphic, font, print_text: bool) -> None:
+        """Draws the tile with the system's renderer, graphic is its draw target"""
+        renderer = self.system.renderer
+        transform = p_transform.get_matrix3()
         if True:
-            draw_line(graphic, transform, line_length=BRANCH_LENGTH)
-            if self.coords.type == LatticeType.BRANCH2:
-                draw_line(graphic, transform, angle=2*np.pi/5, line_length=BRANCH_LENGTH)
+            renderer.draw_polylines(graphic, mesh_polylines(transform[np.newaxis], get_tile_mesh(self.coords.type)))
 
             screen_pos = p_transform.pos_on_screen()
             screen_pos_length = np.linalg.norm(np.array([(screen_pos[0]/SCALE)-1, (screen_pos[1]/SCALE)-1]))
             
-            pygame.draw.circle(graphic, 'black', pygame.Vector2(screen_pos[0], screen_pos[1]), 10*(1.5 - screen_pos_length))
+            renderer.draw_circles(graphic, screen_pos[np.newaxis, :2], np.array([10*(1.5 - screen_pos_length)]))
             if print_text:
-                text_render = font.render(self.to_string(), True, (255, 255, 255))
-                graphic.blit(text_render, (screen_pos[0], screen_pos[1]))
+                text_render = self.system.label_cache.get(font, self.coords.key(), self.to_string)
+                renderer.draw_labels(graphic, [text_render], screen_pos[np.newaxis])
     
     def update(self) -> None:
         pass
     
+    def schedule_updates(self, interval: int = 1) -> None:
+        """Points only get update() calls once they register with the system's
+        scheduler, which calls them every interval frames while they are near the viewer
+        """
+        self.system.scheduler.register(self, interval)
+    
+    def unschedule_updates(self) -> None:
+        self.system.scheduler.unregister(self)
+    
+    def sleep(self) -> None:
+        self.system.scheduler.sleep(self)
+    
+    def wake(self) -> None:
+        self.system.scheduler.wake(self)
+    
 class LatticeCircularIterator(object):
     
     def __init__(self, d_radius: int) -> None:
@@ -233,45 +287,187 @@ class LatticeCircularIterator(object):
         if self.first:
             return True
         
-        for i in range(len(self.this_coord.coord)):
-            if self.this_coord.coord[i] != 0:
-                return True
-        return False
+        return any(self.this_coord.digits)
     
     def next_coord(self) -> LatticeCoord:
-        copy_coord = copy.deepcopy(self.this_coord.coord)
-        i = len(copy_coord) - 1
-        while i > 1:
-            if copy_coord[i - 1] == 0:
-                # BRANCH 2
-                if copy_coord[i] < 1:
-                    copy_coord[i] += 1
-                    return LatticeCoord(copy_coord)
-                copy_coord[i] = 0
-            else:
-                # BRANCH 3
-                if copy_coord[i] < 2:
-                    copy_coord[i] += 1
-                    return LatticeCoord(copy_coord)
-                copy_coord[i] = 0
-            i -= 1
-        
-        # BRANCH 3
-        i = 1
-        if copy_coord[i] < 2:
-            copy_coord[i] += 1
-            return LatticeCoord(copy_coord)
-        
-        # ORIGIN
-        copy_coord[i] = 0
-        copy_coord[0] = (copy_coord[0]+1+5)%5
-        return LatticeCoord(copy_coord)
+        """The ring successor, back to the first coord after the last one"""
+        coord = self.this_coord
+        return LatticeCoord.from_tables(*AUTOMATON.successor(coord.digits, coord.states))
     
     def next(self) -> LatticeCoord:
         self.first = False
         self.this_coord = self.next_coord()
         return self.this_coord
     
+def _expand_ring(parent_digits: np.ndarray, parent_states: np.ndarray) -> tuple:
+    """Children of a block of coords of one ring, in canonical order
+
+    Args:
+        parent_digits (np.ndarray): (N, k) digits of coords of length k
+        parent_states (np.ndarray): (N, k) their states
+
+    Returns:
+        tuple: ((M, k + 1) child digits, (M, k + 1) child states, (M,) row of each
+            child's parent in the block)
+    """
+    count, length = parent_digits.shape
+    last_states = parent_states[:, -1] if length > 0 else np.full(count, AUTOMATON.root)
+    counts = CHILD_COUNTS[last_states]
+    rows = np.repeat(np.arange(count), counts)
+    starts = np.cumsum(counts) - counts
+    child_digit = np.arange(len(rows)) - starts[rows]
+    # np.take copies whole rows, far faster than fancy indexing the (N, k) arrays
+    digits = np.empty((len(rows), length + 1), dtype=np.uint8)
+    digits[:, :length] = np.take(parent_digits, rows, axis=0)
+    digits[:, length] = child_digit
+    states = np.empty((len(rows), length + 1), dtype=np.uint8)
+    states[:, :length] = np.take(parent_states, rows, axis=0)
+    states[:, length] = CHILD_STATES[np.take(last_states, rows), child_digit]
+    return digits, states, rows
+
+def _ring_blocks(radius: int, chunk_size: int):
+    """Yields (index in ring of the first coord, (N, radius) digits, (N, radius) states,
+    (N,) index in the previous ring of each parent) blocks of at most chunk_size
+    coords, covering the ring of the given radius in canonical order. Only one
+    block per ring below is held at a time
+    """
+    if radius == 0:
+        yield 0, np.zeros((1, 0), dtype=np.uint8), np.zeros((1, 0), dtype=np.uint8), np.full(1, -1)
+        return
+    start = 0
+    for parent_start, parent_digits, parent_states, _ in _ring_blocks(radius - 1, chunk_size):
+        digits, states, rows = _expand_ring(parent_digits, parent_states)
+        for offset in range(0, len(digits), chunk_size):
+            block = slice(offset, offset + chunk_size)
+            yield start, digits[block], states[block], parent_start + rows[block]
+            start += len(digits[block])
+
+def ring_sizes(radius: int) -> list:
+    """Number of valid coords of each length 0 to radius"""
+    return AUTOMATON.ring_sizes(radius)
+
+def leaf_directions(digits: np.ndarray, states: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Vectorized LatticeCoord.find_direction_of_leaf over padded digits and states"""
+    count = len(lengths)
+    directions = np.zeros(count, dtype=np.int8)
+    if digits.shape[1] == 0:
+        return directions
+    rows = np.arange(count)
+    last = digits[rows, np.maximum(lengths - 1, 0)]
+    parent_states = np.where(lengths >= 2, states[rows, np.maximum(lengths - 2, 0)], AUTOMATON.root)
+    directions[:] = CHILD_DIRECTIONS[parent_states, last]
+    directions[lengths == 0] = 0
+    return directions
+
+
+class LatticeCoordArray(object):
+    """Struct-of-arrays storage for N lattice coords, in canonical order (by radius,
+    then lexicographically, like LatticeCoord.compare_to).
+
+    digits and states are (N, width) and padded with zeros past each coord's
+    length. parents holds the index of each coord's parent (coord_in_direction(0))
+    in the full canonical enumeration, -1 for the origin.
+    """
+    
+    def __init__(self, digits: np.ndarray, states: np.ndarray, lengths: np.ndarray, parents: np.ndarray, leaf_directions: np.ndarray) -> None:
+        self.digits = digits
+        self.states = states
+        self.lengths = lengths
+        self.parents = parents
+        self.leaf_directions = leaf_directions
+    
+    @classmethod
+    def up_to_radius(cls, radius: int) -> "LatticeCoordArray":
+        """Every valid coord with at most radius digits"""
+        sizes = ring_sizes(radius)
+        total = sum(sizes)
+        digits = np.zeros((total, radius), dtype=np.uint8)
+        states = np.zeros((total, radius), dtype=np.uint8)
+        lengths = np.repeat(np.arange(radius + 1), sizes)
+        parents = np.full(total, -1)
+        # Each ring is expanded once from the one below, straight into place
+        ring_digits, ring_states = digits[:1, :0], states[:1, :0]
+        parent_start, start = 0, 1
+        for length in range(1, radius + 1):
+            ring_digits, ring_states, rows = _expand_ring(ring_digits, ring_states)
+            end = start + len(rows)
+            digits[start:end, :length] = ring_digits
+            states[start:end, :length] = ring_states
+            parents[start:end] = parent_start + rows
+            parent_start, start = start, end
+        return cls(digits, states, lengths, parents, leaf_directions(digits, states, lengths))
+    
+    @classmethod
+    def ring(cls, radius: int) -> "LatticeCoordArray":
+        """Every valid coord with exactly radius digits, the coords LatticeCircularIterator
+        visits. parents index into the previous ring
+        """
+        _, digits, states, parents = next(_ring_blocks(radius, chunk_size=ring_sizes(radius)[-1]))
+        lengths = np.full(len(digits), radius)
+        return cls(digits, states, lengths, parents, leaf_directions(digits, states, lengths))
+    
+    @classmethod
+    def concatenate(cls, chunks: list) -> "LatticeCoordArray":
+        return cls(np.concatenate([chunk.digits for chunk in chunks]),
+                   np.concatenate([chunk.states for chunk in chunks]),
+                   np.concatenate([chunk.lengths for chunk in chunks]),
+                   np.concatenate([chunk.parents for chunk in chunks]),
+                   np.concatenate([chunk.leaf_directions for chunk in chunks]))
+    
+    def __len__(self) -> int:
+        return len(self.lengths)
+    
+    def __getitem__(self, index):
+        """An integer index gives a LatticeCoord, any other index a LatticeCoordArray"""
+        if isinstance(index, (int, np.integer)):
+            length = self.lengths[index]
+            return LatticeCoord.from_tables(self.digits[index, :length].tobytes(), self.states[index, :length].tobytes())
+        return LatticeCoordArray(self.digits[index], self.states[index], self.lengths[index], self.parents[index], self.leaf_directions[index])
+    
+    def coords(self) -> list:
+        return [LatticeCoord.from_tables(row[:length].tobytes(), states[:length].tobytes())
+                for row, states, length in zip(self.digits, self.states, self.lengths.tolist())]
+    
+    def branch2(self) -> np.ndarray:
+        """(N,) bool mask of BRANCH2 coords"""
+        if self.states.shape[1] == 0:
+            return np.zeros(len(self), dtype=bool)
+        last = self.states[np.arange(len(self)), np.maximum(self.lengths - 1, 0)]
+        return (self.lengths >= 1) & BRANCH2_STATES[last]
+
+def iter_lattice_coord_chunks(radius: int, chunk_size: int = 65536):
+    """Streams every valid coord with at most radius digits as LatticeCoordArray
+    chunks of chunk_size coords (the last may be shorter), in canonical order.
+    Digits are padded to radius columns. Memory stays around chunk_size coords
+    per ring, so radii far too big to hold at once can be streamed
+
+    Args:
+        radius (int): maximum coord length
+        chunk_size (int, optional): coords per chunk
+    """
+    ring_starts = np.cumsum([0] + ring_sizes(radius))
+    pending = []
+    pending_count = 0
+    for length in range(radius + 1):
+        for start, block, block_states, parents in _ring_blocks(length, chunk_size):
+            digits = np.zeros((len(block), radius), dtype=np.uint8)
+            digits[:, :length] = block
+            states = np.zeros((len(block), radius), dtype=np.uint8)
+            states[:, :length] = block_states
+            lengths = np.full(len(block), length)
+            if length > 0:
+                parents = ring_starts[length - 1] + parents
+            pending.append(LatticeCoordArray(digits, states, lengths, parents, leaf_directions(digits, states, lengths)))
+            pending_count += len(block)
+            while pending_count >= chunk_size:
+                chunk = LatticeCoordArray.concatenate(pending) if len(pending) > 1 else pending[0]
+                yield chunk[:chunk_size]
+                rest = chunk[chunk_size:]
+                pending = [rest] if len(rest) > 0 else []
+                pending_count = len(rest)
+    if pending_count > 0:
+        yield LatticeCoordArray.concatenate(pending)
+    
 class LatticeWalker(object):
     
     def __init__(self, d_system: "LatticeSystem", d_coord_rel: LatticeCoord = None) -> None:
@@ -282,10 +478,12 @@ class LatticeWalker(object):
         self.absolute_position = None
         self.render_position = None
         self.direction_offset = 0
+        self.generation = 0
         
         if d_coord_rel is not None:
             self.coord_origin_rel = d_coord_rel
             self.rel_orient_parent = PolarTransform(self.coord_origin_rel.angle_of_leaf(), BRANCH_LENGTH, np.pi)
+            self.position_origin_rel = None
         else:
             self.coord_origin_rel = LatticeCoord([])
             self.base_point = self.system.get_lattice_point(LatticeCoord([]))
@@ -294,6 +492,7 @@ class LatticeWalker(object):
             self.direction_offset = 0
             self.absolute_position = PolarTransform(0, 0.2, 0.3)
             self.rel_orient_parent = PolarTransform(0, 0, 0)
+            self.position_origin_rel = PolarTransform(0, 0, 0)
             self.render_position = copy.deepcopy(self.absolute_position)
         
     def compare_to(self, obj: object):
@@ -0,0 +1,65 @@
+import time
+
+
+class FixedStepLoop(object):
+    """Decouples the simulation rate from the render rate. Real time is banked every
+    frame and spent in fixed steps of 1 / step_rate seconds, so movement per second
+    doesn't depend on how fast the machine runs the loop. Rendering is capped at
+    max_fps (0 for no cap, e.g. with vsync).
+
+    With interpolate, every frame is rendered and alpha says how far real time has
+    got from the last step towards the next, for rendering the state alpha of the
+    way between the last two steps. Without it, frames in which no step ran are
+    skipped.
+    """
+
+    def __init__(self, step_rate: float = 60, max_fps: float = 60, interpolate: bool = False, max_steps: int = 5) -> None:
+        self.step = 1 / step_rate
+        self.frame_time = 1 / max_fps if max_fps > 0 else 0
+        self.interpolate = interpolate
+        # A frame never runs more than max_steps steps; after a stall the rest of
+        # the banked time is dropped instead of running ever more steps to catch up
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.last_time = None
+        self.next_frame = None
+        self.steps_run = 0
+        self.dropped_time = 0.0
+
+    @property
+    def alpha(self) -> float:
+        """Fraction of a step banked but not simulated yet, in [0, 1)"""
+        return self.accumulator / self.step
+
+    def steps(self) -> int:
+        """Banks the time since the last call and returns how many steps to run now"""
+        now = time.perf_counter()
+        if self.last_time is None:
+            self.last_time = now - self.step
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        count = int(self.accumulator / self.step)
+        if count > self.max_steps:
+            self.dropped_time += (count - self.max_steps) * self.step
+            count = self.max_steps
+            self.accumulator = self.accumulator % self.step
+        else:
+            self.accumulator -= count * self.step
+        self.steps_run = count
+        return count
+
+    def should_render(self) -> bool:
+        return self.interpolate or self.steps_run > 0
+
+    def wait(self) -> None:
+        """Sleeps until the next frame is due under the max_fps cap"""
+        if self.frame_time == 0:
+            return
+        now = time.perf_counter()
+        if self.next_frame is None or now - self.next_frame > self.frame_time:
+            # First frame, or so far behind that there is no point catching up
+            self.next_frame = now
+        self.next_frame += self.frame_time
+        delay = self.next_frame - now
+        if delay > 0:
+            time.sleep(delay)
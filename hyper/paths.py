@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class _LRU(object):
+    """Bounded mapping, the least recently used key is evicted first"""
+
+    def __init__(self, capacity: int) -> None:
+        self.entries = OrderedDict()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: object) -> object:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+        return entry
+
+    def put(self, key: object, entry: object) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+class PathCache(object):
+    """Lattice distances and shortest paths between pairs of coords, see
+    LatticeCoord.distance_to and path_to, keyed by the pair of LatticeCoord.key()
+    in either order. Distances and paths are cached separately, each evicting the
+    least recently used pair first. Works with any coords that have an automaton,
+    like LatticeCoord and hyper.tiling.TilingCoord
+    """
+
+    def __init__(self, capacity: int = 65536, path_capacity: int = 4096) -> None:
+        # (key, key) in ascending order -> distance
+        self.distance_cache = _LRU(capacity)
+        # (key, key) in ascending order -> path from the first to the second
+        self.path_cache = _LRU(path_capacity)
+
+    def __len__(self) -> int:
+        return len(self.distance_cache)
+
+    def distance(self, a, b) -> int:
+        """Number of lattice edges on a shortest path from a to b, None if either is invalid"""
+        key_a, key_b = a.key(), b.key()
+        cache_key = (key_a, key_b) if key_a <= key_b else (key_b, key_a)
+        distance = self.distance_cache.get(cache_key)
+        if distance is None:
+            distance = a.distance_to(b)
+            if distance is None:
+                return None
+            self.distance_cache.put(cache_key, distance)
+        return distance
+
+    def path(self, a, b) -> list:
+        """A shortest path from a to b, as the coords from a to b, None if either is invalid"""
+        key_a, key_b = a.key(), b.key()
+        forward = key_a <= key_b
+        cache_key = (key_a, key_b) if forward else (key_b, key_a)
+        path = self.path_cache.get(cache_key)
+        if path is None:
+            path = a.path_to(b) if forward else b.path_to(a)
+            if path is None:
+                return None
+            self.path_cache.put(cache_key, path)
+            self.distance_cache.put(cache_key, len(path) - 1)
+        return list(path) if forward else path[::-1]
+
+    def distances(self, sources: list, targets: list) -> np.ndarray:
+        """(N, M) int array of the distances from every one of N sources to every one
+        of M targets, -1 where a coord is invalid. Computed in bulk from the tiling
+        tables (see TilingAutomaton.distances) instead of pair by pair, and not
+        cached, N * M pairs would flush the cache
+        """
+        result = np.full((len(sources), len(targets)), -1, dtype=np.int64)
+        valid_sources = [i for i, coord in enumerate(sources) if coord.states is not None]
+        valid_targets = [j for j, coord in enumerate(targets) if coord.states is not None]
+        if len(valid_sources) == 0 or len(valid_targets) == 0:
+            return result
+        automaton = sources[valid_sources[0]].automaton
+        result[np.ix_(valid_sources, valid_targets)] = automaton.distances(
+            [(sources[i].digits, sources[i].states) for i in valid_sources],
+            [(targets[j].digits, targets[j].states) for j in valid_targets])
+        return result
+
+    def clear(self) -> None:
+        self.distance_cache.clear()
+        self.path_cache.clear()
+
+    def stats(self) -> dict:
+        return {"distances": self.distance_cache.stats(), "paths": self.path_cache.stats()}
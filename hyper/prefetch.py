@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from hyper.geometry import BRANCH_LENGTH, DIRECTIONS, DIRECTION_ANGLE
+from hyper.transforms import PolarTransform, LorentzTransform
+from hyper.profiling import profiler
+
+
+class WalkerTree(object):
+    """A walker tree built by LatticeSystem.build_walker_tree for a walker origin
+    at coord. Nothing references it until LatticeSystem.swap_walker_tree, so it
+    can be built on another thread. walkers[0] is a placeholder for the origin.
+    """
+
+    def __init__(self, coord, indices: np.ndarray, walkers: list) -> None:
+        self.coord = coord
+        self.indices = indices
+        self.walkers = walkers
+        self.positions_origin_rel = None
+        self.direction_offsets = None
+        self.branch2 = None
+        self.absolute_positions = None
+        self.render_positions = None
+
+
+class WalkerPrefetcher(object):
+    """Predicts the base point the view is heading to and builds its walker tree
+    on a background thread, so crossing into it only swaps the tree in.
+
+    Only one tree is built at a time. A prediction that changes before the tree
+    is done replaces it, and a tree that isn't done when the crossing happens is
+    dropped in favour of the normal rebuild.
+    """
+
+    def __init__(self, system: "LatticeSystem") -> None:
+        self.system = system
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="walker-prefetch")
+        # (coord key, future) of the tree being built
+        self.pending = None
+
+    def predict(self, lattice_transform: "LatticeTransform", motion) -> object:
+        """Looks ahead along the current motion and starts building the walker tree
+        of the base point it leads to, if that isn't the current one
+
+        Args:
+            lattice_transform (LatticeTransform): the view
+            motion (callable): motion(transform) moves a copy of the view's
+                rel_transform as far ahead as should be looked
+
+        Returns:
+            LatticeCoord: the predicted base point, None if the view stays in its tile
+        """
+        view = lattice_transform.rel_transform.copy()
+        motion(view)
+        base_point = lattice_transform.base_point
+        # Same test as LatticeTransform.shift_to_nearer_basepoint
+        nearest = None
+        nearest_length = np.abs(view.s)
+        for direction in range(DIRECTIONS):
+            relative = view.copy()
+            relative.apply_polar_transform(PolarTransform(direction*DIRECTION_ANGLE, BRANCH_LENGTH, np.pi))
+            if np.abs(relative.s) < nearest_length:
+                nearest, nearest_length = direction, np.abs(relative.s)
+        if nearest is None:
+            return None
+
+        turn = base_point.turn_in_direction(nearest)
+        coord = base_point.point_in_direction(nearest).coords
+        view.apply_polar_transform(PolarTransform(nearest*DIRECTION_ANGLE, BRANCH_LENGTH, np.pi-turn*DIRECTION_ANGLE))
+        self.request(coord, view)
+        return coord
+
+    def request(self, coord: "LatticeCoord", transform: PolarTransform) -> None:
+        """Starts building the walker tree for a walker origin at coord"""
+        key = coord.key()
+        if self.pending is not None:
+            if self.pending[0] == key:
+                return
+            self.pending[1].cancel()
+        if isinstance(transform, LorentzTransform):
+            transform = transform.to_polar()
+        system = self.system
+        # The template must be cached here, the worker only reads it
+        system.get_walker_template(system.lod_max_radius if system.lod else system.walker_radius)
+        self.pending = (key, self.executor.submit(system.build_walker_tree, coord, transform))
+
+    def take(self, coord: "LatticeCoord") -> WalkerTree:
+        """Hands over the finished walker tree for coord, None if there isn't one"""
+        if self.pending is None or self.pending[0] != coord.key():
+            if profiler.enabled:
+                profiler.count("prefetch_misses")
+            return None
+        key, future = self.pending
+        self.pending = None
+        if not future.done():
+            future.cancel()
+            if profiler.enabled:
+                profiler.count("prefetch_misses")
+            return None
+        return future.result()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
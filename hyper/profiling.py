@@ -0,0 +1,152 @@
+import csv
+import json
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+
+class NullScope(object):
+    
+    def __enter__(self) -> None:
+        return None
+    
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+class Scope(object):
+    
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+    
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+    
+    def __exit__(self, *exc) -> None:
+        self.profiler.timers[self.name] += time.perf_counter() - self.start
+
+
+NULL_SCOPE = NullScope()
+
+
+class Profiler(object):
+    """Per-frame scoped timers and counters, kept over a rolling window of frames.
+    While disabled, scope() returns a shared no-op and callers guard counters with
+    `if profiler.enabled`, so the cost is an attribute check
+    """
+    
+    def __init__(self, window: int = 300) -> None:
+        self.enabled = False
+        self.frames = deque(maxlen=window)
+        self.frame_index = 0
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.log_file = None
+        self.last_frame_end = None
+    
+    def enable(self, log_path: str = None) -> None:
+        """Starts collecting. If log_path is given, every frame is also appended to it as JSONL"""
+        self.enabled = True
+        if log_path is not None:
+            self.log_file = open(log_path, "a")
+    
+    def disable(self) -> None:
+        self.enabled = False
+        self.timers.clear()
+        self.counters.clear()
+        self.last_frame_end = None
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+    
+    def toggle(self) -> None:
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+    
+    def scope(self, name: str):
+        if not self.enabled:
+            return NULL_SCOPE
+        return Scope(self, name)
+    
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+    
+    def end_frame(self) -> None:
+        """Closes the current frame. The wall time since the previous end_frame is recorded as the 'frame' timer"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.last_frame_end is not None:
+            self.timers["frame"] = now - self.last_frame_end
+        self.last_frame_end = now
+        record = {"frame": self.frame_index, "timers": dict(self.timers), "counters": dict(self.counters)}
+        self.frames.append(record)
+        if self.log_file is not None:
+            self.log_file.write(json.dumps(record) + "\n")
+        self.frame_index += 1
+        self.timers.clear()
+        self.counters.clear()
+    
+    def timer_names(self) -> list:
+        return sorted({name for record in self.frames for name in record["timers"]})
+    
+    def counter_names(self) -> list:
+        return sorted({name for record in self.frames for name in record["counters"]})
+    
+    def percentiles(self, name: str, q: tuple = (50, 95, 99), counter: bool = False) -> np.ndarray:
+        """Percentiles of a timer (seconds) or counter over the rolling window"""
+        kind = "counters" if counter else "timers"
+        values = [record[kind].get(name, 0) for record in self.frames]
+        if len(values) == 0:
+            return np.zeros(len(q))
+        return np.percentile(values, q)
+    
+    def dump(self, path: str) -> None:
+        """Writes the rolling window to a .csv file (one column per timer and counter)
+        or otherwise to JSONL
+        """
+        if path.endswith(".csv"):
+            timer_names = self.timer_names()
+            counter_names = self.counter_names()
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame"] + [name + "_s" for name in timer_names] + counter_names)
+                for record in self.frames:
+                    writer.writerow([record["frame"]]
+                                    + [record["timers"].get(name, 0) for name in timer_names]
+                                    + [record["counters"].get(name, 0) for name in counter_names])
+        else:
+            with open(path, "w") as f:
+                for record in self.frames:
+                    f.write(json.dumps(record) + "\n")
+    
+    def render_overlay(self, graphic, font, pos: tuple = (10, 10)):
+        """Draws rolling p50/p95 of every timer and the mean of every counter
+
+        Returns:
+            pygame.Rect: area covered by the overlay
+        """
+        import pygame
+        lines = ["%-22s %7s %7s" % ("ms", "p50", "p95")]
+        for name in self.timer_names():
+            p50, p95 = self.percentiles(name, (50, 95)) * 1e3
+            lines.append("%-22s %7.2f %7.2f" % (name, p50, p95))
+        for name in self.counter_names():
+            mean = np.mean([record["counters"].get(name, 0) for record in self.frames])
+            lines.append("%-22s %7.1f" % (name, mean))
+        
+        line_height = font.get_linesize()
+        width = max(font.size(line)[0] for line in lines)
+        backdrop = pygame.Surface((width + 10, line_height * len(lines) + 10), pygame.SRCALPHA)
+        backdrop.fill((0, 0, 0, 160))
+        graphic.blit(backdrop, (pos[0] - 5, pos[1] - 5))
+        for i, line in enumerate(lines):
+            graphic.blit(font.render(line, True, (255, 255, 255)), (pos[0], pos[1] + i * line_height))
+        return backdrop.get_rect(topleft=(pos[0] - 5, pos[1] - 5))
+
+
+profiler = Profiler()
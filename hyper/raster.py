@@ -0,0 +1,183 @@
+import numpy as np
+
+from hyper.geometry import SCALE, bounding_box, frame_viewport, tile_geometry
+from hyper.profiling import profiler
+from hyper.renderers import Renderer
+
+DISC_COLOR = (34, 139, 34)
+RIM_COLOR = (255, 0, 0)
+RIM_WIDTH = 4
+
+def disc_offsets(radius: float) -> np.ndarray:
+    """(K, 2) integer (x, y) offsets of the pixels within radius of a pixel"""
+    r = int(np.ceil(radius))
+    x, y = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1))
+    inside = x*x + y*y <= radius*radius
+    return np.stack([x[inside], y[inside]], axis=1)
+
+def disc_backdrop(width: int, height: int) -> np.ndarray:
+    """The Poincare disc drawn under the tiles in main.py, as an (height, width, 3)
+    uint8 frame: black, the disc, and its rim. The disc fills the frame as in
+    frame_viewport
+    """
+    scale, (center_x, center_y) = frame_viewport(width, height)
+    y, x = np.mgrid[0:height, 0:width]
+    distance = np.hypot(x - center_x, y - center_y)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[distance <= scale] = DISC_COLOR
+    frame[(distance <= scale) & (distance > scale - RIM_WIDTH)] = RIM_COLOR
+    return frame
+
+
+class NumpyRenderer(Renderer):
+    """Draws into (height, width, 3) uint8 NumPy frames, indexed [y, x], without any
+    drawing library or display. Everything drawn in one call is first marked in a
+    boolean mask and the mask is painted once: lines are rasterized as 1 pixel
+    centrelines and dilated by a round brush, circles are filled directly. The
+    result is close to but not pixel-identical with the pygame backend. Dirty
+    areas are (x, y, width, height) tuples. The disc fills whatever frame it is
+    drawn into, see frame_viewport.
+
+    Labels are (h, w, 3) uint8 arrays, or (h, w, 4) with alpha; the labels
+    LatticeSystem renders through a font are only supported if the font
+    returns arrays.
+    """
+
+    def __init__(self, line_width: int = 4, color: tuple = (0, 0, 0)) -> None:
+        self.line_width = line_width
+        self.color = np.array(color, dtype=np.uint8)
+        # Line width in pixels -> brush offsets. line_width is for the SCALE disc of
+        # main.py, in other frames lines are as much thinner or thicker as the disc
+        self.brushes = {}
+
+    def brush(self, height: int, width: int) -> np.ndarray:
+        """(K, 2) offsets of the round line brush for a height x width frame"""
+        scale = frame_viewport(width, height)[0]
+        line_width = max(self.line_width * scale / SCALE, 1)
+        brush = self.brushes.get(line_width)
+        if brush is None:
+            brush = self.brushes[line_width] = disc_offsets(line_width / 2)
+        return brush
+
+    def mark(self, mask: np.ndarray, points: np.ndarray, offsets: np.ndarray = None, select: np.ndarray = None) -> None:
+        """Sets mask at (N, 2) integer (x, y) points, or at every offset around them
+
+        Args:
+            offsets (np.ndarray, optional): (K, 2) offsets around each point
+            select (np.ndarray, optional): (N, K) bool, which offsets to set for each point
+        """
+        if offsets is not None:
+            points = points[:, np.newaxis, :] + offsets[np.newaxis]
+            points = points[select] if select is not None else points.reshape(-1, 2)
+        height, width = mask.shape
+        x, y = points[:, 0], points[:, 1]
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        mask.ravel()[(y * width + x)[inside]] = True
+
+    def mark_lines(self, mask: np.ndarray, polylines: list) -> None:
+        """Marks the centrelines of blocks of (M, K, 2) polylines, one point per
+        pixel of length so neighbouring points are always 8-connected
+        """
+        starts = np.concatenate([block[:, :-1].reshape(-1, 2) for block in polylines])
+        deltas = np.concatenate([block[:, 1:].reshape(-1, 2) for block in polylines]) - starts
+        counts = np.ceil(np.abs(deltas).max(axis=1)).astype(np.intp) + 1
+        segment = np.repeat(np.arange(len(starts)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        t = (np.arange(len(segment)) - first) / np.repeat(np.maximum(counts - 1, 1), counts)
+        points = starts[segment] + deltas[segment] * t[:, np.newaxis]
+        self.mark(mask, np.rint(points).astype(np.intp))
+
+    def dilate(self, mask: np.ndarray) -> np.ndarray:
+        """mask grown by the line brush, as shifted ORs over the whole frame"""
+        out = mask.copy()
+        height, width = mask.shape
+        for dx, dy in self.brush(height, width).tolist():
+            if dx == 0 and dy == 0:
+                continue
+            out[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] |= \
+                mask[max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+        return out
+
+    def paint(self, frame: np.ndarray, mask: np.ndarray) -> None:
+        if frame.flags.c_contiguous:
+            # Scattering to the marked pixel rows beats boolean mask assignment
+            frame.reshape(-1, 3)[np.flatnonzero(mask)] = self.color
+        else:
+            frame[mask] = self.color
+
+    def line_mask(self, frame: np.ndarray, polylines: list) -> np.ndarray:
+        mask = np.zeros(frame.shape[:2], dtype=bool)
+        polylines = [block for block in polylines if len(block) > 0]
+        if polylines:
+            self.mark_lines(mask, polylines)
+            mask = self.dilate(mask)
+        return mask
+
+    def mark_circles(self, mask: np.ndarray, centers: np.ndarray, radii: np.ndarray) -> None:
+        # Circles are grouped by whole pixel radius, so small ones don't pay for
+        # the stencil of the largest
+        centers = np.rint(centers).astype(np.intp)
+        buckets = np.ceil(radii).astype(np.intp)
+        for bucket in np.unique(buckets).tolist():
+            members = buckets == bucket
+            offsets = disc_offsets(bucket)
+            select = (offsets * offsets).sum(axis=1)[np.newaxis] <= (radii[members] ** 2)[:, np.newaxis]
+            self.mark(mask, centers[members], offsets, select)
+
+    def draw_polylines(self, frame: np.ndarray, polylines: np.ndarray, dirty: list = None) -> None:
+        if len(polylines) == 0:
+            return
+        self.paint(frame, self.line_mask(frame, [polylines]))
+        if dirty is not None:
+            dirty.append(bounding_box(polylines, pad=self.line_width))
+
+    def draw_circles(self, frame: np.ndarray, centers: np.ndarray, radii: np.ndarray, dirty: list = None) -> None:
+        if len(centers) == 0:
+            return
+        radii = np.maximum(radii, 0)
+        mask = np.zeros(frame.shape[:2], dtype=bool)
+        self.mark_circles(mask, centers, radii)
+        self.paint(frame, mask)
+        if dirty is not None:
+            dirty.append(bounding_box(centers, pad=radii.max() + 1))
+
+    def draw_tiles(self, frame: np.ndarray, transforms: np.ndarray, branch2: np.ndarray, footprints: np.ndarray = None, dirty: list = None) -> np.ndarray:
+        """Renderer.draw_tiles with all the lines and circles painted in one pass"""
+        scale, center = frame_viewport(frame.shape[1], frame.shape[0])
+        if footprints is not None:
+            # Footprints are measured on the SCALE disc of main.py
+            footprints = footprints * (scale / SCALE)
+        polylines, screen_pos, radii = tile_geometry(transforms, branch2, footprints, scale, center)
+        mask = self.line_mask(frame, polylines)
+        if len(screen_pos) > 0:
+            radii = np.maximum(radii, 0)
+            self.mark_circles(mask, screen_pos[:, :2], radii)
+        self.paint(frame, mask)
+        if dirty is not None:
+            for block in polylines:
+                dirty.append(bounding_box(block, pad=self.line_width))
+            if len(screen_pos) > 0:
+                dirty.append(bounding_box(screen_pos[:, :2], pad=radii.max() + 1))
+        if profiler.enabled:
+            profiler.count("draw_calls", sum(len(block) for block in polylines) + len(screen_pos))
+        return screen_pos
+
+    def draw_labels(self, frame: np.ndarray, surfaces: list, positions: np.ndarray, dirty: list = None) -> None:
+        height, width = frame.shape[:2]
+        for label, (x, y) in zip(surfaces, np.rint(positions[:, :2]).astype(int).tolist()):
+            h, w = label.shape[:2]
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + w, width), min(y + h, height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            region = frame[y0:y1, x0:x1]
+            label = label[y0 - y:y1 - y, x0 - x:x1 - x]
+            if label.shape[2] == 4:
+                alpha = label[..., 3:] / 255
+                region[:] = (label[..., :3] * alpha + region * (1 - alpha)).astype(np.uint8)
+            else:
+                region[:] = label
+            if dirty is not None:
+                dirty.append((x0, y0, x1 - x0, y1 - y0))
+        if profiler.enabled:
+            profiler.count("labels_drawn", len(surfaces))
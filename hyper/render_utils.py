@@ -1,16 +1,12 @@
 import pygame
 import hyper.hyper_utils as hyper_utils
+from hyper.profiling import profiler
 import numpy as np
-
-SCALE = 400
-BRANCH_LENGTH: float = 1.255
-DEPTH: int = 3
-
-def scale_to_screen(point: np.ndarray) -> np.ndarray:
-    return point * SCALE + SCALE
-
-def project_onto_screen(point: np.ndarray) -> np.ndarray:
-    return scale_to_screen(hyper_utils.project_onto_poincare_disc(point))
+# Geometry moved to the pygame-free hyper.geometry, re-exported for old imports
+from hyper.geometry import (SCALE, BRANCH_LENGTH, DIRECTIONS, DIRECTION_ANGLE, DEPTH, LOD_SAMPLE_INCREMENTS, BRANCH_ANGLES,
+                            BRANCH2_ANGLES, TILE_MESHES, scale_to_screen, project_onto_screen,
+                            screen_to_disc, tile_footprint, tile_mesh, mesh_polylines, bounding_box)
+from hyper.renderers import Renderer, LabelCache, get_renderer
 
 def draw_line(screen, cur_transform: np.ndarray, angle: float = None, line_length: float = 0) -> None:
     transform_copy = cur_transform.copy()
@@ -25,10 +21,118 @@ def draw_line(screen, cur_transform: np.ndarray, angle: float = None, line_lengt
             pygame.draw.line(screen, 'black', prev_point[:-1], next_point[:-1], width=4)
         prev_point = next_point
     
+def bounding_rect(points: np.ndarray, pad: float = 0) -> pygame.Rect:
+    """Smallest pygame.Rect holding (..., 2) screen points, grown by pad on every side"""
+    return pygame.Rect(*bounding_box(points, pad))
+
+# Transparent colour of the pre-rendered vertex circles
+CIRCLE_COLORKEY = (255, 0, 255)
+
+class PygameRenderer(Renderer):
+    """Draws onto pygame surfaces. Dirty areas are pygame.Rects. Vertex circles are
+    pre-rendered once per whole pixel radius and blitted in one call
+    """
+
+    def __init__(self) -> None:
+        self.circle_sprites = {}
+
+    def circle_sprite(self, radius: int) -> pygame.Surface:
+        """Colour keyed surface of a filled circle of radius, centered at (radius, radius)"""
+        sprite = self.circle_sprites.get(radius)
+        if sprite is None:
+            sprite = pygame.Surface((2*radius + 1, 2*radius + 1))
+            sprite.fill(CIRCLE_COLORKEY)
+            pygame.draw.circle(sprite, 'black', (radius, radius), radius)
+            sprite.set_colorkey(CIRCLE_COLORKEY, pygame.RLEACCEL)
+            self.circle_sprites[radius] = sprite
+        return sprite
+
+    def draw_polylines(self, screen: pygame.Surface, polylines: np.ndarray, dirty: list = None) -> None:
+        for polyline in polylines.tolist():
+            pygame.draw.lines(screen, 'black', False, polyline, width=4)
+        if dirty is not None and len(polylines) > 0:
+            dirty.append(bounding_rect(polylines, pad=4))
+
+    def draw_circles(self, screen: pygame.Surface, centers: np.ndarray, radii: np.ndarray, dirty: list = None) -> None:
+        """Blits circle sprites at (N, 2) centers in one Surface.blits call. Centers and
+        radii are truncated to whole pixels like pygame.draw.circle does, so the
+        pixels are the same as drawing each circle
+        """
+        whole_radii = np.trunc(radii).astype(np.intp)
+        # pygame.draw.circle draws nothing below a radius of 1
+        shown = whole_radii >= 1
+        whole_radii = whole_radii[shown]
+        corners = np.trunc(centers[shown]).astype(np.intp) - whole_radii[:, np.newaxis]
+        screen.blits([(self.circle_sprite(radius), corner) for radius, corner in zip(whole_radii.tolist(), corners.tolist())],
+                     doreturn=False)
+        if dirty is not None and len(centers) > 0:
+            dirty.append(bounding_rect(centers, pad=max(np.max(radii), 0) + 1))
+
+    def draw_labels(self, screen: pygame.Surface, surfaces: list, positions: np.ndarray, dirty: list = None) -> None:
+        """Blits label surfaces at (N, 2+) screen positions in one Surface.blits call"""
+        rects = screen.blits(list(zip(surfaces, positions[:, :2].tolist())))
+        if dirty is not None:
+            dirty.extend(rects)
+        if profiler.enabled:
+            profiler.count("labels_drawn", len(surfaces))
+
+def draw_mesh_batched(screen, transforms: np.ndarray, mesh: np.ndarray, dirty: list = None) -> None:
+    """Draws the same tile mesh for a stack of transforms, each branch as one polyline
+
+    Args:
+        screen: pygame surface
+        transforms (np.ndarray): (N, 4, 4) transform matrices, or their (N, 3, 3) reduced form
+        mesh (np.ndarray): (branches, K, 3) mesh from tile_mesh
+        dirty (list, optional): the bounding rect of what was drawn is appended to it
+    """
+    if len(transforms) == 0:
+        return
+    polylines = mesh_polylines(transforms, mesh)
+    get_renderer("pygame").draw_polylines(screen, polylines, dirty)
+    if profiler.enabled:
+        profiler.count("draw_calls", len(polylines))
+
+def draw_tiles(screen, transforms: np.ndarray, branch2: np.ndarray, footprints: np.ndarray = None, dirty: list = None) -> np.ndarray:
+    """PygameRenderer.draw_tiles with the registry's shared pygame backend, see
+    hyper.geometry.tile_geometry
+    """
+    return get_renderer("pygame").draw_tiles(screen, transforms, branch2, footprints, dirty)
+
+def draw_labels(screen, surfaces: list, positions: np.ndarray, dirty: list = None) -> None:
+    get_renderer("pygame").draw_labels(screen, surfaces, positions, dirty)
+
+class DirtyRegions(object):
+    """Redraw bookkeeping for frames drawn over a static backdrop. The backdrop is
+    rendered once into its own surface; each redraw restores it only where the
+    previous frame drew, and the display is updated only over the old and new
+    drawn areas. Rects drawn this frame are appended to drawn
+    """
+    
+    def __init__(self, backdrop: pygame.Surface) -> None:
+        self.backdrop = backdrop
+        self.drawn = []
+        self.previous = None
+    
+    def restore(self, screen: pygame.Surface) -> None:
+        """Blits the backdrop over what the previous frame drew, or over everything on the first frame"""
+        area = self.previous if self.previous is not None else self.backdrop.get_rect()
+        screen.blit(self.backdrop, area, area)
+    
+    def flush(self) -> list:
+        """Returns the rects to pass to pygame.display.update and starts the next frame"""
+        current = self.drawn[0].unionall(self.drawn[1:]).clip(self.backdrop.get_rect()) if self.drawn else None
+        if self.previous is None:
+            rects = [self.backdrop.get_rect()]
+        else:
+            rects = [self.previous] if current is None else [self.previous.union(current)]
+        self.previous = current if current is not None else pygame.Rect(0, 0, 0, 0)
+        self.drawn = []
+        return rects
+    
 def draw_order5_tiling(screen, cur_transform: np.ndarray) -> None:
     transform_copy = cur_transform.copy()
-    for i in range(5):
-        transform_copy = transform_copy @ hyper_utils.rotation_mat(2 * np.pi / 5)
+    for i in range(DIRECTIONS):
+        transform_copy = transform_copy @ hyper_utils.rotation_mat(DIRECTION_ANGLE)
         draw3_branch_sector(screen, transform_copy, 0)
 
 def draw3_branch_sector(screen, cur_transform: np.ndarray, depth: int) -> None:
@@ -38,11 +142,11 @@ def draw3_branch_sector(screen, cur_transform: np.ndarray, depth: int) -> None:
     transform_copy = transform_copy @ hyper_utils.rotation_mat(np.pi)
 
     if (depth < DEPTH):
-        transform_copy = transform_copy @ hyper_utils.rotation_mat(2 * np.pi / 5)
+        transform_copy = transform_copy @ hyper_utils.rotation_mat(DIRECTION_ANGLE)
         draw2_branch_sector(screen, transform_copy, depth + 1)
-        transform_copy = transform_copy @ hyper_utils.rotation_mat(2 * np.pi / 5)
+        transform_copy = transform_copy @ hyper_utils.rotation_mat(DIRECTION_ANGLE)
         draw3_branch_sector(screen, transform_copy, depth + 1)
-        transform_copy = transform_copy @ hyper_utils.rotation_mat(2 * np.pi / 5)
+        transform_copy = transform_copy @ hyper_utils.rotation_mat(DIRECTION_ANGLE)
         draw3_branch_sector(screen, transform_copy, depth + 1)
 
 def draw2_branch_sector(screen, cur_transform: np.ndarray, depth: int) -> None:
@@ -52,9 +156,9 @@ def draw2_branch_sector(screen, cur_transform: np.ndarray, depth: int) -> None:
     transform_copy = transform_copy @ hyper_utils.rotation_mat(np.pi)
 
     if (depth < DEPTH):
-        transform_copy = transform_copy @ hyper_utils.rotation_mat(2 * np.pi / 5)
+        transform_copy = transform_copy @ hyper_utils.rotation_mat(DIRECTION_ANGLE)
         draw_line(screen, transform_copy, 0, BRANCH_LENGTH)
-        transform_copy = transform_copy @ hyper_utils.rotation_mat(2 * np.pi / 5)
+        transform_copy = transform_copy @ hyper_utils.rotation_mat(DIRECTION_ANGLE)
         draw2_branch_sector(screen, transform_copy, depth + 1)
-        transform_copy = transform_copy @ hyper_utils.rotation_mat(2 * np.pi / 5)
+        transform_copy = transform_copy @ hyper_utils.rotation_mat(DIRECTION_ANGLE)
         draw3_branch_sector(screen, transform_copy, depth + 1)
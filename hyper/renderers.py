@@ -0,0 +1,130 @@
+import importlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+
+from hyper.geometry import tile_geometry
+from hyper.profiling import profiler
+
+# Backend name -> "module:class". Modules are only imported when the backend is
+# first asked for, so the core never pulls in a drawing library it doesn't use
+RENDERERS = {
+    "pygame": "hyper.render_utils:PygameRenderer",
+    "null": "hyper.renderers:NullRenderer",
+    "numpy": "hyper.raster:NumpyRenderer",
+}
+_instances = {}
+
+def register_renderer(name: str, path: str) -> None:
+    """Adds a backend, path is "module:class" of a Renderer subclass"""
+    RENDERERS[name] = path
+    _instances.pop(name, None)
+
+def get_renderer(name: str) -> "Renderer":
+    """Shared instance of a backend, importing its module on first use"""
+    renderer = _instances.get(name)
+    if renderer is None:
+        if name not in RENDERERS:
+            raise ValueError("Unknown renderer %r, expected one of %s" % (name, ", ".join(RENDERERS)))
+        module_name, class_name = RENDERERS[name].split(":")
+        renderer = getattr(importlib.import_module(module_name), class_name)()
+        _instances[name] = renderer
+    return renderer
+
+
+class Renderer(ABC):
+    """What the lattice needs from a drawing backend. The geometry (which polylines,
+    circles and labels go where, in screen pixels) is worked out once by
+    hyper.geometry; a backend only puts primitives on its target.
+
+    Every draw method takes an optional dirty list, to which the backend may append
+    the areas it drew over.
+    """
+
+    @abstractmethod
+    def draw_polylines(self, target, polylines: np.ndarray, dirty: list = None) -> None:
+        """Draws (M, K, 2) open polylines"""
+
+    @abstractmethod
+    def draw_circles(self, target, centers: np.ndarray, radii: np.ndarray, dirty: list = None) -> None:
+        """Draws filled circles at (N, 2) centers"""
+
+    @abstractmethod
+    def draw_labels(self, target, surfaces: list, positions: np.ndarray, dirty: list = None) -> None:
+        """Draws pre-rendered labels (see LabelCache) at (N, 2+) positions"""
+
+    def draw_tiles(self, target, transforms: np.ndarray, branch2: np.ndarray, footprints: np.ndarray = None, dirty: list = None) -> np.ndarray:
+        """Draws N tiles, see tile_geometry
+
+        Returns:
+            np.ndarray: screen positions of the tile vertices, (x, y) first
+        """
+        polylines, screen_pos, radii = tile_geometry(transforms, branch2, footprints)
+        for block in polylines:
+            self.draw_polylines(target, block, dirty)
+        if len(screen_pos) > 0:
+            self.draw_circles(target, screen_pos[:, :2], radii, dirty)
+        if profiler.enabled:
+            profiler.count("draw_calls", sum(len(block) for block in polylines) + len(screen_pos))
+        return screen_pos
+
+
+class NullRenderer(Renderer):
+    """Draws nothing. Tile geometry is still computed, so it times everything but
+    the drawing library, and runs without one
+    """
+
+    def draw_polylines(self, target, polylines: np.ndarray, dirty: list = None) -> None:
+        pass
+
+    def draw_circles(self, target, centers: np.ndarray, radii: np.ndarray, dirty: list = None) -> None:
+        pass
+
+    def draw_labels(self, target, surfaces: list, positions: np.ndarray, dirty: list = None) -> None:
+        pass
+
+
+class LabelCache(object):
+    """Rendered text surfaces keyed by (font, key, color), so a label is only
+    rendered the first time it is drawn. Holds at most capacity surfaces, the
+    least recently used is evicted first. Works with any font that has a
+    render(text, antialias, color) method, like pygame's
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self.surfaces = OrderedDict()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.surfaces)
+
+    def get(self, font, key: object, make_text, color: tuple = (255, 255, 255)):
+        """Returns the surface for a label
+
+        Args:
+            font: font to render with
+            key (object): hashable key of the label, e.g. LatticeCoord.key()
+            make_text (callable): returns the label text, only called on a miss
+            color (tuple, optional): text color
+        """
+        cache_key = (font, key, color)
+        surface = self.surfaces.get(cache_key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(cache_key)
+            return surface
+        self.misses += 1
+        surface = font.render(make_text(), True, color)
+        self.surfaces[cache_key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self) -> None:
+        self.surfaces.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self.surfaces), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
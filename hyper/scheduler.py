@@ -0,0 +1,79 @@
+import heapq
+
+
+class TickScheduler(object):
+    """Calls update() on registered lattice points only. Each point ticks every
+    `interval` frames, can be put to sleep and woken, and with an is_near test
+    only ticks while it is near the viewer. Per-frame cost depends on the points
+    that are due, not on how many points exist.
+    """
+    
+    def __init__(self, is_near=None) -> None:
+        self.frame = 0
+        self.is_near = is_near
+        # point -> [interval, due frame, asleep, sequence of its live queue item]
+        self.entries = {}
+        # (due frame, sequence, point); items whose sequence is no longer the
+        # point's live one are skipped
+        self.queue = []
+        self.sequence = 0
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, point: object) -> bool:
+        return point in self.entries
+    
+    def push(self, point: object, entry: list) -> None:
+        """Queues point for entry's due frame, superseding any item already queued for it"""
+        self.sequence += 1
+        entry[3] = self.sequence
+        heapq.heappush(self.queue, (entry[1], self.sequence, point))
+    
+    def register(self, point: object, interval: int = 1) -> None:
+        """Ticks point every interval frames, starting next frame"""
+        interval = max(1, int(interval))
+        entry = [interval, self.frame + 1, False, 0]
+        self.entries[point] = entry
+        self.push(point, entry)
+    
+    def unregister(self, point: object) -> None:
+        self.entries.pop(point, None)
+    
+    def sleep(self, point: object) -> None:
+        entry = self.entries.get(point)
+        if entry is not None:
+            entry[2] = True
+    
+    def wake(self, point: object) -> None:
+        entry = self.entries.get(point)
+        if entry is not None and entry[2]:
+            entry[2] = False
+            entry[1] = self.frame + 1
+            self.push(point, entry)
+    
+    def tick(self) -> int:
+        """Advances one frame and updates every awake point that is due
+
+        Returns:
+            int: number of points updated
+        """
+        self.frame += 1
+        updated = 0
+        due_points = []
+        while len(self.queue) > 0 and self.queue[0][0] <= self.frame:
+            _, sequence, point = heapq.heappop(self.queue)
+            entry = self.entries.get(point)
+            # Stale queue item: unregistered, asleep, or superseded by a later push
+            if entry is None or entry[2] or entry[3] != sequence:
+                continue
+            due_points.append((point, entry))
+        
+        for point, entry in due_points:
+            entry[1] = self.frame + entry[0]
+            self.push(point, entry)
+            if self.is_near is not None and not self.is_near(point):
+                continue
+            point.update()
+            updated += 1
+        return updated
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+
+class LatticeStore(object):
+    """Hash map of lattice items (points or walkers) keyed by LatticeCoord.key().
+    Lookup and insertion are O(1) on average. Iteration follows insertion order;
+    ordered() gives the radius/lexicographic order of LatticeCoord.compare_to.
+    """
+    
+    def __init__(self) -> None:
+        self.items = {}
+        self.ordered_items = None
+        # Hooks for stores that evict: is_pinned(item) -> bool protects an item,
+        # on_evict(item) is called after an item is evicted
+        self.is_pinned = None
+        self.on_evict = None
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    def __iter__(self):
+        return iter(self.items.values())
+    
+    def __contains__(self, key: bytes) -> bool:
+        return key in self.items
+    
+    def get(self, key: bytes) -> object:
+        return self.items.get(key)
+    
+    def add(self, key: bytes, item: object) -> object:
+        self.items[key] = item
+        self.ordered_items = None
+        return item
+    
+    def remove(self, key: bytes) -> object:
+        item = self.items.pop(key, None)
+        if item is not None:
+            self.ordered_items = None
+        return item
+    
+    def clear(self) -> None:
+        self.items.clear()
+        self.ordered_items = None
+    
+    def ordered(self) -> list:
+        """Items sorted by radius, then lexicographically by coordinate. The
+        sorted list is cached until the store changes
+        """
+        if self.ordered_items is None:
+            self.ordered_items = [self.items[key] for key in sorted(self.items, key=lambda k: (len(k), k))]
+        return self.ordered_items
+
+
+class BoundedLatticeStore(LatticeStore):
+    """LatticeStore holding at most capacity items. When it is full, the least recently
+    used item that is not pinned is evicted. If every item is pinned the store grows
+    past capacity rather than drop a pinned item. Evicted items are simply missing,
+    so the owner regenerates them on demand.
+    """
+    
+    def __init__(self, capacity: int) -> None:
+        super().__init__()
+        self.items = OrderedDict()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __iter__(self):
+        # get() reorders items, so iterate over a snapshot
+        return iter(list(self.items.values()))
+    
+    def get(self, key: bytes) -> object:
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return item
+    
+    def add(self, key: bytes, item: object) -> object:
+        super().add(key, item)
+        if len(self.items) > self.capacity:
+            self.evict(len(self.items) - self.capacity)
+        return item
+    
+    def evict(self, count: int) -> int:
+        """Evicts up to count least recently used, unpinned items
+
+        Returns:
+            int: number of items evicted
+        """
+        evicted = 0
+        # Each item is looked at most once, pinned items are moved to the back
+        for _ in range(len(self.items)):
+            if evicted >= count:
+                break
+            key, item = next(iter(self.items.items()))
+            if self.is_pinned is not None and self.is_pinned(item):
+                self.items.move_to_end(key)
+                continue
+            del self.items[key]
+            evicted += 1
+            if self.on_evict is not None:
+                self.on_evict(item)
+        if evicted > 0:
+            self.evictions += evicted
+            self.ordered_items = None
+        return evicted
+    
+    def stats(self) -> dict:
+        return {"size": len(self.items), "capacity": self.capacity,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
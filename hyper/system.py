@@ -2,13 +2,73 @@ import copy
 import numpy as np
 
 from hyper.lattice import *
-from hyper.transforms import PolarTransform, LatticeTransform
+from hyper.store import LatticeStore
+from hyper.geometry import BRANCH_LENGTH, DIRECTIONS, DIRECTION_ANGLE, tile_footprint, screen_to_disc
+from hyper.renderers import Renderer, LabelCache, get_renderer
+import hyper.hyper_utils as hyper_utils
+from hyper.profiling import profiler
+from hyper.scheduler import TickScheduler
+from hyper.transforms import PolarTransform, PolarTransformArray, LorentzTransform, LatticeTransform
+from hyper.prefetch import WalkerPrefetcher, WalkerTree
+from hyper.paths import PathCache
 
 
+# Neighbour i of a lattice point is at polar_point(i*DIRECTION_ANGLE, BRANCH_LENGTH) in the point's
+# frame. Stored with the metric diag(1, -1, -1) applied, so a matmul gives cosh(distance)
+NEIGHBOR_POINTS = hyper_utils.polar_point(np.arange(DIRECTIONS)*DIRECTION_ANGLE, BRANCH_LENGTH) * np.array([1, -1, -1])
+# [direction, turn]: maps a point's frame to the frame of its neighbour in direction, the
+# inverse of LatticeTransform.step_basepoint_in_direction
+STEP_INVERSES = hyper_utils.minkowski_inverse(hyper_utils.polar_matrix3(
+    np.arange(DIRECTIONS)[:, np.newaxis]*DIRECTION_ANGLE, BRANCH_LENGTH, np.pi - np.arange(DIRECTIONS)[np.newaxis, :]*DIRECTION_ANGLE))
+
 class LatticeSystem(object):
     
-    def __init__(self) -> None:
-        self.lattice_points = []
+    def __init__(self, point_store: LatticeStore = None, walker_store: LatticeStore = None, reuse_walkers: bool = True, lod: bool = False, prefetch: bool = False, renderer: "Renderer | str" = "pygame") -> None:
+        self.lattice_points = point_store if point_store is not None else LatticeStore()
+        self.lattice_walkers = walker_store if walker_store is not None else LatticeStore()
+        self.lattice_points.is_pinned = self.is_lattice_point_pinned
+        self.lattice_points.on_evict = self.forget_lattice_point
+        # Only points near the viewer (with a walker in the current tree) tick
+        self.scheduler = TickScheduler(is_near=self.is_lattice_point_visible)
+        # On a re-root, rebuild the walker tree reusing the walkers still in it
+        # (rebuild_lattice_walkers) rather than regenerating every walker
+        self.reuse_walkers = reuse_walkers
+        self.walker_radius = 3
+        self.walker_generation = 0
+        self.walker_templates = {}
+        self.walker_template_indices = None
+        
+        # Level of detail: instead of a fixed radius, keep the walkers (up to lod_max_radius)
+        # whose tile_footprint is at least lod_min_pixels, at most lod_walker_budget of them
+        self.lod = lod
+        self.lod_min_pixels = 16.0
+        # Walkers already kept only drop out below lod_min_pixels * lod_hysteresis,
+        # so the tree is not rebuilt every frame for tiles hovering at the threshold
+        self.lod_hysteresis = 0.75
+        self.lod_walker_budget = 1000
+        self.lod_max_radius = 6
+        
+        # (base point key, transform bytes) of the last set_view_origin. view_changed
+        # tells whether the walkers moved since the call before it; callers that set
+        # the view more than once per frame compare last_view to the last drawn view
+        self.last_view = None
+        self.view_changed = True
+        
+        # Coordinate labels are rendered once and reused. With label_min_pixels set,
+        # tiles whose tile_footprint is smaller get no label
+        self.label_cache = LabelCache()
+        self.label_min_pixels = None
+        
+        # Lattice distances and shortest paths, for movement and proximity queries
+        self.paths = PathCache()
+        
+        # Drawing backend, a Renderer or the name of one in hyper.renderers.RENDERERS.
+        # Named backends are only imported on first draw
+        self._renderer = renderer
+        
+        # Builds the walker tree of the next base point on a background thread
+        self.prefetcher = WalkerPrefetcher(self) if prefetch else None
+        
         self.generate_lattice_points(2)
         self.walker_origin = LatticeWalker(self)
         self.walker_origin.direction_offset = 0
@@ -16,8 +76,10 @@ class LatticeSystem(object):
         self.walker_origin.absolute_position = PolarTransform(0, 0, 0)
         self.walker_origin.render_position = copy.deepcopy(self.walker_origin.absolute_position)
         
-        self.lattice_walkers = [self.walker_origin]
-        self.generate_lattice_walkers(3)   
+        self.lattice_walkers.add(self.walker_origin.coord_origin_rel.key(), self.walker_origin)
+        self.generate_lattice_walkers(self.walker_radius)
+        self.pack_walker_positions()
+        self.update_walker_positions(PolarTransform(0, 0, 0))
     
     def validate_walker_positions(self, walker: LatticeWalker) -> None:
         if not walker.valid_positions:
@@ -29,61 +91,463 @@ class LatticeSystem(object):
             walker.absolute_position = parent.absolute_position.copy()
             walker.absolute_position.apply_polar_transform(walker.rel_orient_parent)
             walker.render_position = walker.absolute_position.copy()
-            walker.render_position.apply_rotation(-walker.direction_offset*2*np.pi/5)
+            walker.render_position.apply_rotation(-walker.direction_offset*DIRECTION_ANGLE)
             walker.valid_positions = True
     
+    def pack_walker_positions(self, walkers: list = None, positions_origin_rel: PolarTransformArray = None) -> None:
+        """Gather the positions of all walkers into PolarTransformArrays. Each walker's
+        absolute_position and render_position become views into these arrays,
+        so update_walker_positions can reposition every walker at once.
+        The positions are only valid after the next update_walker_positions
+
+        Args:
+            walkers (list, optional): the walkers in packing order, lattice_walkers by default
+            positions_origin_rel (PolarTransformArray, optional): position_origin_rel of
+                each walker, if already gathered
+        """
+        if walkers is None:
+            walkers = list(self.lattice_walkers)
+        if positions_origin_rel is None:
+            positions_origin_rel = PolarTransformArray.from_transforms([walker.position_origin_rel for walker in walkers])
+        self.packed_walkers = walkers
+        self.walker_positions_origin_rel = positions_origin_rel
+        self.walker_direction_offsets = np.array([walker.direction_offset for walker in walkers], dtype=float)
+        self.walker_branch2 = np.array([walker.base_point.coords.type == LatticeType.BRANCH2 for walker in walkers], dtype=bool)
+        self.walker_absolute_positions = PolarTransformArray.identity(len(walkers))
+        self.walker_render_positions = PolarTransformArray.identity(len(walkers))
+        for i, walker in enumerate(walkers):
+            walker.absolute_position = self.walker_absolute_positions[i]
+            walker.render_position = self.walker_render_positions[i]
+    
+    def update_walker_positions(self, transform: PolarTransform) -> None:
+        """Recalculate the positions of all walkers for a new walker origin transform
+
+        Args:
+            transform (PolarTransform): absolute position of the walker origin
+        """
+        if len(self.walker_absolute_positions) != len(self.lattice_walkers):
+            self.pack_walker_positions()
+        
+        self.walker_absolute_positions.assign(transform)
+        self.walker_absolute_positions.apply_polar_transform(self.walker_positions_origin_rel)
+        self.walker_render_positions.assign(self.walker_absolute_positions)
+        self.walker_render_positions.apply_rotation(-self.walker_direction_offsets*DIRECTION_ANGLE)
+        
+        # The origin has no offset to compose, so take the transform as is
+        self.walker_origin.absolute_position.set(transform)
+        self.walker_origin.render_position.set(transform)
+        for walker in self.packed_walkers:
+            walker.valid_positions = True
+        self.view_changed = True
+        if profiler.enabled:
+            profiler.count("walkers_revalidated", len(self.lattice_walkers))
+    
     def set_view_origin(self, coord: LatticeCoord, transform: PolarTransform) -> None:
-        if self.walker_origin.base_point.coords.compare_to(coord) == 0:
-            # recalculate positions
-            for lat_walker in self.lattice_walkers:
-                lat_walker.valid_positions = False
+        if isinstance(transform, LorentzTransform):
+            # Walker positions are kept in polar form
+            transform = transform.to_polar()
+        view = (coord.key(), transform.data.tobytes())
+        if view == self.last_view:
+            # Nothing moved, every walker is already where it should be
+            self.view_changed = False
+            return
+        self.last_view = view
+        base_point_changed = self.walker_origin.base_point.coords.compare_to(coord) != 0
+        tree = None
+        if base_point_changed and self.prefetcher is not None and (self.lod or self.reuse_walkers):
+            tree = self.prefetcher.take(coord)
+        if tree is not None:
+            # The tree's LOD selection is for the predicted transform. Select again for
+            # the real one (against the current tree, like the synchronous path does)
+            # and rebuild from the swapped in walkers if the prediction was off
+            indices = self.select_lod_walkers(transform) if self.lod else None
+            self.swap_walker_tree(tree)
+            if indices is not None and not np.array_equal(indices, tree.indices):
+                self.rebuild_lattice_walkers(self.lod_max_radius, indices)
+                if profiler.enabled:
+                    profiler.count("prefetch_reselected")
+        elif self.lod:
+            indices = self.select_lod_walkers(transform)
+            if base_point_changed or not np.array_equal(indices, self.walker_template_indices):
+                self.walker_origin.base_point = self.get_lattice_point(coord)
+                self.rebuild_lattice_walkers(self.lod_max_radius, indices)
+        elif base_point_changed:
+            if self.reuse_walkers:
+                self.walker_origin.base_point = self.get_lattice_point(coord)
+                self.rebuild_lattice_walkers(self.walker_radius)
+            else:
+                # regen walkers
+                self.walker_generation += 1
+                self.walker_origin.generation = self.walker_generation
+                self.walker_origin.direction_offset = 0
+                self.walker_origin.base_point = self.get_lattice_point(coord)
+                self.walker_origin.base_point.attached_walker=self.walker_origin
+                
+                self.walker_origin.absolute_position = copy.deepcopy(transform)
+                self.walker_origin.render_position = copy.deepcopy(self.walker_origin.absolute_position)
+                self.lattice_walkers.clear()
+                self.lattice_walkers.add(self.walker_origin.coord_origin_rel.key(), self.walker_origin)
+                self.generate_lattice_walkers(self.walker_radius)
+                self.pack_walker_positions()
+        
+        # recalculate positions
+        self.update_walker_positions(transform)
+        
+    def get_walker_template(self, radius: int) -> tuple:
+        """The walker tree of a given radius depends only on the relative coords, so
+        it is built once and cached. Coords are in radius/lexicographic order, so a
+        parent always comes before its children
+
+        Args:
+            radius (int): radius of the walker tree
+
+        Returns:
+            tuple: (coords, parent indices, rel_orient_parent transforms,
+                    PolarTransformArray of positions relative to the walker origin)
+        """
+        if radius in self.walker_templates:
+            return self.walker_templates[radius]
+        
+        table = LatticeCoordArray.up_to_radius(radius)
+        coords = table.coords()
+        parents = table.parents
+        rel_orients = PolarTransformArray(table.leaf_directions*DIRECTION_ANGLE, BRANCH_LENGTH, np.pi)
+        rel_orients.data[:, 0] = 0
+        positions = PolarTransformArray.identity(len(coords))
+        # Ring by ring, each position is its parent's composed with rel_orient_parent
+        ring_start = 1
+        for size in ring_sizes(radius)[1:]:
+            ring = slice(ring_start, ring_start + size)
+            ring_positions = positions[parents[ring]]
+            ring_positions.apply_polar_transform(rel_orients[ring])
+            positions.data[:, ring] = ring_positions.data
+            ring_start += size
+        rel_orients = [rel_orients[i] for i in range(len(coords))]
+        
+        template = (coords, parents, rel_orients, positions)
+        self.walker_templates[radius] = template
+        return template
+    
+    def select_lod_walkers(self, transform: PolarTransform, hysteresis: bool = True) -> np.ndarray:
+        """Selects the walkers of the lod_max_radius template that are big enough on
+        screen for a walker origin transform. If more than lod_walker_budget qualify,
+        the nearest are kept. Ancestors of selected walkers are always kept, so the
+        tree stays connected
+
+        Args:
+            transform (PolarTransform): absolute position of the walker origin
+            hysteresis (bool, optional): keep currently selected walkers down to
+                lod_min_pixels * lod_hysteresis
+
+        Returns:
+            np.ndarray: sorted template indices
+        """
+        coords, parents, rel_orients, positions = self.get_walker_template(self.lod_max_radius)
+        absolute = PolarTransformArray.identity(len(positions))
+        absolute.assign(transform)
+        absolute.apply_polar_transform(positions)
+        distances = absolute.s
+        distances[0] = transform.s
+        
+        min_pixels = np.full(len(coords), self.lod_min_pixels)
+        if hysteresis and self.walker_template_indices is not None:
+            min_pixels[self.walker_template_indices] *= self.lod_hysteresis
+        candidates = np.flatnonzero(tile_footprint(distances) >= min_pixels)
+        if len(candidates) > self.lod_walker_budget:
+            candidates = candidates[np.argsort(distances[candidates], kind='stable')[:self.lod_walker_budget]]
+        selected = np.zeros(len(coords), dtype=bool)
+        selected[0] = True
+        selected[candidates] = True
+        while len(candidates) > 0:
+            candidates = parents[candidates]
+            candidates = candidates[candidates >= 0]
+            candidates = candidates[~selected[candidates]]
+            selected[candidates] = True
+        return np.flatnonzero(selected)
+    
+    def rebuild_lattice_walkers(self, radius: int, indices: np.ndarray = None) -> None:
+        """Rebuild the whole walker tree around the new base point of the walker
+        origin. This is not an incremental re-root: every walker of the new tree is
+        visited and gets a new coord_origin_rel, direction_offset and template
+        position, since all of them are relative to the origin. What it saves is
+        allocation, walkers of the previous tree whose base point is still in the
+        tree are reused, and new walkers are only created for the tiles that
+        entered it. The new tree is packed, positions are left to
+        update_walker_positions
+
+        Args:
+            radius (int): radius of the walker tree
+            indices (np.ndarray, optional): sorted template indices to keep, all by default
+        """
+        coords, parents, rel_orients, positions = self.get_walker_template(radius)
+        if indices is None:
+            indices = range(len(coords))
+        self.walker_template_indices = indices
+        prev_generation = self.walker_generation
+        self.walker_generation += 1
+        
+        origin = self.walker_origin
+        origin.direction_offset = 0
+        origin.generation = self.walker_generation
+        origin.base_point.attached_walker = origin
+        self.lattice_walkers.clear()
+        self.lattice_walkers.add(coords[0].key(), origin)
+        
+        walkers = [None] * len(coords)
+        walkers[0] = origin
+        for index in indices:
+            if index == 0:
+                continue
+            coord = coords[index]
+            parent = walkers[parents[index]]
+            direction = parent.direction_offset + coord.direction_of_leaf()
+            base_point = parent.base_point.point_in_direction(direction)
             
-            self.walker_origin.absolute_position = copy.deepcopy(transform)
-            self.walker_origin.render_position = copy.deepcopy(self.walker_origin.absolute_position)
-            self.walker_origin.valid_positions = True
+            walker = base_point.attached_walker
+            if walker is None or walker is origin or walker.generation != prev_generation:
+                # Frontier
+                walker = LatticeWalker(d_coord_rel=coord, d_system=self)
+                if profiler.enabled:
+                    profiler.count("walkers_regenerated")
+            elif profiler.enabled:
+                profiler.count("walkers_reused")
+            walker.coord_origin_rel = coord
+            walker.rel_orient_parent = rel_orients[index]
+            walker.position_origin_rel = positions[index]
+            walker.generation = self.walker_generation
+            walker.base_point = base_point
+            walker.direction_offset = parent.base_point.turn_in_direction(direction)
+            walker.valid_positions = False
+            base_point.attached_walker = walker
             
-            for walker in self.lattice_walkers:
-                self.validate_walker_positions(walker)
+            self.lattice_walkers.add(coord.key(), walker)
+            walkers[index] = walker
+        
+        self.pack_walker_positions([walker for walker in walkers if walker is not None], positions[np.asarray(indices)])
+
+    def build_walker_tree(self, coord: LatticeCoord, transform: PolarTransform) -> WalkerTree:
+        """Builds the walker tree for a walker origin at coord, without attaching it
+        to anything. Safe to call off the render thread as long as the walker
+        template is already cached: the point store is only read with plain
+        lookups, and missing points are created but not added
+
+        Args:
+            coord (LatticeCoord): base point of the walker origin
+            transform (PolarTransform): expected absolute position of the walker origin,
+                used for the LOD selection (with hysteresis against the current tree).
+                set_view_origin selects again for the real transform on swap
+
+        Returns:
+            WalkerTree: tree to pass to swap_walker_tree
+        """
+        radius = self.lod_max_radius if self.lod else self.walker_radius
+        coords, parents, rel_orients, positions = self.walker_templates[radius]
+        if self.lod:
+            indices = self.select_lod_walkers(transform)
         else:
-            # regen walkers
-            self.walker_origin.direction_offset = 0
-            self.walker_origin.base_point = self.get_lattice_point(coord)
-            self.walker_origin.base_point.attached_walker=self.walker_origin
+            indices = np.arange(len(coords))
+        
+        items = self.lattice_points.items
+        base_coords = [None] * len(coords)
+        offsets = [0] * len(coords)
+        base_coords[0] = coord
+        walkers = [None]
+        points = {}
+        for index in indices[1:]:
+            parent = parents[index]
+            parent_coord = base_coords[parent]
+            direction = (offsets[parent] + coords[index].direction_of_leaf()) % DIRECTIONS
+            base_coord = parent_coord.coord_in_direction(direction)
+            offsets[index] = parent_coord.direction_after_travel(direction)
+            base_coords[index] = base_coord
             
-            self.walker_origin.absolute_position = copy.deepcopy(transform)
-            self.walker_origin.render_position = copy.deepcopy(self.walker_origin.absolute_position)
-            self.lattice_walkers = [self.walker_origin]
-            self.generate_lattice_walkers(3)
+            key = base_coord.key()
+            point = points.get(key)
+            if point is None:
+                point = items.get(key)
+                if point is None:
+                    point = LatticePoint(base_coord, self)
+                points[key] = point
+            walker = LatticeWalker(d_coord_rel=coords[index], d_system=self)
+            walker.rel_orient_parent = rel_orients[index]
+            walker.position_origin_rel = positions[index]
+            walker.base_point = point
+            walker.direction_offset = offsets[index]
+            walkers.append(walker)
         
+        # Packed like pack_walker_positions, the origin's views are set on swap
+        tree = WalkerTree(coord, indices, walkers)
+        tree.positions_origin_rel = positions[indices]
+        tree.direction_offsets = np.array([offsets[index] for index in indices], dtype=float)
+        tree.branch2 = np.array([base_coords[index].type == LatticeType.BRANCH2 for index in indices], dtype=bool)
+        tree.absolute_positions = PolarTransformArray.identity(len(indices))
+        tree.render_positions = PolarTransformArray.identity(len(indices))
+        for i in range(1, len(walkers)):
+            walkers[i].absolute_position = tree.absolute_positions[i]
+            walkers[i].render_position = tree.render_positions[i]
+        return tree
+    
+    def swap_walker_tree(self, tree: WalkerTree) -> None:
+        """Makes a tree from build_walker_tree the current walker tree. Points created
+        with the tree are added to the store, unless one was added for the same
+        coord in the meantime. Positions are left to update_walker_positions
+        """
+        self.walker_template_indices = tree.indices
+        self.walker_generation += 1
+        
+        origin = self.walker_origin
+        origin.base_point = self.get_lattice_point(tree.coord)
+        origin.direction_offset = 0
+        origin.generation = self.walker_generation
+        origin.base_point.attached_walker = origin
+        tree.walkers[0] = origin
+        self.lattice_walkers.clear()
+        self.lattice_walkers.add(origin.coord_origin_rel.key(), origin)
+        
+        for walker in tree.walkers[1:]:
+            point = walker.base_point
+            key = point.coords.key()
+            stored = self.lattice_points.get(key)
+            if stored is None:
+                self.lattice_points.add(key, point)
+                if profiler.enabled:
+                    profiler.count("lattice_points_allocated")
+            elif stored is not point:
+                walker.base_point = stored
+            walker.generation = self.walker_generation
+            walker.base_point.attached_walker = walker
+            self.lattice_walkers.add(walker.coord_origin_rel.key(), walker)
+        
+        self.packed_walkers = tree.walkers
+        self.walker_positions_origin_rel = tree.positions_origin_rel
+        self.walker_direction_offsets = tree.direction_offsets
+        self.walker_branch2 = tree.branch2
+        self.walker_absolute_positions = tree.absolute_positions
+        self.walker_render_positions = tree.render_positions
+        origin.absolute_position = tree.absolute_positions[0]
+        origin.render_position = tree.render_positions[0]
+        if profiler.enabled:
+            profiler.count("walker_trees_swapped")
+
+    @property
+    def renderer(self) -> Renderer:
+        if not isinstance(self._renderer, Renderer):
+            self._renderer = get_renderer(self._renderer)
+        return self._renderer
+    
+    @renderer.setter
+    def renderer(self, renderer) -> None:
+        self._renderer = renderer
+
+    def render_walkers(self, graphic, font, print_text: bool, dirty: list = None) -> None:
+        """Batched equivalent of calling render_point on the base point of every walker.
+        graphic is the renderer's draw target, e.g. a pygame.Surface. If dirty is given,
+        the areas drawn over are appended to it
+        """
+        transforms = self.walker_render_positions.get_matrix3()
+        footprints = tile_footprint(self.walker_render_positions.s) if self.lod else None
+        screen_pos = self.renderer.draw_tiles(graphic, transforms, self.walker_branch2, footprints, dirty)
+        if print_text:
+            walkers = self.packed_walkers
+            if self.label_min_pixels is not None:
+                if footprints is None:
+                    footprints = tile_footprint(self.walker_render_positions.s)
+                shown = np.flatnonzero(footprints >= self.label_min_pixels)
+                walkers = [walkers[i] for i in shown]
+                screen_pos = screen_pos[shown]
+            surfaces = [self.label_cache.get(font, walker.base_point.coords.key(), walker.base_point.to_string) for walker in walkers]
+            self.renderer.draw_labels(graphic, surfaces, screen_pos, dirty)
+    
     def set_view_origin_lattrans(self, transform: LatticeTransform) -> None:
         self.set_view_origin(transform.base_point.coords, transform.rel_transform)
+    
+    def locate_points(self, points: np.ndarray) -> tuple:
+        """Finds the lattice point nearest to each of N hyperboloid points given in view
+        coordinates. The cell around a lattice point is bounded by the bisectors of its
+        five edges, so stepping to whichever neighbour is nearer until none is reaches
+        it in about as many steps as the point is far from the walker origin. All
+        queries step together; only the neighbour lookups run per query
+
+        Args:
+            points (np.ndarray): (N, 3) hyperboloid points
+
+        Returns:
+            tuple: (list of N LatticePoints, PolarTransformArray of the offset of each
+                    query in its lattice point's frame: angle n, distance s)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        origin = self.walker_origin
+        local = points @ hyper_utils.minkowski_inverse(origin.render_position.get_matrix3()).T
+        located = [origin.base_point] * len(points)
+        active = np.arange(len(points))
+        while len(active) > 0:
+            cosh_distances = local[active] @ NEIGHBOR_POINTS.T
+            directions = np.argmin(cosh_distances, axis=1)
+            nearer = cosh_distances[np.arange(len(active)), directions] < local[active, 0] - 1e-12
+            active = active[nearer]
+            directions = directions[nearer]
+            turns = np.empty(len(active), dtype=int)
+            for i, (query, direction) in enumerate(zip(active.tolist(), directions.tolist())):
+                point = located[query]
+                turns[i] = point.turn_in_direction(direction)
+                located[query] = point.point_in_direction(direction)
+            local[active] = np.einsum('nij,nj->ni', STEP_INVERSES[directions, turns], local[active])
+        offsets = PolarTransformArray(np.arctan2(local[:, 2], local[:, 1]), np.arccosh(np.maximum(local[:, 0], 1)), 0)
+        return located, offsets
+    
+    def pick(self, pixels: np.ndarray) -> tuple:
+        """locate_points for (N, 2) screen pixels. Pixels outside the disc give None
+
+        Returns:
+            tuple: (list of N LatticePoints or None, PolarTransformArray of offsets)
+        """
+        disc = screen_to_disc(np.asarray(pixels, dtype=float).reshape(-1, 2))
+        inside = np.sum(disc * disc, axis=1) < 1
+        located, offsets = self.locate_points(hyper_utils.disc_to_hyperboloid(np.where(inside[:, np.newaxis], disc, 0)))
+        return [point if hit else None for point, hit in zip(located, inside.tolist())], offsets
             
+    def is_lattice_point_pinned(self, point: LatticePoint) -> bool:
+        """A point may not be evicted while a walker of the current (or the previous,
+        during a re-root) tree references it
+        """
+        if point in self.scheduler:
+            return True
+        walker = point.attached_walker
+        return walker is not None and walker.generation >= self.walker_generation - 1
+    
+    def is_lattice_point_visible(self, point: LatticePoint) -> bool:
+        walker = point.attached_walker
+        return walker is not None and walker.generation == self.walker_generation
+    
+    def forget_lattice_point(self, point: LatticePoint) -> None:
+        """Drops the references to an evicted point, so that it can be freed and is
+        regenerated the next time it is needed
+        """
+        for direction in range(DIRECTIONS):
+            neighbor = point.neighbors[direction]
+            if neighbor is not None:
+                back = point.neighbor_turns[direction] % DIRECTIONS
+                if neighbor.neighbors[back] is point:
+                    neighbor.neighbors[back] = None
+                point.neighbors[direction] = None
+        point.attached_walker = None
+        if profiler.enabled:
+            profiler.count("lattice_points_evicted")
+    
     def get_lattice_point(self, coord: LatticeCoord) -> LatticePoint:
-        index = self.find_viable_point_index(coord)
-        if index >= len(self.lattice_points):
+        L = self.lattice_points.get(coord.key())
+        if L is None:
             L = self.generate_lattice_point(coord)
-        else:
-            if self.lattice_points[index].coords.compare_to(coord) == 0:
-                L = self.lattice_points[index]
-            else:
-                L = self.generate_lattice_point(coord)
-        
-        if L.coords.compare_to(coord) == 0:
-            return L
-        return
+        return L
     
     def get_lattice_point_if_exists(self, coord: LatticeCoord) -> LatticePoint:
-        index = self.find_viable_point_index(coord)
-        if index >= len(self.lattice_points):
-            return
-        else:
-            if self.lattice_points[index].coords.compare_to(coord) == 0:
-                return self.lattice_points[index]
-        return
+        return self.lattice_points.get(coord.key())
     
     def find_viable_point_index(self, coord: LatticeCoord) -> int:
-        """Finds the index where a lattice point of a given coord should be placed.
-        If the lattice point with the given coord exists, it gives the index of it. BINARY SEARCH
+        """Finds the index where a lattice point of a given coord should be placed in
+        lattice_points.ordered(). If the lattice point with the given coord exists,
+        it gives the index of it. BINARY SEARCH. Lookups go through the hashed store,
+        this is only needed by code that works on the ordered view
 
         Args:
             coord (LatticeCoord): _description_
@@ -95,13 +559,14 @@ class LatticeSystem(object):
             print("INVALID LATTICECOORD")
             print(coord.to_string())
             return -1
+        lattice_points = self.lattice_points.ordered()
         min_index = 0
-        max_index = len(self.lattice_points) - 1
+        max_index = len(lattice_points) - 1
         if max_index < 0:
             return 0
         
-        compare_to_min_index = self.lattice_points[min_index].compare_to(coord)
-        compare_to_max_index = self.lattice_points[max_index].compare_to(coord)
+        compare_to_min_index = lattice_points[min_index].compare_to(coord)
+        compare_to_max_index = lattice_points[max_index].compare_to(coord)
         while True:
             if compare_to_min_index >= 0:
                 # If the min index is the same or greater than the search coord, return min_index
@@ -118,7 +583,7 @@ class LatticeSystem(object):
                 return max_index
             
             mid_index = (min_index + max_index) // 2
-            compare_to_midpoint = self.lattice_points[mid_index].compare_to(coord)
+            compare_to_midpoint = lattice_points[mid_index].compare_to(coord)
             if compare_to_midpoint < 0:
                 min_index = mid_index
                 compare_to_min_index = compare_to_midpoint
@@ -138,19 +603,22 @@ class LatticeSystem(object):
         """
         
         if coord.type != LatticeType.INVALID:
-            index = self.find_viable_point_index(coord)
-            
-            if len(self.lattice_points) > 0:
-                try:
-                    if self.lattice_points[index].compare_to(coord) == 0:
-                        return self.lattice_points[index]
-                except:
-                    pass
+            key = coord.key()
+            L = self.lattice_points.get(key)
+            if L is not None:
+                return L
             
             L = LatticePoint(coord, self)
-            index = self.find_viable_point_index(coord)
-            self.lattice_points.insert(index, L)
+            self.lattice_points.add(key, L)
+            if profiler.enabled:
+                profiler.count("lattice_points_allocated")
+            if coord.type != LatticeType.ORIGIN:
+                parent = self.lattice_points.get(coord.coord_in_direction(0).key())
+                if parent is not None:
+                    L.link_neighbor(0, parent)
             return L
+        print("INVALID LATTICECOORD")
+        print(coord.to_string())
         return
     
     def generate_lattice_points(self, radius: int) -> None:
@@ -159,14 +627,14 @@ class LatticeSystem(object):
         Args:
             radius (int): _description_
         """
-        iter = LatticeCircularIterator(radius)
-        while iter.has_next():
-            self.generate_lattice_point(iter.this_coord)
-            iter.next()
+        for coord in LatticeCoordArray.ring(radius).coords():
+            self.generate_lattice_point(coord)
     
     def find_viable_walker_index(self, coord: LatticeCoord) -> int:
-        """Finds the index where a lattice walker of a given coord should be placed.
-        If the lattice walker with the given coord exists, it gives the index of it. BINARY SEARCH
+        """Finds the index where a lattice walker of a given coord should be placed in
+        lattice_walkers.ordered(). If the lattice walker with the given coord exists,
+        it gives the index of it. BINARY SEARCH. Lookups go through the hashed store,
+        this is only needed by code that works on the ordered view
 
         Args:
             coord (LatticeCoord): _description_
@@ -176,13 +644,14 @@ class LatticeSystem(object):
         """
         if coord.type == LatticeType.INVALID:
             return -1
+        lattice_walkers = self.lattice_walkers.ordered()
         min_index = 0
-        max_index = len(self.lattice_walkers) - 1
+        max_index = len(lattice_walkers) - 1
         if max_index < 0:
             return 0
         
-        compare_to_min_index = self.lattice_walkers[min_index].compare_to(coord)
-        compare_to_max_index = self.lattice_walkers[max_index].compare_to(coord)
+        compare_to_min_index = lattice_walkers[min_index].compare_to(coord)
+        compare_to_max_index = lattice_walkers[max_index].compare_to(coord)
         
         while True:
             if compare_to_min_index >= 0:
@@ -200,7 +669,7 @@ class LatticeSystem(object):
                 return max_index
             
             mid_index = (min_index + max_index) // 2
-            compare_to_midpoint = self.lattice_walkers[mid_index].compare_to(coord)
+            compare_to_midpoint = lattice_walkers[mid_index].compare_to(coord)
             if compare_to_midpoint < 0:
                 min_index = mid_index
                 compare_to_min_index = compare_to_midpoint
@@ -219,24 +688,25 @@ class LatticeSystem(object):
             LatticeWalker: _description_
         """
         if coord.type != LatticeType.INVALID:
-            index = self.find_viable_walker_index(coord)
-            if len(self.lattice_walkers) > 0:
-                try:
-                    if self.lattice_walkers[index].compare_to(coord) == 0:
-                        return self.lattice_walkers[index]
-                except:
-                    pass    
-            
+            key = coord.key()
+            temp = self.lattice_walkers.get(key)
+            if temp is not None:
+                return temp
             
             temp = LatticeWalker(d_coord_rel=coord, d_system=self)
+            temp.generation = self.walker_generation
+            if profiler.enabled:
+                profiler.count("walkers_regenerated")
             
             if coord.type != LatticeType.ORIGIN:
                 parent = self.generate_lattice_walker(coord.coord_in_direction(0))
+                temp.position_origin_rel = parent.position_origin_rel.copy()
+                temp.position_origin_rel.apply_polar_transform(temp.rel_orient_parent)
                 temp.absolute_position = temp.rel_orient_parent.copy()
                 temp.absolute_position.preapply_polar_transform(parent.absolute_position)
-                temp.base_point = self.get_lattice_point(parent.base_point.coords.coord_in_direction(parent.direction_offset + coord.direction_of_leaf()))
+                temp.base_point = parent.base_point.point_in_direction(parent.direction_offset + coord.direction_of_leaf())
                 temp.base_point.attached_walker = temp
-                temp.direction_offset = parent.base_point.coords.direction_after_travel(parent.direction_offset + coord.direction_of_leaf())
+                temp.direction_offset = parent.base_point.turn_in_direction(parent.direction_offset + coord.direction_of_leaf())
                 
                 # if len(coord.coord) == 1:
                 #     # print(temp.absolute_position.to_string())
@@ -245,10 +715,9 @@ class LatticeSystem(object):
                 #     # print(parent.absolute_position.to_string())
                 #     # asdf
                 temp.render_position = copy.deepcopy(temp.absolute_position)
-                temp.render_position.apply_rotation(-(temp.direction_offset) * 2*np.pi/5)
+                temp.render_position.apply_rotation(-(temp.direction_offset)*DIRECTION_ANGLE)
             temp.valid_positions = True
-            index = self.find_viable_walker_index(coord)
-            self.lattice_walkers.insert(index, temp)
+            self.lattice_walkers.add(key, temp)
             return temp
         return
     
@@ -258,19 +727,13 @@ class LatticeSystem(object):
         Args:
             radius (int): _description_
         """
-        iter = LatticeCircularIterator(radius)
-        while iter.has_next():
-            self.generate_lattice_walker(iter.this_coord)
-            iter.next()
+        for coord in LatticeCoordArray.ring(radius).coords():
+            self.generate_lattice_walker(coord)
     
     def get_lattice_walker(self, coord: LatticeCoord) -> LatticeWalker:
-        index = self.find_viable_walker_index(coord)
-        temp = self.lattice_walkers[index]
-        
-        if temp.coord_origin_rel.compare_to(coord) == 0:
-            return temp
-        return
+        return self.lattice_walkers.get(coord.key())
     
     def update(self) -> None:
-        for lat_pt in self.lattice_points:
-            lat_pt.update()
\ No newline at end of file
+        updated = self.scheduler.tick()
+        if profiler.enabled:
+            profiler.count("lattice_points_updated", updated)
\ No newline at end of file
@@ -0,0 +1,763 @@
+"""Coordinates on the vertices of regular {p, q} hyperbolic tilings (p-gons, q of them
+around every vertex), driven by tables generated for the tiling.
+
+A coordinate is the path from the origin down a spanning tree of the vertex graph:
+a vertex's parent is one of its neighbours one edge nearer the origin, and the
+digits say which child is taken at every level. Vertices of one ring (same
+distance from the origin) in digit order go once around the ring, so every edge
+that isn't a tree edge joins a vertex to the ring predecessor or successor of
+itself, its parent, or (for the first child of the successor, or the last child
+of the predecessor) the ring below. Which of these a direction leads to only
+depends on the vertex's state in a finite automaton, so every neighbour step is
+a few table lookups, plus a carry when stepping along a ring overflows a parent.
+
+The tables are generated by laying out the tiling geometrically around the
+origin and reading the tree off it, then merging vertices with the same cone
+type (same moves, and children of the same types) into one state.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+import hyper.hyper_utils as hyper_utils
+
+# Kinds of moves from a vertex in a direction
+PARENT = 0
+CHILD = 1
+PRED_PARENT = 2
+SUCC_PARENT = 3
+PRED = 4
+SUCC = 5
+FIRST_CHILD_OF_SUCC = 6
+LAST_CHILD_OF_PRED = 7
+MOVE_NAMES = ("parent", "child", "pred(parent)", "succ(parent)", "pred", "succ",
+              "first_child(succ)", "last_child(pred)")
+# bytes((i,)) for every digit or state, appending one is the hot path of every step
+BYTE = tuple(bytes((i,)) for i in range(256))
+
+def edge_length(p: int, q: int) -> float:
+    """Length of an edge of the regular {p, q} tiling, cosh(l / 2) = cos(pi / p) / sin(pi / q)"""
+    c = np.cos(np.pi / p) / np.sin(np.pi / q)
+    if c <= 1 + 1e-12:
+        raise ValueError("{%d,%d} is not a hyperbolic tiling, (p - 2)(q - 2) must be more than 4" % (p, q))
+    return 2 * np.arccosh(c)
+
+
+class TilingAutomaton(object):
+    """Transition tables of the coordinate tree of a {p, q} tiling. States are
+    numbered from 0, the origin's state is root. For every state s:
+
+        child_count[s]           number of children
+        child_state[s][digit]    state of each child
+        child_direction[s][digit] direction of each child from the vertex
+        moves[s][direction]      (kind, digit) of the move in each direction, the
+                                 digit is only used by CHILD moves
+        turns[s][direction]      direction that leads back from the neighbour,
+                                 None for PARENT, where it is the leaf direction
+
+    Coordinates are handled as (digits, states) bytes pairs, states[i] being the
+    state of the vertex with digits[:i + 1].
+    """
+
+    def __init__(self, p: int, q: int, root: int, child_state: tuple, child_direction: tuple, moves: tuple, turns: tuple) -> None:
+        self.p = p
+        self.q = q
+        self.edge_length = edge_length(p, q)
+        self.angle = 2 * np.pi / q
+        self.root = root
+        self.child_state = child_state
+        self.child_direction = child_direction
+        self.child_count = tuple(len(children) for children in child_state)
+        self.moves = moves
+        self.turns = turns
+        self.n_states = len(child_state)
+        # (state, depth, last) -> digits and states of the first or last descendants
+        self._tails = {}
+        # Which states have a second neighbour one ring nearer the origin, before
+        # or after the parent, and an edge to the next vertex of their ring
+        self.pred_parent = tuple(any(kind == PRED_PARENT for kind, _ in state_moves) for state_moves in moves)
+        self.succ_parent = tuple(any(kind == SUCC_PARENT for kind, _ in state_moves) for state_moves in moves)
+        self.succ_edge = tuple(any(kind == SUCC for kind, _ in state_moves) for state_moves in moves)
+        self.down_directions = tuple(tuple(direction for direction, (kind, _) in enumerate(state_moves)
+                                           if kind in (CHILD, FIRST_CHILD_OF_SUCC, LAST_CHILD_OF_PRED))
+                                     for state_moves in moves)
+        # With faces of at most 4 sides, some shortest path between any two vertices
+        # only climbs towards the origin and back (plus steps along one ring), so
+        # distances come from climbing segments, see path
+        self.climbs = p <= 4
+
+    @classmethod
+    def build(cls, p: int, q: int, radius: int = None) -> "TilingAutomaton":
+        """Generates the tables by laying out the tiling out to radius edges from the
+        origin. Raises ValueError if the tree found there isn't consistent with a
+        finite automaton (radius too small)
+        """
+        return _build_automaton(p, q, radius)
+
+    # Coordinates
+
+    def state(self, states: bytes) -> int:
+        return states[-1] if states else self.root
+
+    def run(self, digits: bytes) -> bytes:
+        """States along digits, None if they aren't a valid coordinate"""
+        child_state = self.child_state
+        state = self.root
+        states = bytearray(len(digits))
+        for i, digit in enumerate(digits):
+            children = child_state[state]
+            if digit >= len(children):
+                return None
+            state = children[digit]
+            states[i] = state
+        return bytes(states)
+
+    def leaf_direction(self, digits: bytes, states: bytes) -> int:
+        """Direction from the parent to this vertex, 0 at the origin"""
+        if not digits:
+            return 0
+        parent_state = states[-2] if len(states) > 1 else self.root
+        return self.child_direction[parent_state][digits[-1]]
+
+    def successor(self, digits: bytes, states: bytes) -> tuple:
+        """Next vertex of the same ring, going around it in digit order"""
+        child_count = self.child_count
+        last = i = len(digits) - 1
+        while i > 0 and digits[i] + 1 >= child_count[states[i - 1]]:
+            i -= 1
+        parent_state = states[i - 1] if i > 0 else self.root
+        digit = (digits[i] + 1) % child_count[parent_state]
+        if i == last:
+            return digits[:i] + BYTE[digit], states[:i] + BYTE[self.child_state[parent_state][digit]]
+        return self._descend(digits[:i], states[:i], parent_state, digit, last - i, False)
+
+    def predecessor(self, digits: bytes, states: bytes) -> tuple:
+        """Previous vertex of the same ring"""
+        last = i = len(digits) - 1
+        while i > 0 and digits[i] == 0:
+            i -= 1
+        parent_state = states[i - 1] if i > 0 else self.root
+        digit = (digits[i] - 1) % self.child_count[parent_state]
+        if i == last:
+            return digits[:i] + BYTE[digit], states[:i] + BYTE[self.child_state[parent_state][digit]]
+        return self._descend(digits[:i], states[:i], parent_state, digit, last - i, True)
+
+    def _descend(self, digits: bytes, states: bytes, parent_state: int, digit: int, depth: int, last: bool) -> tuple:
+        """digits + [digit], followed by depth first (or last) children"""
+        state = self.child_state[parent_state][digit]
+        key = (state, depth, last)
+        tail = self._tails.get(key)
+        if tail is None:
+            tail_digits = bytearray()
+            tail_states = bytearray()
+            tail_state = state
+            for _ in range(depth):
+                tail_digit = self.child_count[tail_state] - 1 if last else 0
+                tail_state = self.child_state[tail_state][tail_digit]
+                tail_digits.append(tail_digit)
+                tail_states.append(tail_state)
+            tail = self._tails[key] = (bytes(tail_digits), bytes(tail_states))
+        return digits + BYTE[digit] + tail[0], states + BYTE[state] + tail[1]
+
+    def neighbor(self, digits: bytes, states: bytes, direction: int) -> tuple:
+        """(digits, states) of the neighbour in a direction"""
+        state = states[-1] if states else self.root
+        kind, digit = self.moves[state][direction % self.q]
+        if kind == CHILD:
+            return digits + BYTE[digit], states + BYTE[self.child_state[state][digit]]
+        if kind == PARENT:
+            return digits[:-1], states[:-1]
+        if kind == PRED_PARENT:
+            return self.predecessor(digits[:-1], states[:-1])
+        if kind == SUCC_PARENT:
+            return self.successor(digits[:-1], states[:-1])
+        if kind == PRED:
+            return self.predecessor(digits, states)
+        if kind == SUCC:
+            return self.successor(digits, states)
+        if kind == FIRST_CHILD_OF_SUCC:
+            digits, states = self.successor(digits, states)
+            return digits + BYTE[0], states + BYTE[self.child_state[states[-1]][0]]
+        digits, states = self.predecessor(digits, states)
+        digit = self.child_count[states[-1]] - 1
+        return digits + BYTE[digit], states + BYTE[self.child_state[states[-1]][digit]]
+
+    def turn(self, digits: bytes, states: bytes, direction: int) -> int:
+        """Direction from the neighbour in a direction back to this vertex"""
+        direction %= self.q
+        turn = self.turns[states[-1] if states else self.root][direction]
+        if turn is None:
+            return self.leaf_direction(digits, states)
+        return turn
+
+    # Distances
+
+    def distance(self, a: tuple, b: tuple) -> int:
+        """Number of edges on a shortest path between two (digits, states) vertices"""
+        if self.climbs:
+            return self._climb(a, b)[0]
+        return len(self._search(a, b)) - 1
+
+    def path(self, a: tuple, b: tuple) -> list:
+        """A shortest path between two (digits, states) vertices, as the (digits,
+        states) of every vertex from a to b.
+
+        For p <= 4 the path is read off ring segments climbed from both ends: the
+        vertices one ring nearer the origin on shortest paths from a vertex form a
+        segment of that ring, and so do the vertices k rings nearer. Climbing from
+        a and b in step, the first segments to overlap, or to be joined by a
+        short run of edges along their ring, give the shortest path, in a few
+        steps per ring. Other tilings have paths that dip away from the origin
+        and fall back to a bidirectional search over the tables.
+        """
+        if not self.climbs:
+            return self._search(a, b)
+        _, segments_a, segments_b, run = self._climb(a, b)
+        return self._descend_segments(segments_a, run[0])[::-1] + run[1:] + self._descend_segments(segments_b, run[-1])[1:]
+
+    def distances(self, sources: list, targets: list) -> np.ndarray:
+        """(N, M) int array of distance() from every one of N (digits, states)
+        sources to every one of M targets.
+
+        Without steps along rings (p = 4), the distance is fixed by the deepest
+        ring on which the segments climbed from both ends overlap. Each end is
+        climbed once, and the segments are compared for all pairs at once, ring
+        by ring, as ranks of their digits in ring order. With steps along rings
+        every pair is climbed on its own, and tilings that don't climb search
+        once from every source until all targets are reached
+        """
+        result = np.empty((len(sources), len(targets)), dtype=np.int64)
+        if len(sources) == 0 or len(targets) == 0:
+            return result
+        if not self.climbs:
+            for i, a in enumerate(sources):
+                reached = self._distances_from(a, {b[0] for b in targets})
+                result[i] = [reached[b[0]] for b in targets]
+            return result
+        if any(self.succ_edge):
+            for i, a in enumerate(sources):
+                result[i] = [self.distance(a, b) for b in targets]
+            return result
+
+        chains = [self._segment_chain(vertex) for vertex in sources + targets]
+        depths = np.array([len(chain) - 1 for chain in chains])
+        radius = depths.max()
+        # Rank of the digits of every segment end in the order of its ring; -1
+        # on rings deeper than the end
+        lo = np.full((len(chains), radius + 1), -1, dtype=np.int64)
+        hi = np.full((len(chains), radius + 1), -1, dtype=np.int64)
+        for level in range(radius + 1):
+            ends = sorted({digits for chain in chains if len(chain) > level for digits in chain[level]})
+            rank = {digits: i for i, digits in enumerate(ends)}
+            for i, chain in enumerate(chains):
+                if len(chain) > level:
+                    lo[i, level] = rank[chain[level][0]]
+                    hi[i, level] = rank[chain[level][1]]
+
+        count = len(sources)
+        depth_a, depth_b = depths[:count, np.newaxis], depths[np.newaxis, count:]
+        found = np.zeros(result.shape, dtype=bool)
+        for level in range(radius, -1, -1):
+            lo_a, hi_a = lo[:count, level, np.newaxis], hi[:count, level, np.newaxis]
+            lo_b, hi_b = lo[np.newaxis, count:, level], hi[np.newaxis, count:, level]
+            meet = ~found & (depth_a >= level) & (depth_b >= level) & (
+                _in_segments(lo_a, lo_b, hi_b) | _in_segments(lo_b, lo_a, hi_a))
+            result[meet] = (depth_a + depth_b - 2 * level)[meet]
+            found |= meet
+        return result
+
+    def _segment_chain(self, vertex: tuple) -> list:
+        """(lo digits, hi digits) of the segments climbed from vertex, indexed by ring"""
+        segment = (vertex, vertex)
+        chain = [(vertex[0], vertex[0])]
+        while segment[0][0]:
+            segment = self._climb_segment(segment)
+            chain.append((segment[0][0], segment[1][0]))
+        return chain[::-1]
+
+    def _climb_segment(self, segment: tuple) -> tuple:
+        """The segment one ring nearer the origin reached from a (lo, hi) segment"""
+        (lo_digits, lo_states), (hi_digits, hi_states) = segment
+        if self.pred_parent[lo_states[-1]]:
+            lo = self.predecessor(lo_digits[:-1], lo_states[:-1])
+        else:
+            lo = lo_digits[:-1], lo_states[:-1]
+        if self.succ_parent[hi_states[-1]]:
+            hi = self.successor(hi_digits[:-1], hi_states[:-1])
+        else:
+            hi = hi_digits[:-1], hi_states[:-1]
+        return lo, hi
+
+    @staticmethod
+    def _in_segment(digits: bytes, segment: tuple) -> bool:
+        # Digits order a ring, a segment wraps around its end if lo > hi
+        lo, hi = segment[0][0], segment[1][0]
+        if lo <= hi:
+            return lo <= digits <= hi
+        return digits >= lo or digits <= hi
+
+    def _run(self, start: tuple, segment: tuple, steps: int) -> list:
+        """Vertices from start along edges to ring successors until one is in
+        segment, at most steps edges, None if there is no such run
+        """
+        run = [start]
+        for _ in range(steps):
+            digits, states = run[-1]
+            if not states or not self.succ_edge[states[-1]]:
+                return None
+            run.append(self.successor(digits, states))
+            if self._in_segment(run[-1][0], segment):
+                return run
+        return None
+
+    def _climb(self, a: tuple, b: tuple) -> tuple:
+        """(distance, segments climbed from a, segments climbed from b, run of
+        vertices joining the last segments of both)
+        """
+        segments_a = [(a, a)]
+        segments_b = [(b, b)]
+        while len(segments_a[-1][0][0]) > len(segments_b[-1][0][0]):
+            segments_a.append(self._climb_segment(segments_a[-1]))
+        while len(segments_b[-1][0][0]) > len(segments_a[-1][0][0]):
+            segments_b.append(self._climb_segment(segments_b[-1]))
+        # Climb until the segments overlap, at the origin at the latest
+        while True:
+            segment_a, segment_b = segments_a[-1], segments_b[-1]
+            if self._in_segment(segment_a[0][0], segment_b):
+                meeting = segment_a[0]
+                break
+            if self._in_segment(segment_b[0][0], segment_a):
+                meeting = segment_b[0]
+                break
+            segments_a.append(self._climb_segment(segment_a))
+            segments_b.append(self._climb_segment(segment_b))
+        best = (len(segments_a) + len(segments_b) - 2, len(segments_a), len(segments_b), [meeting])
+        if not any(self.succ_edge):
+            return best[0], segments_a, segments_b, best[3]
+
+        # A run along a ring further from the origin may be shorter
+        offset = len(segments_a) - len(segments_b)
+        for level in range(max(offset, 0), len(segments_a) - 1):
+            cost = level + (level - offset)
+            if cost + 1 >= best[0]:
+                break
+            segment_a, segment_b = segments_a[level], segments_b[level - offset]
+            run = self._run(segment_a[1], segment_b, best[0] - cost - 1)
+            if run is None:
+                run = self._run(segment_b[1], segment_a, best[0] - cost - 1)
+                run = run[::-1] if run is not None else None
+            if run is not None:
+                best = (cost + len(run) - 1, level + 1, level - offset + 1, run)
+        distance, count_a, count_b, run = best
+        return distance, segments_a[:count_a], segments_b[:count_b], run
+
+    def _descend_segments(self, segments: list, vertex: tuple) -> list:
+        """Path from a vertex of the last segment down to the vertex the segments
+        were climbed from, through one vertex of every segment
+        """
+        path = [vertex]
+        for segment in reversed(segments[:-1]):
+            digits, states = path[-1]
+            for direction in self.down_directions[self.state(states)]:
+                below = self.neighbor(digits, states, direction)
+                if self._in_segment(below[0], segment):
+                    path.append(below)
+                    break
+        return path
+
+    def _distances_from(self, a: tuple, targets: set) -> dict:
+        """Breadth first search from a until every digits in targets is reached,
+        digits -> distance of every vertex reached
+        """
+        reached = {a[0]: 0}
+        left = len(targets - {a[0]})
+        frontier = [a]
+        distance = 0
+        while left > 0:
+            distance += 1
+            next_frontier = []
+            for digits, states in frontier:
+                for direction in range(self.q):
+                    neighbor = self.neighbor(digits, states, direction)
+                    if neighbor[0] in reached:
+                        continue
+                    reached[neighbor[0]] = distance
+                    next_frontier.append(neighbor)
+                    if neighbor[0] in targets:
+                        left -= 1
+            frontier = next_frontier
+        return reached
+
+    def _search(self, a: tuple, b: tuple) -> list:
+        """Shortest path by breadth first search from both ends at once"""
+        if a[0] == b[0]:
+            return [a]
+        # digits -> (distance from the end, digits of the vertex it was reached from)
+        reached = ({a[0]: (0, None)}, {b[0]: (0, None)})
+        vertices = {a[0]: a, b[0]: b}
+        frontiers = [[a], [b]]
+        meeting = None
+        while meeting is None:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other = reached[side], reached[1 - side]
+            frontier = []
+            for digits, states in frontiers[side]:
+                distance = seen[digits][0] + 1
+                for direction in range(self.q):
+                    neighbor = self.neighbor(digits, states, direction)
+                    if neighbor[0] in seen:
+                        continue
+                    seen[neighbor[0]] = (distance, digits)
+                    vertices.setdefault(neighbor[0], neighbor)
+                    frontier.append(neighbor)
+                    # Of the vertices met in this round, the one nearest the other end
+                    if neighbor[0] in other and (meeting is None or other[neighbor[0]][0] < other[meeting][0]):
+                        meeting = neighbor[0]
+            frontiers[side] = frontier
+        halves = []
+        for side in (0, 1):
+            half = []
+            digits = meeting
+            while digits is not None:
+                half.append(vertices[digits])
+                digits = reached[side][digits][1]
+            halves.append(half)
+        return halves[0][::-1] + halves[1][1:]
+
+    def ring_sizes(self, radius: int) -> list:
+        """Number of vertices at each distance 0 to radius from the origin"""
+        counts = np.zeros(self.n_states, dtype=object)
+        counts[self.root] = 1
+        sizes = [1]
+        for _ in range(radius):
+            next_counts = np.zeros(self.n_states, dtype=object)
+            for state, count in enumerate(counts):
+                for child in self.child_state[state]:
+                    next_counts[child] += count
+            counts = next_counts
+            sizes.append(int(counts.sum()))
+        return sizes
+
+    def describe(self) -> str:
+        """The tables as text"""
+        lines = ["{%d,%d} edge length %.10f, %d states, root %d" % (self.p, self.q, self.edge_length, self.n_states, self.root)]
+        for state in range(self.n_states):
+            moves = []
+            for direction, (kind, digit) in enumerate(self.moves[state]):
+                name = "child %d" % digit if kind == CHILD else MOVE_NAMES[kind]
+                turn = self.turns[state][direction]
+                moves.append("%d: %s%s" % (direction, name, "" if turn is None else " (back %d)" % turn))
+            lines.append("  %d -> children %s | %s" % (state, list(self.child_state[state]), ", ".join(moves)))
+        return "\n".join(lines)
+
+
+def _in_segments(x: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Vectorized TilingAutomaton._in_segment on ranks along a ring"""
+    return np.where(lo <= hi, (lo <= x) & (x <= hi), (x >= lo) | (x <= hi))
+
+@lru_cache(maxsize=None)
+def get_automaton(p: int, q: int) -> TilingAutomaton:
+    """Shared TilingAutomaton of the {p, q} tiling, generated on first use"""
+    return TilingAutomaton.build(p, q)
+
+
+class TilingCoord(object):
+    """Immutable coordinate of a vertex of the tiling of an automaton, see
+    LatticeCoord for the {4, 5} tiling the lattice is built on
+    """
+
+    __slots__ = ('automaton', 'digits', 'states')
+
+    def __init__(self, automaton: TilingAutomaton, digits: list = ()) -> None:
+        digits = bytes(digits)
+        states = automaton.run(digits)
+        if states is None:
+            raise ValueError("%s is not a coordinate of the {%d,%d} tiling" % (list(digits), automaton.p, automaton.q))
+        object.__setattr__(self, 'automaton', automaton)
+        object.__setattr__(self, 'digits', digits)
+        object.__setattr__(self, 'states', states)
+
+    @classmethod
+    def from_tables(cls, automaton: TilingAutomaton, digits: bytes, states: bytes) -> "TilingCoord":
+        coord = cls.__new__(cls)
+        object.__setattr__(coord, 'automaton', automaton)
+        object.__setattr__(coord, 'digits', digits)
+        object.__setattr__(coord, 'states', states)
+        return coord
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("TilingCoord is immutable")
+
+    def __reduce__(self):
+        return (_tiling_coord, (self.automaton.p, self.automaton.q, self.digits))
+
+    def __hash__(self) -> int:
+        return hash(self.digits)
+
+    def __eq__(self, obj: object) -> bool:
+        if isinstance(obj, TilingCoord):
+            return self.digits == obj.digits and self.automaton is obj.automaton
+        return NotImplemented
+
+    def __len__(self) -> int:
+        return len(self.digits)
+
+    def __repr__(self) -> str:
+        return "TilingCoord{%d,%d}%s" % (self.automaton.p, self.automaton.q, self.to_string())
+
+    @property
+    def state(self) -> int:
+        return self.automaton.state(self.states)
+
+    def coord_in_direction(self, direction: int) -> "TilingCoord":
+        digits, states = self.automaton.neighbor(self.digits, self.states, direction)
+        return TilingCoord.from_tables(self.automaton, digits, states)
+
+    def direction_after_travel(self, direction: int) -> int:
+        return self.automaton.turn(self.digits, self.states, direction)
+
+    def direction_of_leaf(self) -> int:
+        return self.automaton.leaf_direction(self.digits, self.states)
+
+    def distance_to(self, other: "TilingCoord") -> int:
+        return self.automaton.distance((self.digits, self.states), (other.digits, other.states))
+
+    def path_to(self, other: "TilingCoord") -> list:
+        path = self.automaton.path((self.digits, self.states), (other.digits, other.states))
+        return [TilingCoord.from_tables(self.automaton, digits, states) for digits, states in path]
+
+    def key(self) -> bytes:
+        return self.digits
+
+    def to_string(self) -> str:
+        return '<' + ','.join(map(str, self.digits)) + '>'
+
+def _tiling_coord(p: int, q: int, digits: bytes) -> TilingCoord:
+    return TilingCoord(get_automaton(p, q), digits)
+
+
+# Largest ring laid out while looking for the cone types of a tiling
+MAX_LAYOUT_RING = 200000
+
+
+class _TooShallow(ValueError):
+    pass
+
+
+class _TilingLayout(object):
+    """The vertices of a tiling laid out around the origin ring by ring, as frames
+    (hyperboloid isometries taking the origin to the vertex). A vertex is found
+    again by its position on the disc, on a grid with cells far smaller than an edge
+    """
+
+    cell = 1e-7
+
+    def __init__(self, p: int, q: int) -> None:
+        ell = edge_length(p, q)
+        angle = 2 * np.pi / q
+        self.q = q
+        self.neighbor_points = hyper_utils.polar_point(np.arange(q) * angle, ell)
+        self.to_neighbor = hyper_utils.polar_matrix3(np.arange(q) * angle, ell, np.pi)
+        self.frames = [np.eye(3)]
+        self.layers = [0]
+        self.positions = [(0.0, 0.0)]
+        self.grid = {(0, 0): [0]}
+        # Neighbours of every expanded vertex, in the direction order of its frame
+        self.raw_neighbors = []
+        self.ring = [0]
+
+    def find(self, x: float, y: float) -> int:
+        cell = self.cell
+        i, j = int(np.floor(x / cell)), int(np.floor(y / cell))
+        for index in self.grid.get((i, j), ()):
+            px, py = self.positions[index]
+            if abs(px - x) < cell and abs(py - y) < cell:
+                return index
+        # Positions are only accurate to rounding, so look in the cells around too
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for index in self.grid.get((i + di, j + dj), ()) if di or dj else ():
+                    px, py = self.positions[index]
+                    if abs(px - x) < cell and abs(py - y) < cell:
+                        return index
+        return -1
+
+    def expand(self) -> None:
+        """Finds the neighbours of the outermost ring, laying out the next one"""
+        ring = self.ring
+        layer = self.layers[ring[0]] + 1
+        frames = np.array([self.frames[vertex] for vertex in ring])
+        points = frames @ self.neighbor_points.T
+        discs = (points[:, 1:, :] / (points[:, :1, :] + 1)).transpose(0, 2, 1).tolist()
+        next_ring = []
+        for vertex, frame, disc in zip(ring, frames, discs):
+            found = []
+            for direction, (x, y) in enumerate(disc):
+                index = self.find(x, y)
+                if index < 0:
+                    index = len(self.frames)
+                    self.frames.append(frame @ self.to_neighbor[direction])
+                    self.layers.append(layer)
+                    self.positions.append((x, y))
+                    self.grid.setdefault((int(np.floor(x / self.cell)), int(np.floor(y / self.cell))), []).append(index)
+                    next_ring.append(index)
+                found.append(index)
+            self.raw_neighbors.append(found)
+        self.ring = next_ring
+
+
+def _build_automaton(p: int, q: int, radius: int = None) -> TilingAutomaton:
+    """Lays out radius + 1 rings of the tiling and reads the automaton off them.
+    Without a radius, rings are added until the cone types show. Nothing can be
+    read before the faces around the origin close, around ring p // 2
+    """
+    layout = _TilingLayout(p, q)
+    for _ in range((radius if radius is not None else max(4, p // 2 + 2)) + 1):
+        layout.expand()
+    while True:
+        try:
+            return _read_automaton(p, q, layout, layout.layers[-1] - 1)
+        except _TooShallow:
+            if radius is not None or len(layout.ring) > MAX_LAYOUT_RING:
+                raise
+            layout.expand()
+
+def _read_automaton(p: int, q: int, layout: _TilingLayout, radius: int) -> TilingAutomaton:
+    layers = layout.layers
+    raw_neighbors = layout.raw_neighbors
+    expanded = len(raw_neighbors)
+
+    # Canonical frames: direction 0 is the parent, the other neighbours one ring
+    # nearer the origin follow it at directions 1, 2, ...
+    count = len(layers)
+    parents = [-1] * count
+    neighbors = [None] * count
+    neighbors[0] = raw_neighbors[0]
+    for vertex in range(1, expanded):
+        raw = raw_neighbors[vertex]
+        up = [layers[index] == layers[vertex] - 1 for index in raw]
+        starts = [i for i in range(q) if up[i] and not up[i - 1]]
+        if len(starts) != 1:
+            raise ValueError("{%d,%d}: the neighbours nearer the origin aren't contiguous" % (p, q))
+        start = starts[0]
+        neighbors[vertex] = raw[start:] + raw[:start]
+        parents[vertex] = raw[start]
+
+    # Children in direction order, and the digits of every vertex whose children are known
+    max_layer = radius - 1
+    children = [None] * count
+    digits = {0: ()}
+    rings = [[0]]
+    for layer in range(max_layer + 1):
+        next_ring = []
+        for vertex in rings[layer]:
+            children[vertex] = [(direction, index) for direction, index in enumerate(neighbors[vertex])
+                                if layers[index] == layer + 1 and parents[index] == vertex]
+            for digit, (_, child) in enumerate(children[vertex]):
+                digits[child] = digits[vertex] + (digit,)
+                next_ring.append(child)
+        next_ring.sort(key=digits.get)
+        rings.append(next_ring)
+    ring_index = {vertex: i for ring in rings for i, vertex in enumerate(ring)}
+
+    def successor(vertex: int, step: int = 1) -> int:
+        ring = rings[layers[vertex]]
+        return ring[(ring_index[vertex] + step) % len(ring)]
+
+    def lateral_candidates(vertex: int) -> list:
+        parent = parents[vertex]
+        candidates = []
+        if parent > 0:
+            candidates.append((PRED_PARENT, successor(parent, -1)))
+            candidates.append((SUCC_PARENT, successor(parent, 1)))
+        candidates.append((PRED, successor(vertex, -1)))
+        candidates.append((SUCC, successor(vertex, 1)))
+        succ, pred = successor(vertex, 1), successor(vertex, -1)
+        if children[succ]:
+            candidates.append((FIRST_CHILD_OF_SUCC, children[succ][0][1]))
+        if children[pred]:
+            candidates.append((LAST_CHILD_OF_PRED, children[pred][-1][1]))
+        return candidates
+
+    # Moves of every vertex whose neighbours' children are all known
+    signatures = {}
+    for vertex in (v for ring in rings[:max_layer] for v in ring):
+        if vertex > 0 and any(not children[v] for v in (successor(vertex, 1), successor(vertex, -1))):
+            raise ValueError("{%d,%d}: found a vertex without children" % (p, q))
+        moves = []
+        turns = []
+        child_digits = {index: digit for digit, (_, index) in enumerate(children[vertex])}
+        for direction, index in enumerate(neighbors[vertex]):
+            if vertex > 0 and direction == 0:
+                moves.append((PARENT, 0))
+                turns.append(None)
+                continue
+            if index in child_digits:
+                moves.append((CHILD, child_digits[index]))
+            else:
+                kinds = [kind for kind, candidate in lateral_candidates(vertex) if candidate == index]
+                if not kinds:
+                    raise ValueError("{%d,%d}: an edge doesn't fit the ring structure" % (p, q))
+                moves.append((kinds[0], 0))
+            turns.append(neighbors[index].index(vertex))
+        signatures[vertex] = (tuple(direction for direction, _ in children[vertex]), tuple(moves), tuple(turns))
+
+    # Merge vertices into states: start from the signatures, then split by the
+    # states of the children until nothing splits. Each round the children's
+    # states are only known one ring less deep
+    classes = {vertex: (vertex == 0, signature) for vertex, signature in signatures.items()}
+    depth = max_layer - 2
+    while True:
+        if depth < 1:
+            raise _TooShallow("{%d,%d}: radius %d is too small to find the cone types" % (p, q, radius))
+        refined = {vertex: (classes[vertex], tuple(classes[child] for _, child in children[vertex]))
+                   for vertex in classes if layers[vertex] <= depth}
+        before = len({classes[vertex] for vertex in refined})
+        after = len(set(refined.values()))
+        if after == before:
+            # Stable, so old and new classes match one to one, which also gives
+            # the vertices one ring deeper their final class
+            renamed = {classes[vertex]: refined[vertex] for vertex in refined}
+            classes = {vertex: renamed[old] for vertex, old in classes.items() if old in renamed}
+            break
+        classes = refined
+        depth -= 1
+
+    # Number the states in ring order, origin first
+    numbers = {}
+    for vertex in sorted(classes, key=lambda v: (layers[v], ring_index[v])):
+        numbers.setdefault(classes[vertex], len(numbers))
+    state_of = {vertex: numbers[classes[vertex]] for vertex in classes}
+    n_states = len(numbers)
+    child_state = [None] * n_states
+    child_direction = [None] * n_states
+    moves = [None] * n_states
+    turns = [None] * n_states
+    for vertex in sorted(classes, key=lambda v: layers[v]):
+        state = state_of[vertex]
+        child_states = tuple(state_of.get(child, -1) for _, child in children[vertex])
+        directions, state_moves, state_turns = signatures[vertex]
+        if child_state[state] is None or -1 in child_state[state]:
+            child_state[state] = child_states
+            child_direction[state] = directions
+            moves[state] = state_moves
+            turns[state] = state_turns
+        elif -1 not in child_states and child_states != child_state[state]:
+            raise _TooShallow("{%d,%d}: inconsistent cone types at radius %d" % (p, q, radius))
+    if any(-1 in states for states in child_state):
+        raise _TooShallow("{%d,%d}: radius %d is too small to find the cone types" % (p, q, radius))
+
+    # The cone types can look stable near the origin before all cycles of the
+    # tiling have closed, so every vertex laid out has to follow the tables
+    state_of = {0: 0}
+    for vertex in (v for ring in rings[:max_layer] for v in ring):
+        state = state_of[vertex]
+        if signatures[vertex] != (child_direction[state], moves[state], turns[state]):
+            raise _TooShallow("{%d,%d}: the tables found at radius %d don't hold" % (p, q, radius))
+        for digit, (_, child) in enumerate(children[vertex]):
+            state_of[child] = child_state[state][digit]
+    # and generate rings as big as the ones laid out
+    automaton = TilingAutomaton(p, q, 0, tuple(child_state), tuple(child_direction), tuple(moves), tuple(turns))
+    if automaton.ring_sizes(radius + 1) != [layers.count(layer) for layer in range(radius + 2)]:
+        raise _TooShallow("{%d,%d}: the tables found at radius %d don't hold" % (p, q, radius))
+    return automaton
@@ -3,73 +3,277 @@ import copy
 from typing import ForwardRef
 
 import hyper.hyper_utils as hyper_utils
-from hyper.render_utils import BRANCH_LENGTH, project_onto_screen
+from hyper.geometry import BRANCH_LENGTH, DIRECTIONS, DIRECTION_ANGLE, scale_to_screen
+
+
+def _polar_distance(s1, m1, s2, m2):
+    # s of (n1, s1, m1) composed with the inverse of (n2, s2, m2), which only
+    # depends on the translations and the difference of the last rotations
+    cosh_d = np.cosh(s1)*np.cosh(s2) - np.sinh(s1)*np.sinh(s2)*np.cos(m1 - m2)
+    return np.arccosh(np.maximum(cosh_d, 1.0))
+
+def _apply_translation_z(n, s, m, l):
+    temp_n = np.arctan2((np.cos(n)*np.sin(m)+np.cos(m)*np.sin(n)*np.cosh(s))*np.sinh(l)+np.sin(n)*np.sinh(s)*np.cosh(l),
+                        (np.cos(m)*np.cos(n)*np.cosh(s)-np.sin(m)*np.sin(n))*np.sinh(l)+np.cos(n)*np.cosh(l)*np.sinh(s))
+    temp_s = np.arccosh(np.cosh(l)*np.cosh(s)+np.cos(m)*np.sinh(l)*np.sinh(s))
+    temp_m = np.arctan2((np.sin(m)*np.sinh(s)),(np.cosh(s)*np.sinh(l)+np.cosh(l)*np.sinh(s)*np.cos(m)))
+    return temp_n, temp_s, temp_m
+
+def _apply_translation_y(n, s, m, l):
+    # rotation by pi/2, translation along z, rotation by -pi/2, to match _preapply_translation_y
+    temp_n = np.arctan2((np.cos(n)*np.cos(m)-np.cosh(s)*np.sin(m)*np.sin(n))*np.sinh(l)+np.cosh(l)*np.sinh(s)*np.sin(n),
+                        (-np.sin(m)*np.cosh(s)*np.cos(n)-np.cos(m)*np.sin(n))*np.sinh(l)+np.cosh(l)*np.sinh(s)*np.cos(n))
+    temp_s = np.arccosh(np.cosh(l)*np.cosh(s)-np.sin(m)*np.sinh(l)*np.sinh(s))
+    temp_m = np.arctan2(-(np.cosh(s)*np.sinh(l)-np.cosh(l)*np.sinh(s)*np.sin(m)),(np.cos(m)*np.sinh(s)))
+    return temp_n, temp_s, temp_m
+
+def _preapply_translation_z(n, s, m, l):
+    temp_n = np.arctan2(np.cosh(s)*np.sinh(l)+np.cosh(l)*np.sinh(s)*np.sin(n),np.cos(n)*np.sinh(s))
+    temp_s = np.arccosh(np.cosh(l)*np.cosh(s)+np.sin(n)*np.sinh(l)*np.sinh(s))
+    temp_m = np.arctan2(-np.cos(m)*np.cos(n)*np.sinh(l)+np.sin(m)*(np.cosh(s)*np.sinh(l)*np.sin(n)+np.cosh(l)*np.sinh(s)),
+                        np.cos(n)*np.sin(m)*np.sinh(l)+np.cos(m)*(np.cosh(s)*np.sinh(l)*np.sin(n)+np.cosh(l)*np.sinh(s)))
+    return temp_n, temp_s, temp_m
+
+def _preapply_translation_y(n, s, m, l):
+    temp_n = np.arctan2(np.sin(n)*np.sinh(s),np.cosh(s)*np.sinh(l)+np.cos(n)*np.cosh(l)*np.sinh(s))
+    temp_s = np.arccosh(np.cosh(l)*np.cosh(s)+np.cos(n)*np.sinh(l)*np.sinh(s))
+    temp_m = np.arctan2(np.cos(m)*np.sin(n)*np.sinh(l)+np.sin(m)*(np.cos(n)*np.sinh(l)*np.cosh(s)+np.cosh(l)*np.sinh(s)),
+                        np.cos(m)*(np.cos(n)*np.cosh(s)*np.sinh(l)+np.cosh(l)*np.sinh(s))-np.sin(m)*np.sin(n)*np.sinh(l))
+    return temp_n, temp_s, temp_m
+
+
+class PolarTransformArray(object):
+    """Struct-of-arrays storage for N polar transforms (n, s, m).
+
+    Every operation mirrors the one on PolarTransform, but acts on all N
+    transforms at once. Arguments may be scalars or arrays of length N.
+    """
+    
+    def __init__(self, dN: np.ndarray, dS: np.ndarray, dM: np.ndarray) -> None:
+        dN, dS, dM = np.broadcast_arrays(np.asarray(dN, dtype=float), np.asarray(dS, dtype=float), np.asarray(dM, dtype=float))
+        self.data = np.stack((dN.ravel(), dS.ravel(), dM.ravel()))
+    
+    @classmethod
+    def identity(cls, count: int) -> "PolarTransformArray":
+        return cls(np.zeros(count), np.zeros(count), np.zeros(count))
+    
+    @classmethod
+    def from_transforms(cls, transforms: list) -> "PolarTransformArray":
+        arr = cls.identity(len(transforms))
+        for i, pt in enumerate(transforms):
+            arr.data[:, i] = pt.data
+        return arr
+    
+    @property
+    def n(self) -> np.ndarray:
+        return self.data[0]
+    
+    @n.setter
+    def n(self, value: np.ndarray) -> None:
+        self.data[0] = value
+    
+    @property
+    def s(self) -> np.ndarray:
+        return self.data[1]
+    
+    @s.setter
+    def s(self, value: np.ndarray) -> None:
+        self.data[1] = value
+    
+    @property
+    def m(self) -> np.ndarray:
+        return self.data[2]
+    
+    @m.setter
+    def m(self, value: np.ndarray) -> None:
+        self.data[2] = value
+    
+    def __len__(self) -> int:
+        return self.data.shape[1]
+    
+    def __getitem__(self, index):
+        """An integer index gives a PolarTransform view that reads and writes
+        this array; any other index gives a new PolarTransformArray
+        """
+        if isinstance(index, (int, np.integer)):
+            return PolarTransform.view(self.data[:, index])
+        return PolarTransformArray(self.n[index], self.s[index], self.m[index])
+    
+    def copy(self) -> "PolarTransformArray":
+        return PolarTransformArray(self.n, self.s, self.m)
+    
+    def assign(self, pt) -> None:
+        """Overwrite every transform with pt (PolarTransform or PolarTransformArray)"""
+        self.data[:] = pt.data.reshape(3, -1)
+    
+    def apply_rotation(self, a) -> None:
+        self.m += a
+    
+    def apply_translation_z(self, l) -> None:
+        self.n, self.s, self.m = _apply_translation_z(self.n, self.s, self.m, l)
+    
+    def apply_translation_y(self, l) -> None:
+        self.n, self.s, self.m = _apply_translation_y(self.n, self.s, self.m, l)
+    
+    def preapply_rotation(self, a) -> None:
+        self.n += a
+    
+    def preapply_translation_z(self, l) -> None:
+        self.n, self.s, self.m = _preapply_translation_z(self.n, self.s, self.m, l)
+    
+    def preapply_translation_y(self, l) -> None:
+        self.n, self.s, self.m = _preapply_translation_y(self.n, self.s, self.m, l)
+    
+    def apply_polar_transform(self, pt) -> None:
+        if isinstance(pt, (PolarTransform, PolarTransformArray)):
+            self.apply_rotation(pt.n)
+            self.apply_translation_z(pt.s)
+            self.apply_rotation(pt.m)
+        else:
+            raise TypeError("Unsuppported Type")
+    
+    def preapply_polar_transform(self, pt) -> None:
+        if isinstance(pt, (PolarTransform, PolarTransformArray)):
+            self.preapply_rotation(pt.m)
+            self.preapply_translation_y(pt.s)
+            self.preapply_rotation(pt.n)
+        else:
+            raise TypeError("Unsuppported Type")
+    
+    def inverse(self) -> "PolarTransformArray":
+        return PolarTransformArray(-self.m, -self.s, -self.n)
+    
+    def distance_to(self, p) -> np.ndarray:
+        """
+        Calculate geodesic distances to one point or, elementwise, to N points
+
+        Args:
+            p (PolarTransform | PolarTransformArray): second point(s)
+
+        Returns:
+            np.ndarray: geodesic distances
+        """
+        return _polar_distance(self.s, self.m, p.s, p.m)
+    
+    def inverse_points(self) -> np.ndarray:
+        """(N, 3) hyperboloid points the inverse transforms take the origin to, the
+        points distance_to measures between
+        """
+        return hyper_utils.polar_point(-self.m, -self.s)
+    
+    def pairwise_distances(self, p) -> np.ndarray:
+        """
+        Calculate geodesic distances from every one of these N points to every one
+        of M others at once
+
+        Args:
+            p (PolarTransformArray): the M other points
+
+        Returns:
+            np.ndarray: (N, M) geodesic distances
+        """
+        return hyper_utils.hyperbolic_distances(self.inverse_points(), p.inverse_points())
+    
+    def pairwise_within(self, p, radius: float) -> np.ndarray:
+        """(N, M) bool, which pairs of pairwise_distances are at most radius apart,
+        without computing the distances
+        """
+        return hyper_utils.minkowski_products(self.inverse_points(), p.inverse_points()) <= np.cosh(radius)
+    
+    def get_matrix(self) -> np.ndarray:
+        """Returns the (N, 4, 4) stack of transform matrices"""
+        return hyper_utils.polar_matrix(self.n, self.s, self.m)
+    
+    def get_matrix3(self) -> np.ndarray:
+        """Returns the (N, 3, 3) stack of reduced (2+1)-dimensional matrices"""
+        return hyper_utils.polar_matrix3(self.n, self.s, self.m)
+    
+    def hyperboloid_point(self) -> np.ndarray:
+        """Returns the (N, 3) hyperboloid points of the transformed origins"""
+        return hyper_utils.polar_point(self.n, self.s)
+    
+    def pos_on_screen(self) -> np.ndarray:
+        """Returns the (N, 3) screen positions of the transformed origins"""
+        return scale_to_screen(hyper_utils.polar_disc_point(self.n, self.s))
 
 
 class PolarTransform(object):
+    """A single polar transform. It either owns its (n, s, m) values or is a
+    view onto one column of a PolarTransformArray.
+    """
     
     def __init__(self, dN: float, dS: float, dM: float) -> None:
-        self.n, self.s, self.m = dN, dS, dM
+        self.data = np.array([dN, dS, dM], dtype=float)
+    
+    @classmethod
+    def view(cls, data: np.ndarray) -> "PolarTransform":
+        pt = cls.__new__(cls)
+        pt.data = data
+        return pt
+    
+    @property
+    def n(self) -> float:
+        return self.data[0]
+    
+    @n.setter
+    def n(self, value: float) -> None:
+        self.data[0] = value
+    
+    @property
+    def s(self) -> float:
+        return self.data[1]
+    
+    @s.setter
+    def s(self, value: float) -> None:
+        self.data[1] = value
+    
+    @property
+    def m(self) -> float:
+        return self.data[2]
+    
+    @m.setter
+    def m(self, value: float) -> None:
+        self.data[2] = value
         
     def to_string(self) -> str:
         return str(self.n) + ", " + str(self.s) + ", " + str(self.m)
     
     def get_matrix(self) -> np.ndarray:
-        start_transform = hyper_utils.rotation_mat(self.n)
-        P = hyper_utils.translation_mat_y(0)
-        P = P @ hyper_utils.translation_mat_z(self.s)
-        start_transform = start_transform @ P
-        start_transform = start_transform @ hyper_utils.rotation_mat(self.m)
-        return start_transform
+        return hyper_utils.polar_matrix(self.n, self.s, self.m)
+    
+    def get_matrix3(self) -> np.ndarray:
+        return hyper_utils.polar_matrix3(self.n, self.s, self.m)
+    
+    def hyperboloid_point(self) -> np.ndarray:
+        return hyper_utils.polar_point(self.n, self.s)
     
     def copy(self) -> "PolarTransform":
         return PolarTransform(self.n, self.s, self.m)
     
+    def __deepcopy__(self, memo: dict) -> "PolarTransform":
+        # A view must not drag its whole backing array along
+        return self.copy()
+    
+    def set(self, pt: "PolarTransform") -> None:
+        self.data[:] = pt.data
+    
     def apply_rotation(self, a: float) -> None:
         self.m += a
     
     def apply_translation_z(self, l: float) -> None:
-        temp_n = np.arctan2((np.cos(self.n)*np.sin(self.m)+np.cos(self.m)*np.sin(self.n)*np.cosh(self.s))*np.sinh(l)+np.sin(self.n)*np.sinh(self.s)*np.cosh(l),
-                       (np.cos(self.m)*np.cos(self.n)*np.cosh(self.s)-np.sin(self.m)*np.sin(self.n))*np.sinh(l)+np.cos(self.n)*np.cosh(l)*np.sinh(self.s))
-        temp_s = np.arccosh(np.cosh(l)*np.cosh(self.s)+np.cos(self.m)*np.sinh(l)*np.sinh(self.s))
-        temp_m = np.arctan2((np.sin(self.m)*np.sinh(self.s)),(np.cosh(self.s)*np.sinh(l)+np.cosh(l)*np.sinh(self.s)*np.cos(self.m)))
-        
-        self.n = temp_n
-        self.s = temp_s
-        self.m = temp_m    
+        self.data[:] = _apply_translation_z(self.n, self.s, self.m, l)
     
     def apply_translation_y(self, l: float) -> None:
-        temp_n = np.arctan2((np.cos(self.n)*np.sin(self.m)-np.cosh(self.s)*np.sin(self.m)*np.sin(self.n))*np.sinh(l)+np.cosh(l)*np.sinh(self.s)*np.sin(self.n),
-                            (-np.cos(self.m)*np.cosh(self.s)*np.sin(self.n)-np.cos(self.m)*np.sin(self.n))*np.sinh(l)+np.cosh(l)*np.sinh(self.s)*np.cos(self.n))
-        temp_s = np.arccosh(np.cosh(l)*np.cosh(self.s)+np.sin(self.m)*np.sinh(l)*np.sinh(self.s))
-        temp_m = np.arctan2(-(np.cosh(self.s)*np.sinh(l)+np.cosh(l)*np.sinh(self.s)*np.sin(self.m)),(np.cos(self.m)*np.sinh(self.s)))
-    
-        self.n = temp_n
-        self.s = temp_s
-        self.m = temp_m
+        self.data[:] = _apply_translation_y(self.n, self.s, self.m, l)
     
     def preapply_rotation(self, a: float) -> None:
         self.n += a
     
     def preapply_translation_z(self, l: float) -> None:
-        temp_n = np.arctan2(np.cosh(self.s)*np.sinh(l)+np.cosh(l)*np.sinh(self.s)*np.sin(self.n),np.cos(self.n)*np.sinh(self.s))
-        temp_s = np.arccosh(np.cosh(l)*np.cosh(self.s)+np.sin(self.n)*np.sinh(l)*np.sinh(self.s))
-        temp_m = np.arctan2(-np.cos(self.m)*np.cos(self.n)*np.sinh(l)+np.sin(self.m)*(np.cosh(self.s)*np.sinh(l)*np.sin(self.n)+np.cosh(l)*np.sinh(self.s)),
-                       np.cos(self.n)*np.sin(self.m)*np.sinh(l)+np.cos(self.m)*(np.cosh(self.s)*np.sinh(l)*np.sin(self.n)+np.cosh(l)*np.sinh(self.s)))
-        
-        self.n = temp_n
-        self.s = temp_s
-        self.m = temp_m
+        self.data[:] = _preapply_translation_z(self.n, self.s, self.m, l)
         
     def preapply_translation_y(self, l: float) -> None:
-        temp_n = np.arctan2(np.sin(self.n)*np.sinh(self.s),np.cosh(self.s)*np.sinh(l)+np.cos(self.n)*np.cosh(l)*np.sinh(self.s))
-        temp_s = np.arccosh(np.cosh(l)*np.cosh(self.s)+np.cos(self.n)*np.sinh(l)*np.sinh(self.s))
-        temp_m = np.arctan2(np.cos(self.m)*np.sin(self.n)*np.sinh(l)+np.sin(self.m)*(np.cos(self.n)*np.sinh(l)*np.cosh(self.s)+np.cosh(l)*np.sinh(self.s)),
-                       np.cos(self.m)*(np.cos(self.n)*np.cosh(self.s)*np.sinh(l)+np.cosh(l)*np.sinh(self.s))-np.sin(self.m)*np.sin(self.n)*np.sinh(l))
-        
-        self.n = temp_n
-        self.s = temp_s
-        self.m = temp_m
+        self.data[:] = _preapply_translation_y(self.n, self.s, self.m, l)
     
     def apply_polar_transform(self, pt: "PolarTransform") -> None:
         if isinstance(pt, PolarTransform):
@@ -100,23 +304,173 @@ class PolarTransform(object):
         Returns:
             float: geodesic distance
         """
-        copy_transform = self.copy()
-        copy_transform.apply_polar_transform(p.inverse())
-        return copy_transform.s
+        return _polar_distance(self.s, self.m, p.s, p.m)
     
     def pos_on_screen(self) -> np.ndarray:
-        transfrom = self.get_matrix()
-        p = np.array([1, 0, 0, 0])
-        p = transfrom @ p
-        p = project_onto_screen(p)
-        return p
+        return scale_to_screen(hyper_utils.polar_disc_point(self.n, self.s))
 
 
-class LatticeTransform(object):
+class LorentzTransform(object):
+    """A transform stored as its 3x3 SO(2,1) matrix instead of (n, s, m).
+
+    It has the same interface as PolarTransform. Steps are a few multiply-adds on
+    two rows or columns of the matrix rather than arctan2/arccosh formulas, and
+    the matrix is renormalized every RENORMALIZE_INTERVAL steps so long sessions
+    don't drift off the hyperboloid. (n, s, m) are read back only when asked for.
+    """
+    
+    RENORMALIZE_INTERVAL = 64
+    
+    def __init__(self, dN: float = 0, dS: float = 0, dM: float = 0) -> None:
+        self.matrix = hyper_utils.polar_matrix3(dN, dS, dM)
+        self.steps = 0
+    
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> "LorentzTransform":
+        lt = cls.__new__(cls)
+        lt.matrix = np.array(matrix[:3, :3], dtype=float)
+        lt.steps = 0
+        return lt
+    
+    @classmethod
+    def from_polar(cls, pt: PolarTransform) -> "LorentzTransform":
+        return cls(pt.n, pt.s, pt.m)
+    
+    def to_polar(self) -> PolarTransform:
+        return PolarTransform(*hyper_utils.polar_from_matrix3(self.matrix))
+    
+    @property
+    def n(self) -> float:
+        return self.to_polar().n
+    
+    @n.setter
+    def n(self, value: float) -> None:
+        self.matrix = hyper_utils.polar_matrix3(value, self.s, self.m)
+    
+    @property
+    def s(self) -> float:
+        return np.arccosh(max(self.matrix[0, 0], 1.0))
+    
+    @s.setter
+    def s(self, value: float) -> None:
+        pt = self.to_polar()
+        self.matrix = hyper_utils.polar_matrix3(pt.n, value, pt.m)
+    
+    @property
+    def m(self) -> float:
+        return self.to_polar().m
+    
+    @m.setter
+    def m(self, value: float) -> None:
+        pt = self.to_polar()
+        self.matrix = hyper_utils.polar_matrix3(pt.n, pt.s, value)
+    
+    def to_string(self) -> str:
+        return self.to_polar().to_string()
+    
+    def get_matrix(self) -> np.ndarray:
+        P = np.zeros((4, 4))
+        P[:3, :3] = self.matrix
+        return P
+    
+    def get_matrix3(self) -> np.ndarray:
+        return self.matrix.copy()
+    
+    def hyperboloid_point(self) -> np.ndarray:
+        return self.matrix[:, 0].copy()
+    
+    def copy(self) -> "LorentzTransform":
+        lt = LorentzTransform.from_matrix(self.matrix)
+        lt.steps = self.steps
+        return lt
+    
+    def __deepcopy__(self, memo: dict) -> "LorentzTransform":
+        return self.copy()
+    
+    def set(self, lt) -> None:
+        self.matrix[:] = lt.get_matrix3()
+    
+    def renormalize(self) -> None:
+        self.matrix = hyper_utils.lorentz_renormalize(self.matrix)
+        self.steps = 0
     
-    from hyper.lattice import LatticeCoord, LatticePoint
+    def _stepped(self) -> None:
+        self.steps += 1
+        if self.steps >= self.RENORMALIZE_INTERVAL:
+            self.renormalize()
+    
+    def _mix_columns(self, i: int, j: int, a: float, b: float, c: float, d: float) -> None:
+        ci, cj = self.matrix[:, i].copy(), self.matrix[:, j]
+        self.matrix[:, i] = a*ci + c*cj
+        self.matrix[:, j] = b*ci + d*cj
+        self._stepped()
+    
+    def _mix_rows(self, i: int, j: int, a: float, b: float, c: float, d: float) -> None:
+        ri, rj = self.matrix[i].copy(), self.matrix[j]
+        self.matrix[i] = a*ri + b*rj
+        self.matrix[j] = c*ri + d*rj
+        self._stepped()
+    
+    # apply_* multiply on the right (M @ X), preapply_* on the left (X @ M), with
+    # the same axes as the PolarTransform methods of the same name
+    def apply_rotation(self, a: float) -> None:
+        self._mix_columns(1, 2, np.cos(a), -np.sin(a), np.sin(a), np.cos(a))
+    
+    def apply_translation_z(self, l: float) -> None:
+        self._mix_columns(0, 1, np.cosh(l), np.sinh(l), np.sinh(l), np.cosh(l))
+    
+    def apply_translation_y(self, l: float) -> None:
+        self._mix_columns(0, 2, np.cosh(l), np.sinh(l), np.sinh(l), np.cosh(l))
+    
+    def preapply_rotation(self, a: float) -> None:
+        self._mix_rows(1, 2, np.cos(a), -np.sin(a), np.sin(a), np.cos(a))
+    
+    def preapply_translation_z(self, l: float) -> None:
+        self._mix_rows(0, 2, np.cosh(l), np.sinh(l), np.sinh(l), np.cosh(l))
+    
+    def preapply_translation_y(self, l: float) -> None:
+        self._mix_rows(0, 1, np.cosh(l), np.sinh(l), np.sinh(l), np.cosh(l))
+    
+    def apply_polar_transform(self, pt) -> None:
+        if isinstance(pt, (PolarTransform, LorentzTransform)):
+            self.matrix = self.matrix @ pt.get_matrix3()
+            self._stepped()
+        else:
+            raise TypeError("Unsuppported Type")
+    
+    def preapply_polar_transform(self, pt) -> None:
+        if isinstance(pt, (PolarTransform, LorentzTransform)):
+            self.matrix = pt.get_matrix3() @ self.matrix
+            self._stepped()
+        else:
+            raise TypeError("Unsuppported Type")
+    
+    def inverse(self) -> "LorentzTransform":
+        return LorentzTransform.from_matrix(hyper_utils.minkowski_inverse(self.matrix))
+    
+    def distance_to(self, p) -> float:
+        """
+        Calculate geodesic distance between two points
+
+        Args:
+            p (PolarTransform | LorentzTransform): second point
+
+        Returns:
+            float: geodesic distance
+        """
+        # (M P^-1)[0, 0], with P^-1 = J P^T J
+        P = p.get_matrix3()
+        cosh_d = self.matrix[0, 0]*P[0, 0] - self.matrix[0, 1]*P[0, 1] - self.matrix[0, 2]*P[0, 2]
+        return np.arccosh(max(cosh_d, 1.0))
+    
+    def pos_on_screen(self) -> np.ndarray:
+        x = self.matrix[:, 0]
+        return scale_to_screen(np.array([x[1], x[2], 0]) / (x[0] + 1))
+
+
+class LatticeTransform(object):
     
-    def __init__(self, transform: PolarTransform, coord: LatticeCoord, d_system: "LatticeSystem") -> None:
+    def __init__(self, transform: PolarTransform, coord: "LatticeCoord", d_system: "LatticeSystem") -> None:
         self.rel_transform = transform
         self.system = d_system
         
@@ -124,11 +478,11 @@ class LatticeTransform(object):
         
     def relative_transform_in_direction(self, direction: int) -> PolarTransform:
         p = copy.deepcopy(self.rel_transform)
-        p.apply_polar_transform(PolarTransform(direction*2*np.pi/5, BRANCH_LENGTH, np.pi))
+        p.apply_polar_transform(PolarTransform(direction*DIRECTION_ANGLE, BRANCH_LENGTH, np.pi))
         return p
     
-    def get_lattice_point_in_direction_if_exists(self, direction: int) -> LatticePoint:
-        return self.system.get_lattice_point_if_exists(self.base_point.coords.coord_in_direction(direction))
+    def get_lattice_point_in_direction_if_exists(self, direction: int) -> "LatticePoint":
+        return self.base_point.point_in_direction_if_exists(direction)
     
     def step_basepoint_in_direction(self, direction: int, use_mouse: bool) -> None:
         """Steps the basepoint in a direction, without changing
@@ -137,28 +491,29 @@ class LatticeTransform(object):
         Args:
             direction (int): _description_
         """
-        new_base_point = self.system.get_lattice_point(self.base_point.coords.coord_in_direction(direction))
-        turn_amount = self.base_point.coords.direction_after_travel(direction)
+        new_base_point = self.base_point.point_in_direction(direction)
+        turn_amount = self.base_point.turn_in_direction(direction)
         self.base_point = new_base_point
-        self.rel_transform.apply_polar_transform(PolarTransform(direction*2*np.pi/5, BRANCH_LENGTH, np.pi-turn_amount*2*np.pi/5))
+        self.rel_transform.apply_polar_transform(PolarTransform(direction*DIRECTION_ANGLE, BRANCH_LENGTH, np.pi-turn_amount*DIRECTION_ANGLE))
         if use_mouse:
             self.rel_transform.s = 0
             # self.rel_transform.n = 0
             # self.rel_transform.m = 0
         
-    def step_in_mouse_direction(self, mouse_pos: np.ndarray, midpoint: np.ndarray) -> PolarTransform:
+    def step_in_mouse_direction(self, mouse_pos: np.ndarray, midpoint: np.ndarray, step: float = 0.05) -> PolarTransform:
         """Steps Rel_transform in direction of mouse position
 
         Args:
             mouse_dir (np.ndarray): _description_
             midpoint (np.ndarray): _description_
+            step (float, optional): distance moved per preapply of the returned transform
         """
         mouse_pos = mouse_pos - midpoint
         mouse_norm = np.linalg.norm(mouse_pos)
         min_point_dir = -100
         min_point = None
-        for i in range(5):
-            pt_in_dir = self.system.get_lattice_point(self.base_point.coords.coord_in_direction(i))
+        for i in range(DIRECTIONS):
+            pt_in_dir = self.base_point.point_in_direction(i)
             pt_pos = pt_in_dir.attached_walker.render_position.pos_on_screen()
             pt_pos = pt_pos[:-1] - midpoint
             pt_norm = np.linalg.norm(pt_pos)
@@ -167,7 +522,7 @@ class LatticeTransform(object):
                 min_point_dir = angle_radians
                 min_point = pt_in_dir
         min_point_render_pos = min_point.attached_walker.render_position
-        p_trans = PolarTransform(min_point_render_pos.n, -0.05, -min_point_render_pos.n)
+        p_trans = PolarTransform(min_point_render_pos.n, -step, -min_point_render_pos.n)
         # self.rel_transform.preapply_polar_transform(p_trans) 
         return p_trans   
                 
@@ -181,7 +536,7 @@ class LatticeTransform(object):
             transform_len = 0.1
         else:
             transform_len = np.abs(self.rel_transform.s)
-        for i in range(5):
+        for i in range(DIRECTIONS):
             if np.abs(self.relative_transform_in_direction(i).s) < transform_len:
                 self.step_basepoint_in_direction(i, use_mouse)
                 return True
@@ -192,7 +547,7 @@ class LatticeTransform(object):
         while stepped:
             stepped = False
             transform_len = np.abs(self.rel_transform.s)
-            for i in range(5):
+            for i in range(DIRECTIONS):
                 if np.abs(self.relative_transform_in_direction(i).s) < transform_len:
                     self.step_basepoint_in_direction(i)
                     stepped = True
@@ -202,7 +557,7 @@ class LatticeTransform(object):
         while stepped:
             stepped = False
             transform_len = np.abs(self.rel_transform.s)
-            for i in range(5):
+            for i in range(DIRECTIONS):
                 if np.abs(self.relative_transform_in_direction(i).s) < transform_len:
                     if self.get_lattice_point_in_direction_if_exists(i) is not None:
                         self.step_basepoint_in_direction(i)
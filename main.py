@@ -3,20 +3,33 @@ from sys import exit
 import time
 import numpy as np
 
-from hyper.render_utils import SCALE
-from hyper.transforms import PolarTransform, LatticeTransform
+from hyper.render_utils import SCALE, DirtyRegions
+from hyper.transforms import PolarTransform, LorentzTransform, LatticeTransform
 from hyper.system import LatticeSystem
 from hyper.lattice import *
+from hyper.profiling import profiler
+from hyper.store import BoundedLatticeStore
+from hyper.loop import FixedStepLoop
 
 WIDTH, HEIGHT = 800, 800
 MIDPOINT = np.array([WIDTH/2, HEIGHT/2])
 
+# Simulation steps per second; speed and the mouse step are per step
+STEP_RATE = 60
+# Render cap, ignored with VSYNC
+MAX_FPS = 60
+VSYNC = False
+# Render every frame between steps (True) or only frames in which a step ran (False)
+INTERPOLATE = True
+
 pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
+if VSYNC:
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync=1)
+else:
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption('HyPyrion')
 
-# Set up the clock
-clock = pygame.time.Clock()
+loop = FixedStepLoop(STEP_RATE, 0 if VSYNC else MAX_FPS, interpolate=INTERPOLATE)
 
 # Load the music file
 bg_music = pygame.mixer.Sound('music/hr-domina-hunting.ogg')
@@ -24,71 +37,140 @@ bg_music.set_volume(0.2)
 
 bg_music.play(loops=-1)
 
-l_system = LatticeSystem()
-start_transform = LatticeTransform(PolarTransform(0, 0, 0), LatticeCoord([]), l_system)
+# Least recently used lattice points are evicted once more than this many exist
+LATTICE_POINT_CAPACITY = 20000
+
+l_system = LatticeSystem(point_store=BoundedLatticeStore(LATTICE_POINT_CAPACITY), lod=True, prefetch=True)
+# With print_text, tiles smaller than this many pixels on screen get no coordinate label
+l_system.label_min_pixels = 24
+# The view transform is composed every frame, LorentzTransform keeps that cheap and drift free
+start_transform = LatticeTransform(LorentzTransform(0, 0, 0), LatticeCoord([]), l_system)
 
 font = pygame.font.Font(None, 36)  # You can choose a font and size
+stats_font = pygame.font.SysFont('monospace', 14)
 
 speed = 0.04
+mouse_step = 0.05
+# How many steps ahead the next base point is predicted, to build its walkers in the background
+PREFETCH_LOOKAHEAD_STEPS = 15
+
+def apply_key_motion(transform, keys, amount: float = 1) -> None:
+    """Moves the view for the held arrow key, by amount steps"""
+    if keys[pygame.K_UP]:
+        # Translate Up (down b/c inverse A)
+        transform.preapply_translation_z(speed * amount)
+    elif keys[pygame.K_DOWN]:
+        # Translate Down
+        transform.preapply_translation_z(-speed * amount)
+    elif keys[pygame.K_RIGHT]:
+        # Rotate Clockwise
+        transform.preapply_rotation(-speed * amount)
+    elif keys[pygame.K_LEFT]:
+        # Rotate counterclockwise
+        transform.preapply_rotation(speed * amount)
 
 use_mouse = True
 mouse_pressed = False
 print_text = False
 
+# F3 toggles the profiler and its stats overlay, F4 dumps the recorded frames
+PROFILE_DUMP_PATH = 'profile.jsonl'
+
+# The disc never changes, so it is drawn once and only restored where tiles were
+backdrop = pygame.Surface((WIDTH, HEIGHT))
+backdrop.fill('black')
+pygame.draw.circle(backdrop, (34, 139, 34), pygame.Vector2(SCALE, SCALE), SCALE)
+pygame.draw.circle(backdrop, 'red', pygame.Vector2(SCALE, SCALE), SCALE, 4)
+dirty_regions = DirtyRegions(backdrop)
+# (print_text, profiler.enabled) and l_system.last_view of the last drawn frame. Steps
+# only move start_transform, the view (LOD and re-root included) is set once per
+# rendered frame
+drawn_flags = None
+drawn_view = None
+# The view before the last step's motion and that motion (view, amount), to render
+# interpolated states between the last two steps
+previous_coords = None
+previous_view = None
+step_motion = None
+
 while True:
-    l_system.update()
-    
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             pygame.quit()
             exit()
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F3:
+                profiler.toggle()
+            elif event.key == pygame.K_F4:
+                profiler.dump(PROFILE_DUMP_PATH)
+    keys = pygame.key.get_pressed()
     
-    screen.fill('black')
-    pygame.draw.circle(screen, (34, 139, 34), pygame.Vector2(SCALE, SCALE), SCALE)
-    pygame.draw.circle(screen, 'red', pygame.Vector2(SCALE, SCALE), SCALE, 4)
-
-    l_system.set_view_origin_lattrans(start_transform)
-    shifted = start_transform.shift_to_nearer_basepoint(use_mouse)
-    
-    if use_mouse:
-        mouse_buttons = pygame.mouse.get_pressed()
-        # Tiling Traversal
-        # Click in direction of point to travel to it (Similar to Hyperrogue)
-        if not mouse_pressed and mouse_buttons[0]:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            mouse_pos = np.array([mouse_x, mouse_y])
-            p_trans = start_transform.step_in_mouse_direction(mouse_pos, MIDPOINT)
-            mouse_pressed = True
+    steps = loop.steps()
+    for _ in range(steps):
+        with profiler.scope('update'):
+            l_system.update()
         
-        if not shifted and mouse_pressed:
-            start_transform.rel_transform.preapply_polar_transform(p_trans)
-        else:
-            mouse_pressed = False
+        with profiler.scope('shift_basepoint'):
+            shifted = start_transform.shift_to_nearer_basepoint(use_mouse)
+        previous_coords = start_transform.base_point.coords
+        previous_view = start_transform.rel_transform.copy()
+        step_motion = None
         
-    else:
-        # Input and Update Tessallation Transform for Continuous Action Traversal
-        keys = pygame.key.get_pressed()
-        # print(start_transform.rel_transform.to_string())
-        if keys[pygame.K_UP]:
-            # Translate Up (down b/c inverse A)
-            start_transform.rel_transform.preapply_translation_z(speed)
-        elif keys[pygame.K_DOWN]:
-            # Translate Down
-            start_transform.rel_transform.preapply_translation_z(-speed)
-        elif keys[pygame.K_RIGHT]:
-            # Rotate Clockwise
-            start_transform.rel_transform.preapply_rotation(-speed) 
-        elif keys[pygame.K_LEFT]:
-            # Rotate counterclockwise
-            start_transform.rel_transform.preapply_rotation(speed) 
+        if use_mouse:
+            mouse_buttons = pygame.mouse.get_pressed()
+            # Tiling Traversal
+            # Click in direction of point to travel to it (Similar to Hyperrogue)
+            if not mouse_pressed and mouse_buttons[0]:
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                mouse_pos = np.array([mouse_x, mouse_y])
+                p_trans = start_transform.step_in_mouse_direction(mouse_pos, MIDPOINT, mouse_step)
+                mouse_pressed = True
+            
+            if not shifted and mouse_pressed:
+                step_motion = lambda view, amount, step=p_trans: view.preapply_polar_transform(PolarTransform(step.n, step.s * amount, step.m))
+                step_motion(start_transform.rel_transform, 1)
+            else:
+                mouse_pressed = False
+            
+        else:
+            # Input and Update Tessallation Transform for Continuous Action Traversal
+            step_motion = lambda view, amount, keys=keys: apply_key_motion(view, keys, amount)
+            step_motion(start_transform.rel_transform, 1)
     
+    if steps > 0:
+        if use_mouse:
+            if mouse_pressed:
+                lookahead = PolarTransform(p_trans.n, p_trans.s * PREFETCH_LOOKAHEAD_STEPS, p_trans.m)
+                l_system.prefetcher.predict(start_transform, lambda view: view.preapply_polar_transform(lookahead))
+        elif keys[pygame.K_UP] or keys[pygame.K_DOWN]:
+            l_system.prefetcher.predict(start_transform, lambda view: apply_key_motion(view, keys, PREFETCH_LOOKAHEAD_STEPS))
+    if profiler.enabled:
+        profiler.count("sim_steps", steps)
+    
+    if loop.should_render():
+        coords, view = start_transform.base_point.coords, start_transform.rel_transform
+        if loop.interpolate and previous_view is not None:
+            # alpha of the way from the state before the last step to the one after it.
+            # Both have the same base point, the base point only shifts before a step's motion
+            coords, view = previous_coords, previous_view.copy()
+            if step_motion is not None:
+                step_motion(view, loop.alpha)
+        with profiler.scope('set_view_origin'):
+            l_system.set_view_origin(coords, view)
         
-    for lat_walker in l_system.lattice_walkers:
-        lat_walker.base_point.render_point(lat_walker.render_position, screen, font, print_text)
-        
-        
-        
-    pygame.display.update()
-    # time.sleep(1)
+        # Only redraw when the walkers moved or what is drawn on top of them changed
+        # (the overlay changes every frame while it is shown)
+        flags = (print_text, profiler.enabled)
+        if l_system.last_view != drawn_view or profiler.enabled or flags != drawn_flags:
+            with profiler.scope('render'):
+                dirty_regions.restore(screen)
+                l_system.render_walkers(screen, font, print_text, dirty_regions.drawn)
+            
+            if profiler.enabled:
+                dirty_regions.drawn.append(profiler.render_overlay(screen, stats_font))
+            pygame.display.update(dirty_regions.flush())
+            drawn_flags = flags
+            drawn_view = l_system.last_view
+    profiler.end_frame()
     
-    clock.tick(60)
\ No newline at end of file
+    loop.wait()
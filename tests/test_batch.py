@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from hyper.batch import render_views
+from hyper.lattice import LatticeCoord
+from hyper.raster import DISC_COLOR
+from hyper.transforms import PolarTransform
+
+
+def disc_center(frame: np.ndarray) -> tuple:
+    """Centroid of the pixels that aren't the black background or tile lines"""
+    y, x = np.nonzero((frame == DISC_COLOR).all(axis=2))
+    return x.mean(), y.mean()
+
+@pytest.mark.parametrize("width, height", [(200, 200), (300, 200)])
+def test_smaller_frames_are_scaled_views(width, height):
+    views = [(LatticeCoord([]), PolarTransform(0, 0, 0))]
+    with render_views(views, processes=0, width=800, height=800) as full, \
+         render_views(views, processes=0, width=width, height=height) as small:
+        full_frame, small_frame = full.array[0], small.array[0]
+        scale = min(width, height) / 800
+
+        # The disc stays centred in the frame
+        center_x, center_y = disc_center(small_frame)
+        assert abs(center_x - width / 2) < 2 and abs(center_y - height / 2) < 2
+        # The origin vertex is drawn at the centre
+        assert (small_frame[height // 2, width // 2] == 0).all()
+        # And the disc covers as much of its square as in the full frame
+        full_disc = (full_frame != 0).any(axis=2).mean()
+        small_disc = (small_frame != 0).any(axis=2).sum() / (2 * scale * 400) ** 2
+        assert abs(full_disc - small_disc) < 0.03
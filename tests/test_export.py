@@ -0,0 +1,24 @@
+import numpy as np
+
+from hyper.export import MemmapFrameWriter, camera_path, export_frames, render_frames
+from hyper.system import LatticeSystem
+
+
+def forward(transform, frame):
+    transform.preapply_translation_z(0.3)
+
+def test_npy_export_round_trips(tmp_path):
+    width, height, count = 120, 90, 4
+    system = LatticeSystem()
+    expected = [frame.copy() for frame in render_frames(system, camera_path(system, forward, count), width, height)]
+
+    path = str(tmp_path / "frames.npy")
+    system = LatticeSystem()
+    written = export_frames(system, camera_path(system, forward, count), MemmapFrameWriter(path, count, width, height), width, height)
+
+    frames = np.load(path, mmap_mode='r')
+    assert written == count
+    assert frames.shape == (count, height, width, 3) and frames.dtype == np.uint8
+    assert np.array_equal(frames, np.stack(expected))
+    # The camera moves, so the frames differ
+    assert not np.array_equal(frames[0], frames[-1])
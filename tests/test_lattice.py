@@ -0,0 +1,40 @@
+import pytest
+
+from hyper.geometry import DIRECTIONS
+from hyper.lattice import LatticeCoord, LatticeCoordArray
+from hyper.tiling import get_automaton, TilingCoord
+
+
+def test_neighbors_are_symmetric():
+    # LatticePoint.link_neighbor back-links on the turn, so stepping back along
+    # the turn has to return to the coord and turn back to the direction
+    for coord in LatticeCoordArray.up_to_radius(6).coords():
+        for direction in range(DIRECTIONS):
+            neighbor = coord.coord_in_direction(direction)
+            turn = coord.direction_after_travel(direction) % DIRECTIONS
+            assert neighbor.coord_in_direction(turn) == coord
+            assert neighbor.direction_after_travel(turn) % DIRECTIONS == direction
+
+@pytest.mark.parametrize("digits, neighbor", [
+    ([0, 1], [0, 2, 0]),
+    ([0, 1, 2], [0, 2, 0, 0]),
+    ([0, 1, 2, 2], [0, 2, 0, 0, 0]),
+])
+def test_carry_into_the_root_digit(digits, neighbor):
+    # The hand-written steps used to give <1,0,0...> here, which doesn't step back
+    assert LatticeCoord(digits).coord_in_direction(4) == LatticeCoord(neighbor)
+
+@pytest.mark.parametrize("p, q", [(4, 5), (5, 4), (7, 3), (3, 7)])
+def test_tiling_neighbors_are_symmetric(p, q):
+    automaton = get_automaton(p, q)
+    ring = [TilingCoord(automaton)]
+    for _ in range(4):
+        next_ring = []
+        for coord in ring:
+            for direction in range(q):
+                neighbor = coord.coord_in_direction(direction)
+                turn = coord.direction_after_travel(direction) % q
+                assert neighbor.coord_in_direction(turn) == coord
+                if len(neighbor) > len(coord):
+                    next_ring.append(neighbor)
+        ring = list(dict.fromkeys(next_ring))
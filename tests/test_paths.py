@@ -0,0 +1,33 @@
+import numpy as np
+
+from hyper.lattice import LatticeCoord, LatticeCoordArray
+from hyper.paths import PathCache
+
+
+def test_path_is_symmetric_and_matches_distance():
+    cache = PathCache()
+    a, b = LatticeCoord([4, 2, 1, 2, 2]), LatticeCoord([3, 1, 0, 1, 1])
+    path = cache.path(a, b)
+    assert path[0] == a and path[-1] == b
+    assert cache.path(b, a) == path[::-1]
+    assert cache.distance(b, a) == len(path) - 1 == a.distance_to(b)
+
+def test_stats_count_distances_and_paths_apart():
+    cache = PathCache()
+    a, b = LatticeCoord([2, 1]), LatticeCoord([0, 2, 0])
+    cache.distance(a, b)
+    cache.path(a, b)
+    cache.path(b, a)
+    stats = cache.stats()
+    assert (stats["distances"]["hits"], stats["distances"]["misses"]) == (0, 1)
+    assert (stats["paths"]["hits"], stats["paths"]["misses"]) == (1, 1)
+
+def test_bulk_distances_match_pairs():
+    coords = LatticeCoordArray.up_to_radius(5).coords()
+    rng = np.random.RandomState(0)
+    sources = [coords[i] for i in rng.randint(len(coords), size=40)] + [LatticeCoord([9])]
+    targets = [coords[i] for i in rng.randint(len(coords), size=30)]
+    distances = PathCache().distances(sources, targets)
+    assert distances.shape == (41, 30)
+    assert (distances[-1] == -1).all()
+    assert distances[:-1].tolist() == [[a.distance_to(b) for b in targets] for a in sources[:-1]]
@@ -0,0 +1,38 @@
+import numpy as np
+
+from hyper.lattice import LatticeCoord
+from hyper.system import LatticeSystem
+from hyper.transforms import LatticeTransform, PolarTransform
+
+
+def walker_state(system):
+    return {walker.coord_origin_rel.key(): (walker.base_point.coords.key(), walker.render_position.data.copy())
+            for walker in system.lattice_walkers}
+
+def test_prefetched_trees_match_synchronous_rebuild_with_lod():
+    synchronous = LatticeSystem(lod=True, renderer="null")
+    prefetched = LatticeSystem(lod=True, prefetch=True, renderer="null")
+    swapped = []
+    swap = prefetched.swap_walker_tree
+    prefetched.swap_walker_tree = lambda tree: swapped.append(tree) or swap(tree)
+    views = [LatticeTransform(PolarTransform(0, 0, 0), LatticeCoord([]), system) for system in (synchronous, prefetched)]
+
+    for _ in range(200):
+        for view in views:
+            view.shift_to_nearer_basepoint(False)
+            # A curved walk, so the straight lookahead below predicts the wrong transform
+            view.rel_transform.preapply_translation_z(0.04)
+            view.rel_transform.preapply_rotation(0.02)
+        prefetched.prefetcher.predict(views[1], lambda view: view.preapply_translation_z(0.4))
+        if prefetched.prefetcher.pending is not None:
+            prefetched.prefetcher.pending[1].result()
+        for system, view in zip((synchronous, prefetched), views):
+            system.set_view_origin_lattrans(view)
+
+        expected, actual = walker_state(synchronous), walker_state(prefetched)
+        assert expected.keys() == actual.keys()
+        for key, (base_key, position) in expected.items():
+            assert actual[key][0] == base_key
+            assert np.allclose(actual[key][1], position)
+    prefetched.prefetcher.shutdown()
+    assert len(swapped) > 0
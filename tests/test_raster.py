@@ -0,0 +1,14 @@
+import hashlib
+
+from hyper.batch import render_views
+from hyper.lattice import LatticeCoord
+from hyper.transforms import PolarTransform
+
+
+def test_frames_match_reference_checksums():
+    # Checksums of frames known to be right; if drawing changes on purpose, look
+    # at the new frames and update them
+    views = [(LatticeCoord([]), PolarTransform(0.3, 0.4, 0.5)), (LatticeCoord([2, 1]), PolarTransform(0, 0, 0))]
+    with render_views(views, processes=0, width=200, height=150) as frames:
+        checksums = [hashlib.md5(frame.tobytes()).hexdigest() for frame in frames.array]
+    assert checksums == ["d5b9041c3d5c274fedcfb87f91ccada9", "fd05e028f01b75eb90b40d2af93e7997"]
@@ -0,0 +1,52 @@
+from hyper.scheduler import TickScheduler
+
+
+class Point(object):
+
+    def __init__(self) -> None:
+        self.updates = 0
+
+    def update(self) -> None:
+        self.updates += 1
+
+
+def test_interval():
+    scheduler = TickScheduler()
+    point = Point()
+    scheduler.register(point, interval=3)
+    for _ in range(6):
+        scheduler.tick()
+    assert point.updates == 2
+
+def test_register_twice_updates_once():
+    scheduler = TickScheduler()
+    point = Point()
+    scheduler.register(point)
+    scheduler.register(point)
+    for _ in range(5):
+        scheduler.tick()
+    assert point.updates == 5
+
+def test_sleep_and_wake_in_the_same_frame():
+    scheduler = TickScheduler()
+    point = Point()
+    scheduler.register(point, interval=3)
+    scheduler.sleep(point)
+    scheduler.wake(point)
+    for _ in range(6):
+        scheduler.tick()
+    assert point.updates == 2
+
+def test_sleep_and_unregister():
+    scheduler = TickScheduler()
+    point = Point()
+    scheduler.register(point)
+    scheduler.tick()
+    scheduler.sleep(point)
+    scheduler.tick()
+    scheduler.wake(point)
+    scheduler.tick()
+    scheduler.unregister(point)
+    scheduler.tick()
+    assert point.updates == 2
+    assert point not in scheduler
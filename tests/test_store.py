@@ -0,0 +1,26 @@
+from hyper.lattice import LatticeCoordArray
+from hyper.store import BoundedLatticeStore
+from hyper.system import LatticeSystem
+
+
+def test_bounded_store_keeps_pinned_points_and_evicts_least_recently_used():
+    store = BoundedLatticeStore(80)
+    system = LatticeSystem(point_store=store, renderer="null")
+    # Every point of the initial tree has a walker, so all of them are pinned
+    pinned = [point.coords.key() for point in store]
+    assert system.walker_origin.base_point.coords.key() in pinned
+    assert all(system.is_lattice_point_pinned(walker.base_point) for walker in system.lattice_walkers)
+
+    extra = [coord for coord in LatticeCoordArray.up_to_radius(5).coords() if coord.key() not in store][-100:]
+    first = system.get_lattice_point(extra[0]).coords.key()
+    for coord in extra[1:]:
+        system.get_lattice_point(coord)
+        # Keep the first one recently used, it must outlive the ones added after it
+        store.get(first)
+
+    assert len(store) == store.capacity
+    assert all(key in store for key in pinned)
+    assert first in store
+    assert extra[-1].key() in store
+    assert not any(coord.key() in store for coord in extra[1:50])
+    assert store.stats()["evictions"] > 0
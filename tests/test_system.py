@@ -0,0 +1,40 @@
+import numpy as np
+
+from hyper.geometry import tile_footprint
+from hyper.lattice import LatticeCoord
+from hyper.system import LatticeSystem
+from hyper.transforms import PolarTransform
+
+
+def test_lod_culls_tiles_below_the_footprint_threshold():
+    system = LatticeSystem(lod=True, renderer="null")
+    coords, parents, rel_orients, positions = system.get_walker_template(system.lod_max_radius)
+    footprints = tile_footprint(positions.s)
+    indices = system.select_lod_walkers(PolarTransform(0, 0, 0), hysteresis=False)
+
+    selected = np.zeros(len(coords), dtype=bool)
+    selected[indices] = True
+    ancestors = np.zeros(len(coords), dtype=bool)
+    ancestors[parents[indices[1:]]] = True
+    assert 0 < len(indices) < len(coords)
+    # Distant tiles are dropped, what is kept is big enough or holds the tree together
+    assert (footprints[~selected] < system.lod_min_pixels).all()
+    assert (footprints[selected & ~ancestors] >= system.lod_min_pixels).all()
+
+    # A higher threshold only keeps nearer tiles
+    system.lod_min_pixels *= 2
+    fewer = system.select_lod_walkers(PolarTransform(0, 0, 0), hysteresis=False)
+    assert set(fewer) < set(indices)
+    assert positions.s[fewer].max() < positions.s[indices].max()
+
+def test_pick_returns_the_tile_under_a_pixel():
+    system = LatticeSystem(renderer="null")
+    points, offsets = system.pick(np.array([[400, 400], [0, 0]]))
+    assert points[0].coords == LatticeCoord([])
+    assert points[1] is None
+
+    system.set_view_origin(LatticeCoord([]), PolarTransform(0.3, 0.4, 0.5))
+    walkers = list(system.lattice_walkers)
+    pixels = np.array([walker.render_position.pos_on_screen()[:2] for walker in walkers])
+    points, offsets = system.pick(pixels)
+    assert [point.coords for point in points] == [walker.base_point.coords for walker in walkers]
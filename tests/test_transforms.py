@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from hyper.transforms import LorentzTransform, PolarTransform
+
+
+STEPS = ["apply_rotation", "apply_translation_z", "apply_translation_y",
+         "preapply_rotation", "preapply_translation_z", "preapply_translation_y"]
+
+
+@pytest.mark.parametrize("step", STEPS)
+@pytest.mark.parametrize("l", [0.3, -0.5])
+def test_lorentz_steps_match_polar(step, l):
+    pt, lt = PolarTransform(0.3, 0.7, 0.2), LorentzTransform(0.3, 0.7, 0.2)
+    getattr(pt, step)(l)
+    getattr(lt, step)(l)
+    assert np.allclose(lt.get_matrix3(), pt.get_matrix3())
+
+def test_apply_translation_y_is_rotated_translation_z():
+    pt, expected = PolarTransform(1.1, 0.4, -0.8), PolarTransform(1.1, 0.4, -0.8)
+    pt.apply_translation_y(0.5)
+    expected.apply_rotation(np.pi / 2)
+    expected.apply_translation_z(0.5)
+    expected.apply_rotation(-np.pi / 2)
+    assert np.allclose(pt.get_matrix3(), expected.get_matrix3())
+
+def test_renormalize_far_from_origin_stays_on_hyperboloid():
+    lt, pt = LorentzTransform(), PolarTransform(0, 0, 0)
+    for _ in range(1000):
+        lt.preapply_translation_z(0.04)
+        lt.apply_rotation(0.01)
+        pt.preapply_translation_z(0.04)
+        pt.apply_rotation(0.01)
+    lt.renormalize()
+    assert lt.s > 35
+    assert np.isfinite(lt.matrix).all()
+    # M^T J M = J, relative to the size of the entries, which are around e^s
+    J = np.diag([1.0, -1.0, -1.0])
+    size = np.abs(lt.matrix).T @ np.abs(lt.matrix)
+    assert (np.abs(lt.matrix.T @ J @ lt.matrix - J) <= 1e-12 * size).all()
+    assert np.allclose(lt.to_polar().data, pt.data, atol=1e-6)